@@ -0,0 +1,76 @@
+"""
+Benchmark of drawing a dataset of word images into one (N, height, width, 3) uint8 array: make_graphics followed by
+converting each image to an array and padding it into a preallocated array (centered, on a common baseline), against
+make_array drawing the words straight into the array, in memory and into a memory-mapped .npy file. Reports the
+images per second and the peak memory allocated by NumPy and Pillow while drawing, as traced by tracemalloc (which
+doesn't count the pages of a memory-mapped file). The words are random, so they are hardly ever repeated, and the
+word cache is turned off (it would otherwise hold a strip of every word).
+
+Run with: python benchmarks/bench_array.py [n_words]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import quadcolor
+
+FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "DejaVuSans-subset.ttf")
+
+
+def words(n_words: int) -> list:
+    """Random lowercase words of 2 to 8 letters, so that the word cache is of little help."""
+    rng = random.Random(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(2, 8))) for _ in range(n_words)]
+
+
+def padded(text_list: list, quadfont) -> np.ndarray:
+    """The array drawn by make_graphics and padded one image at a time."""
+    _, tops, bottoms = quadcolor.drawing.get_bboxes(text_list, quadfont=quadfont)
+    width, _ = quadcolor.get_flashcard_size(text_list, quadfont=quadfont)
+    top, bottom = min(tops), max(bottoms)
+    images = quadcolor.make_graphics(text_list, backend="numpy", quadfont=quadfont)
+    out = np.empty((len(text_list), bottom - top, width, 3), dtype=np.uint8)
+    out[...] = 255
+    for i, image in enumerate(images):
+        array = np.asarray(image)
+        x, y = (width - array.shape[1]) // 2, tops[i] - top
+        out[i, y:y + array.shape[0], x:x + array.shape[1]] = array
+    return out
+
+
+def measure(name: str, function, n_words: int) -> np.ndarray:
+    tracemalloc.start()
+    start = time.perf_counter()
+    array = function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:30s} {n_words / elapsed:8.0f} images/s, peak allocated {peak / 1e6:7.1f} MB")
+    return array
+
+
+def main() -> None:
+    n_words = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text_list = words(n_words)
+    quadfont = quadcolor.make_quadfont(FONT, 40)
+    quadcolor.set_word_cache(enabled=False)
+    quadcolor.make_array(text_list[:100], quadfont=quadfont)
+    with tempfile.TemporaryDirectory() as directory:
+        mapped = measure("make_array into a .npy file", lambda: quadcolor.make_array(
+            text_list, out=os.path.join(directory, "words.npy"), quadfont=quadfont), n_words)
+        print(f"{n_words} words of {mapped.shape[2]} x {mapped.shape[1]} pixels, {mapped.nbytes / 1e6:.1f} MB")
+        array = measure("make_array", lambda: quadcolor.make_array(text_list, quadfont=quadfont), n_words)
+        reference = measure("make_graphics, then padded", lambda: padded(text_list, quadfont), n_words)
+        same = np.array_equal(array, reference) and np.array_equal(mapped, reference)
+        print("arrays are identical" if same else "ARRAYS DIFFER")
+        del mapped
+
+
+if __name__ == "__main__":
+    main()
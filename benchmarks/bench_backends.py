@@ -0,0 +1,46 @@
+"""
+Benchmark of the "pil" and "numpy" backends of make_flashcards and make_graphics, which produce identical images.
+
+Run with: python benchmarks/bench_backends.py [n_cards]
+"""
+import random
+import sys
+import time
+import numpy as np
+
+import quadcolor
+
+LAYOUTS = [dict(n_rows=4, n_columns=2), dict(n_rows=8, n_columns=4), dict(n_rows=12, n_columns=6)]
+
+
+def best_time(function, n_repeats: int = 3):
+    times = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main() -> None:
+    n_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    random.seed(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    cards = ["".join(random.choice(letters) for _ in range(random.randint(2, 8))) for _ in range(n_cards)]
+    quadcolor.config.font_dict.warm_up()
+    quadcolor.set_word_cache(enabled=False)
+
+    print(f"{n_cards} cards, default font, word cache off")
+    for name, make in [("make_graphics", lambda backend: quadcolor.make_graphics(cards, backend=backend))] + \
+            [(f"make_flashcards {layout['n_rows']}x{layout['n_columns']}",
+              lambda backend, layout=layout: quadcolor.make_flashcards(cards, backend=backend, **layout))
+             for layout in LAYOUTS]:
+        pil_time, pil_images = best_time(lambda: make("pil"))
+        numpy_time, numpy_images = best_time(lambda: make("numpy"))
+        identical = all(np.array_equal(np.asarray(a), np.asarray(b)) for a, b in zip(pil_images, numpy_images))
+        print(f"{name:26s} pil {1000 * pil_time:8.1f} ms   numpy {1000 * numpy_time:8.1f} ms   "
+              f"identical: {identical}")
+
+
+if __name__ == "__main__":
+    main()
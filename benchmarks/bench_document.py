@@ -0,0 +1,70 @@
+"""
+Benchmark of drawing a long document with iter_document: a generated book of paragraphs of words (drawn from a
+fixed vocabulary, with the common words much more common than the rest, as in real text) in DejaVu Sans at 50
+pixels, on letter-sized pages at 300 dpi. Reports the pages per second drawn by each backend, and saved to a single
+PDF file as they are drawn. Each run is done in a fresh process, so that its peak resident memory can be reported.
+Only the current page is kept, but the word cache keeps the strips of the words drawn (up to 256 MB by default), so
+the memory grows until the cache is full; the book and one a tenth as long are also drawn with a 16 MB word cache,
+to show that the memory then doesn't grow with the length of the book.
+
+Run with: python benchmarks/bench_document.py [n_paragraphs]
+"""
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import quadcolor
+
+FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "DejaVuSans-subset.ttf")
+
+
+def paragraphs(n_paragraphs: int):
+    """Paragraphs of 40 to 200 words, generated one at a time."""
+    rng = random.Random(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = ["".join(rng.choice(letters) for _ in range(rng.randint(1, 10))) for _ in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    for _ in range(n_paragraphs):
+        words = rng.choices(vocabulary, weights, k=rng.randint(40, 200))
+        yield " ".join(words).capitalize() + ".\n"
+
+
+def run(n_paragraphs: int, backend: str, save: bool, cache_mb: int) -> None:
+    if cache_mb:
+        quadcolor.set_word_cache(max_bytes=cache_mb * 1024 * 1024)
+    quadfont = quadcolor.make_quadfont(FONT, 50)
+    pages = quadcolor.iter_document(paragraphs(n_paragraphs), align="justify", backend=backend, quadfont=quadfont)
+    counted = []
+    pages = (counted.append(None) or page for page in pages)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        if save:
+            quadcolor.save_images(pages, Path(directory) / "book.pdf")
+        else:
+            for _ in pages:
+                pass
+        elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    cache = f"{cache_mb} MB word cache" if cache_mb else "default word cache"
+    print(f"{len(counted):4d} pages, {backend:5s} backend, {cache:18s}, {'saved to PDF' if save else 'drawn only  '}: "
+          f"{elapsed:7.2f} s, {len(counted) / elapsed:6.2f} pages/s, peak RSS {peak:7.1f} MiB")
+
+
+def main() -> None:
+    if len(sys.argv) > 2:
+        run(int(sys.argv[1]), sys.argv[2], sys.argv[3] == "save", int(sys.argv[4]))
+        return
+    n_paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 1500
+    cases = [(n_paragraphs, backend, action, 0) for backend in ("pil", "numpy") for action in ("draw", "save")]
+    cases += [(n_paragraphs // 10, "pil", "draw", 16), (n_paragraphs, "pil", "draw", 16)]
+    for case in cases:
+        subprocess.run([sys.executable, __file__, *map(str, case)], check=True)
+
+
+if __name__ == "__main__":
+    main()
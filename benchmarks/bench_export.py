@@ -0,0 +1,50 @@
+"""
+Benchmark of saving a large make_graphics batch as separate files with save_images: encoding one image at a time,
+in a pool of threads and in a pool of processes, writing separate files or one zip archive, and PNG compression
+levels. Reports images per second and the total size written.
+
+Run with: python benchmarks/bench_export.py [n_images] [workers]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import quadcolor
+
+
+def run(images: list, output_file: str, **kwargs) -> (float, int):
+    directory = os.path.dirname(output_file)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    start = time.perf_counter()
+    files = quadcolor.save_images(images, output_file, **kwargs)
+    elapsed = time.perf_counter() - start
+    return len(images) / elapsed, sum(os.path.getsize(file) for file in files)
+
+
+def main() -> None:
+    n_images = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    n_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    images = quadcolor.make_graphics([f"word {i}" for i in range(n_images)], margins=(20, 20, 20, 20))
+    directory = tempfile.mkdtemp()
+    print(f"{n_images} make_graphics images, {workers} workers, {n_cpus} CPUs")
+    cases = [("png, one at a time", "files/w.png", dict()),
+             (f"png, {workers} threads", "files/w.png", dict(workers=workers)),
+             (f"png, {workers} processes", "files/w.png", dict(workers=workers, executor="process")),
+             (f"png, {workers} threads, zip", "zip/w.png.zip", dict(workers=workers)),
+             (f"png, {workers} threads, tar", "tar/w.png.tar", dict(workers=workers)),
+             ("png, compress_level=1", "files/w.png", dict(compress_level=1)),
+             ("png, optimize=True", "files/w.png", dict(optimize=True)),
+             ("jpeg, quality=75", "files/w.jpg", dict()),
+             (f"jpeg, quality=90, {workers} threads", "files/w.jpg", dict(workers=workers, quality=90))]
+    for name, output_file, kwargs in cases:
+        rate, n_bytes = run(images, os.path.join(directory, output_file), **kwargs)
+        print(f"{name:36s} {rate:8.1f} images/s {n_bytes / 1e6:8.2f} MB")
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
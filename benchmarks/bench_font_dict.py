@@ -0,0 +1,43 @@
+"""
+Benchmark of making font dictionaries: a full build with set_font, and the incremental rebuilds done by
+set_colors and set_parameters, at several font sizes. The on-disk font dictionary cache is disabled.
+
+Run with: python benchmarks/bench_font_dict.py [font_file]
+(the default font file is the DejaVu Sans font that comes with matplotlib)
+"""
+import sys
+import time
+from pathlib import Path
+import matplotlib
+
+import quadcolor
+
+FONT_FILE = Path(matplotlib.get_data_path()) / "fonts" / "ttf" / "DejaVuSans.ttf"
+SIZES = [50, 100, 200, 400]
+
+
+def best_time(function, n_repeats: int = 5) -> float:
+    times = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    font_file = sys.argv[1] if len(sys.argv) > 1 else str(FONT_FILE)
+    quadcolor.set_cache(enabled=False)
+    palettes = [(255, 0, 0), (0, 200, 0)]
+    patterns = ["[a-z]", "[a-m]"]
+    print(f"{'size':>6s} {'set_font':>12s} {'set_colors':>12s} {'to_color':>12s}")
+    for size in SIZES:
+        font_time = best_time(lambda: quadcolor.set_font(font_file, size))
+        colors_time = best_time(lambda: quadcolor.set_colors(ul=palettes.reverse() or palettes[0]))
+        pattern_time = best_time(lambda: quadcolor.set_parameters(
+            characters_to_color=patterns.reverse() or patterns[0]))
+        print(f"{size:6d} {1000 * font_time:9.1f} ms {1000 * colors_time:9.1f} ms {1000 * pattern_time:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
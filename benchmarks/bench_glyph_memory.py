@@ -0,0 +1,87 @@
+"""
+Benchmark of the memory taken by a font dictionary with thousands of characters at print resolution: the compact
+ColoredChars made by make_quadfont (a mask plus the colors of the quadrants) against the same ColoredChars holding
+their quadrants images. Reports the image memory per glyph, the growth of the process's resident memory, and the
+rate at which text is drawn with each, with the word cache emptied before each pass (so that every string of letters
+is made from the font dictionary) and with the word cache turned off (so that every letter is pasted on its own).
+
+Run with: python benchmarks/bench_glyph_memory.py [font_file] [size] [n_characters]
+"""
+from dataclasses import replace
+import gc
+import os
+import sys
+import time
+
+import quadcolor
+from quadcolor.coloredchar import ColoredChar
+from quadcolor.wordcache import word_cache
+
+DEFAULT_FONT = os.path.join(os.path.dirname(quadcolor.config.__file__), "..", "benchmarks", "data",
+                            "DejaVuSans-subset.ttf")
+
+
+def resident_mb() -> float:
+    """Resident memory of this process in MB (0 where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return 0.0
+
+
+def with_quadrants(colored_char: ColoredChar) -> ColoredChar:
+    """A copy of a ColoredChar that keeps its quadrants image, as every ColoredChar used to."""
+    return ColoredChar(mask=colored_char.mask, quadrants=colored_char.quadrants, x_divide=colored_char.x_divide,
+                       y_divide=colored_char.y_divide, width=colored_char.width, top_coord=colored_char.top_coord,
+                       bottom_coord=colored_char.bottom_coord)
+
+
+def draw(quadfont, words: list, backend: str) -> (float, list):
+    """Words per second drawn by make_graphics, starting from an empty word cache, and the images drawn."""
+    word_cache.clear()
+    start = time.perf_counter()
+    images = quadcolor.make_graphics(words, quadfont=quadfont, backend=backend)
+    return len(words) / (time.perf_counter() - start), [image.tobytes() for image in images]
+
+
+def main() -> None:
+    font_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FONT
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    n_characters = int(sys.argv[3]) if len(sys.argv) > 3 else 4000
+    quadcolor.set_cache(enabled=False)
+    characters = "".join(char for char in map(chr, range(0x21, 0x30000)) if char.isprintable())[:n_characters]
+    quadfont = quadcolor.make_quadfont(font_file, size, a_height="x", font_characters=characters)
+    n_glyphs = len(quadfont.font_dict)
+    compact_bytes = sum(colored_char.n_bytes for colored_char in quadfont.font_dict.values())
+
+    gc.collect()
+    before = resident_mb()
+    full_font_dict = {char: with_quadrants(colored_char) for char, colored_char in quadfont.font_dict.items()}
+    gc.collect()
+    added = resident_mb() - before
+    full_bytes = sum(colored_char.n_bytes for colored_char in full_font_dict.values())
+
+    print(f"{n_glyphs} characters of {os.path.basename(font_file)} at {size} pixels")
+    print(f"with quadrants images: {full_bytes / 1e6:8.1f} MB of images, {full_bytes / n_glyphs / 1e3:6.1f} KB per "
+          f"glyph")
+    print(f"compact:               {compact_bytes / 1e6:8.1f} MB of images, {compact_bytes / n_glyphs / 1e3:6.1f} KB "
+          f"per glyph ({full_bytes / compact_bytes:.1f} times smaller)")
+    print(f"resident memory added by keeping the quadrants images: {added:.1f} MB")
+
+    full_quadfont = replace(quadfont, font_dict=full_font_dict, glyphs=dict())
+    words = ["".join(characters[(7 * i + j) % 60] for j in range(6)) for i in range(300)]
+    for word_cache_enabled in (True, False):
+        quadcolor.config.word_cache_enabled = word_cache_enabled
+        for backend in ("pil", "numpy"):
+            # a first pass, so that the numpy backend's glyph arrays are made before timing
+            draw(quadfont, words, backend), draw(full_quadfont, words, backend)
+            full_rate, full_images = draw(full_quadfont, words, backend)
+            compact_rate, compact_images = draw(quadfont, words, backend)
+            print(f"word cache {'on ' if word_cache_enabled else 'off'}, {backend:5s} backend: "
+                  f"{full_rate:7.1f} words/s with quadrants images, {compact_rate:7.1f} words/s compact"
+                  f"{'' if compact_images == full_images else ', IMAGES DIFFER'}")
+
+
+if __name__ == "__main__":
+    main()
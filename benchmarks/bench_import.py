@@ -0,0 +1,43 @@
+"""
+Benchmark of the time taken by "import quadcolor", with the lazily loaded default font dictionary.
+
+For comparison, the same import is also timed followed by decoding every character of the default font (which is
+what the import used to do), and followed by drawing a few lowercase words (a typical short-lived job). Loading
+the default font from the packed atlas is also compared with loading it from the older per-glyph jpg layout.
+
+Run with: python benchmarks/bench_import.py [n_repeats]
+"""
+import statistics
+import subprocess
+import sys
+
+SNIPPETS = {
+    "import only": "import quadcolor",
+    "import + draw 3 words": "import quadcolor; quadcolor.make_graphics(['cab', 'bed', 'dog'])",
+    "import + decode all (eager)": "import quadcolor; quadcolor.config.font_dict.warm_up()",
+    "load_font_dict only": "import quadcolor; t = time.perf_counter(); quadcolor.load_font_dict()",
+    "load_font_dict + decode all": "import quadcolor; t = time.perf_counter(); quadcolor.load_font_dict(); "
+                                   "quadcolor.config.font_dict.warm_up()",
+    "per-glyph jpg layout + decode all": "import quadcolor; t = time.perf_counter(); "
+                                         "quadcolor.load_font_dict(atlas_filename='missing.json'); "
+                                         "quadcolor.config.font_dict.warm_up()",
+}
+
+
+def time_snippet(snippet: str, n_repeats: int) -> list:
+    code = ("import time; t = time.perf_counter(); " + snippet +
+            "; print(time.perf_counter() - t)")
+    return [float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                 check=True).stdout) for _ in range(n_repeats)]
+
+
+def main() -> None:
+    n_repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for name, snippet in SNIPPETS.items():
+        times = time_snippet(snippet, n_repeats)
+        print(f"{name:36s} median {1000 * statistics.median(times):8.1f} ms   "
+              f"min {1000 * min(times):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
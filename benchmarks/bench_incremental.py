@@ -0,0 +1,52 @@
+"""
+Benchmark of saving an edited flashcard deck again with save_flashcards: the time taken to save a deck of 2000 cards
+(on an 8 x 4 grid, in DejaVu Sans at 60 pixels) in full, against saving it again after editing the text of 1, 10 and
+100 cards, to a single PDF file and to separate PNG files. Also checks that the incremental save writes the same
+pages as a full one.
+
+Run with: python benchmarks/bench_incremental.py [n_cards]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import quadcolor
+
+FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "DejaVuSans-subset.ttf")
+
+
+def save(cards: list, output_file: Path, quadfont, force: bool = False) -> float:
+    start = time.perf_counter()
+    quadcolor.save_flashcards(cards, output_file, n_rows=8, n_columns=4, quadfont=quadfont, force=force)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    n_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cards = [f"card {i}" for i in range(n_cards)]
+    quadfont = quadcolor.make_quadfont(FONT, 60)
+    rng = random.Random(0)
+    print(f"{n_cards} cards, {-(-n_cards // 32)} pages")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("deck.pdf", "deck.png"):
+            output_file = Path(directory) / name
+            full = save(cards, output_file, quadfont)
+            print(f"{name}: full save {full:6.2f} s")
+            edited = list(cards)
+            for n_edits in (1, 10, 100):
+                for i in rng.sample(range(n_cards), n_edits):
+                    edited[i] = edited[i].replace("card", "word")
+                elapsed = save(edited, output_file, quadfont)
+                print(f"{name}: {n_edits:3d} cards edited, saved again in {elapsed:6.2f} s "
+                      f"({full / elapsed:5.1f} times faster)")
+            contents = [file.read_bytes() for file in sorted(Path(directory).glob("deck*.p*"))]
+            save(edited, output_file, quadfont, force=True)
+            same = contents == [file.read_bytes() for file in sorted(Path(directory).glob("deck*.p*"))]
+            print(f"{name}: {'same files' if same else 'FILES DIFFER'} as a full save")
+
+
+if __name__ == "__main__":
+    main()
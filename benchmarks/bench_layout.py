@@ -0,0 +1,75 @@
+"""
+Benchmark of laying out flashcard decks: the time taken to work out the positions of the strings (computing every
+page with drawing.compute_layout, against the cached page grid of plan_flashcards), and, for a deck of words and
+phrases of mixed lengths, the number of pages and the time taken to draw them on an 8 x 4 grid, with layout="auto"
+and with layout="packed" (in DejaVu Sans at 60 pixels).
+
+Run with: python benchmarks/bench_layout.py [n_strings]
+"""
+import os
+import random
+import sys
+import time
+
+import quadcolor
+from quadcolor import drawing, planner
+
+WIDTH, HEIGHT, MARGINS = 2550, 3450, (75, 75, 75, 75)
+FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "DejaVuSans-subset.ttf")
+
+
+def words(n_strings: int) -> list:
+    """Mostly short words, with some longer phrases, as in a vocabulary deck."""
+    rng = random.Random(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    strings = []
+    for _ in range(n_strings):
+        n_words = rng.choice((1, 1, 1, 1, 2, 2, 3))
+        strings.append(" ".join("".join(rng.choice(letters) for _ in range(rng.randint(2, 8))) for _ in range(n_words)))
+    return strings
+
+
+def main() -> None:
+    n_strings = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    strings = words(n_strings)
+    quadfont = quadcolor.make_quadfont(FONT, 60)
+
+    n_rows, n_columns = 8, 4
+    n_pages = -(-n_strings // (n_rows * n_columns))
+    repeats = 20
+    start = time.perf_counter()
+    for _ in range(repeats):
+        drawing.compute_layout([(WIDTH, HEIGHT)] * n_pages, top_margin=MARGINS[1], left_margin=MARGINS[0],
+                               bottom_margin=MARGINS[3], right_margin=MARGINS[2], n_rows=n_rows, n_columns=n_columns)
+    every_page = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        planner.grid_layout(n_strings, n_rows, n_columns, WIDTH, HEIGHT, MARGINS)
+    cached = (time.perf_counter() - start) / repeats
+    print(f"laying out {n_strings} strings on a {n_rows} x {n_columns} grid: {1000 * every_page:.2f} ms computing "
+          f"every page, {1000 * cached:.2f} ms with the cached page grid")
+
+    start = time.perf_counter()
+    for layout in ("auto", "packed"):
+        quadcolor.plan_flashcards(strings, layout=layout, width=WIDTH, height=HEIGHT, margins=MARGINS,
+                                  quadfont=quadfont)
+    print(f"planning the auto and packed layouts (measuring every string): {1000 * (time.perf_counter() - start):.1f} "
+          f"ms")
+
+    plan = quadcolor.plan_flashcards(strings, layout="auto", width=WIDTH, height=HEIGHT, margins=MARGINS,
+                                     quadfont=quadfont)
+    fits = plan.n_rows >= 8 and plan.n_columns >= 4
+    cases = [(f"8 x 4 grid{'' if fits else ' (strings overlap)'}", dict(n_rows=8, n_columns=4)),
+             (f"auto ({plan.n_rows} x {plan.n_columns} grid)", dict(layout="auto")),
+             ("packed", dict(layout="packed"))]
+    print(f"{n_strings} strings of mixed lengths on {WIDTH} x {HEIGHT} pages")
+    for name, kwargs in cases:
+        start = time.perf_counter()
+        n_pages = sum(1 for _ in quadcolor.iter_flashcards(strings, width=WIDTH, height=HEIGHT, margins=MARGINS,
+                                                           quadfont=quadfont, **kwargs))
+        elapsed = time.perf_counter() - start
+        print(f"{name:36s} {n_pages:5d} pages {elapsed:7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
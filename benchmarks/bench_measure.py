@@ -0,0 +1,55 @@
+"""
+Benchmark of measuring large word lists with get_bboxes (as lists and as arrays) and get_flashcard_size, compared
+with the per-character Python loop that get_bboxes used to run.
+
+Run with: python benchmarks/bench_measure.py [n_words]
+"""
+import random
+import sys
+import time
+
+import quadcolor
+from quadcolor import config, drawing
+
+
+def loop_bboxes(text_list: list) -> (list, list, list):
+    """The previous implementation of get_bboxes, for comparison."""
+    widths = [0 for _ in range(len(text_list))]
+    tops = [0 for _ in range(len(text_list))]
+    bottoms = [0 for _ in range(len(text_list))]
+    for i, text in enumerate(text_list):
+        for j in text:
+            if j in config.font_dict.keys():
+                widths[i] += config.font_dict[j].width
+                if j != " ":
+                    tops[i] = min(tops[i], config.font_dict[j].top_coord)
+                    bottoms[i] = max(bottoms[i], config.font_dict[j].bottom_coord)
+    return widths, tops, bottoms
+
+
+def best_time(function, n_repeats: int = 3) -> float:
+    times = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    n_words = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    random.seed(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(random.choice(letters) for _ in range(random.randint(1, 10))) for _ in range(n_words)]
+    assert loop_bboxes(words) == drawing.get_bboxes(words)
+
+    print(f"{n_words} words")
+    for name, function in [("python loop", lambda: loop_bboxes(words)),
+                           ("get_bboxes", lambda: drawing.get_bboxes(words)),
+                           ("get_bboxes(as_arrays=True)", lambda: drawing.get_bboxes(words, as_arrays=True)),
+                           ("get_flashcard_size", lambda: quadcolor.get_flashcard_size(words))]:
+        print(f"{name:28s} {1000 * best_time(function):9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark of the "palette" backend against the "pil" backend: the time taken to draw pages of flashcards (8 x 4 cards
+per page, in the package's default font), the memory each page takes, and the time taken to save them and the size of
+the files, as PNG files, a single PDF file and a single TIFF file. Also reports how far the palette pages are from the
+RGB ones, whose antialiasing isn't rounded.
+
+Run with: python benchmarks/bench_palette.py [n_pages]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+import quadcolor
+
+OUTPUTS = ("deck.png", "deck.pdf", "deck.tif")
+
+
+def main() -> None:
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    cards = [f"card {i}" for i in range(32 * n_pages)]
+    pages = dict()
+    for backend in ("pil", "palette"):
+        quadcolor.make_flashcards(cards[:32], n_rows=8, n_columns=4, backend=backend)
+        start = time.perf_counter()
+        pages[backend] = quadcolor.make_flashcards(cards, n_rows=8, n_columns=4, backend=backend)
+        elapsed = time.perf_counter() - start
+        # Pillow stores an RGB pixel in four bytes and a palette pixel in one
+        n_bytes = pages[backend][0].width * pages[backend][0].height * (1 if backend == "palette" else 4)
+        print(f"{backend:8s} {n_pages} pages drawn in {elapsed:6.2f} s, {n_bytes / 2 ** 20:5.1f} MiB per page")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in OUTPUTS:
+            results = dict()
+            for backend in ("pil", "palette"):
+                output_file = Path(directory) / backend / name
+                output_file.parent.mkdir(exist_ok=True)
+                start = time.perf_counter()
+                files = quadcolor.save_images(pages[backend], output_file)
+                elapsed = time.perf_counter() - start
+                results[backend] = (elapsed, sum(file.stat().st_size for file in files))
+            (pil_time, pil_size), (palette_time, palette_size) = results["pil"], results["palette"]
+            print(f"{name}: pil {pil_time:6.2f} s, {pil_size / 2 ** 20:7.2f} MiB; "
+                  f"palette {palette_time:6.2f} s, {palette_size / 2 ** 20:7.2f} MiB "
+                  f"({pil_time / palette_time:4.1f} times faster, {pil_size / palette_size:4.1f} times smaller)")
+
+    rgb = np.asarray(pages["pil"][0]).astype(np.int16)
+    indexed = np.asarray(pages["palette"][0].convert("RGB")).astype(np.int16)
+    difference = np.abs(rgb - indexed).max(axis=2)
+    print(f"difference from the RGB pages: mean {difference.mean():.2f}, "
+          f"{100 * (difference > 16).mean():.2f}% of pixels by more than 16")
+
+
+if __name__ == "__main__":
+    main()
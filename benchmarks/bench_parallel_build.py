@@ -0,0 +1,50 @@
+"""
+Benchmark of building font dictionaries serially and with parallel glyph rasterization (set_build_workers),
+across character-set sizes and font sizes. The on-disk font dictionary cache is disabled.
+
+Run with: python benchmarks/bench_parallel_build.py [n_workers] [font_file]
+(the default font file is the DejaVu Sans font that comes with matplotlib)
+"""
+import os
+import sys
+import time
+from pathlib import Path
+import matplotlib
+
+import quadcolor
+
+FONT_FILE = Path(matplotlib.get_data_path()) / "fonts" / "ttf" / "DejaVuSans.ttf"
+CHARACTER_SETS = {
+    "ascii": "".join(chr(i) for i in range(32, 127)),
+    "latin-1": "".join(chr(i) for i in list(range(32, 127)) + list(range(160, 256))),
+    "latin-1+cyrillic": "".join(chr(i) for i in list(range(32, 127)) + list(range(160, 256)) +
+                                list(range(0x400, 0x500))),
+}
+SIZES = [50, 200, 400]
+
+
+def build_time(font_file: str, size: int, characters: str, workers: int, executor: str) -> float:
+    quadcolor.set_build_workers(workers, executor)
+    quadcolor.set_font(font_file, 10)
+    quadcolor.set_parameters(font_characters=characters)
+    start = time.perf_counter()
+    quadcolor.set_font(font_file, size)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    n_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    font_file = sys.argv[2] if len(sys.argv) > 2 else str(FONT_FILE)
+    quadcolor.set_cache(enabled=False)
+    print(f"{n_workers} workers, {os.cpu_count()} cpus")
+    print(f"{'characters':>18s} {'size':>5s} {'serial':>10s} {'processes':>10s} {'threads':>10s}")
+    for name, characters in CHARACTER_SETS.items():
+        for size in SIZES:
+            times = [build_time(font_file, size, characters, workers, executor)
+                     for workers, executor in [(0, "process"), (n_workers, "process"), (n_workers, "thread")]]
+            print(f"{name:>18s} {size:5d} " + " ".join(f"{1000 * t:7.1f} ms" for t in times))
+    quadcolor.set_build_workers(0)
+
+
+if __name__ == "__main__":
+    main()
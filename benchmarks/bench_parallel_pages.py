@@ -0,0 +1,49 @@
+"""
+Benchmark of drawing a large flashcard deck with make_flashcards in worker processes: pages per second for 1, 2, 4,
+... workers, up to the number of CPUs, and the speedup over drawing in the calling process. Also reports how long
+the calling process spends copying each page back out of shared memory, which bounds the achievable speedup.
+
+Run with: python benchmarks/bench_parallel_pages.py [n_pages] [backend]
+"""
+import os
+import sys
+import time
+from PIL import Image
+
+import quadcolor
+
+CARDS_PER_PAGE = 8 * 4
+
+
+def pages_per_second(cards: list, workers: int, backend: str) -> float:
+    start = time.perf_counter()
+    pages = quadcolor.iter_flashcards(cards, n_rows=8, n_columns=4, backend=backend, workers=workers)
+    n_pages = sum(1 for _ in pages)
+    return n_pages / (time.perf_counter() - start)
+
+
+def main() -> None:
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    backend = sys.argv[2] if len(sys.argv) > 2 else "pil"
+    n_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    cards = [f"card {i}" for i in range(n_pages * CARDS_PER_PAGE)]
+    quadcolor.config.font_dict.warm_up()
+    print(f"{n_pages} pages ({len(cards)} cards) of 2550 x 3450 pixels, {backend} backend, {n_cpus} CPUs")
+
+    data = bytearray(2550 * 3450 * 4)
+    start = time.perf_counter()
+    for _ in range(20):
+        Image.frombytes("RGB", (2550, 3450), memoryview(data), "raw", "RGBX")
+    print(f"copying a page out of shared memory: {1000 * (time.perf_counter() - start) / 20:.1f} ms")
+
+    serial = pages_per_second(cards, 0, backend)
+    print(f"calling process: {serial:6.1f} pages/s")
+    workers = 1
+    while workers <= n_cpus:
+        rate = pages_per_second(cards, workers, backend)
+        print(f"{workers:3d} workers:     {rate:6.1f} pages/s, speedup {rate / serial:5.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
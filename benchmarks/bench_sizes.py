@@ -0,0 +1,55 @@
+"""
+Benchmark of drawing the same words at several sizes (thumbnails, web images and print pages): calling set_font with
+each size, which makes the global font dictionary again every time, against passing scale to make_graphics, which
+makes each size of the QuadFont once and then reuses it. Also reports the time taken to resize the package's default
+font, which has no font file to draw again. The on-disk cache of font dictionaries is turned off, so that every size
+that is made is drawn.
+
+Run with: python benchmarks/bench_sizes.py [n_rounds]
+"""
+import os
+import sys
+import time
+
+import quadcolor
+
+FONT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "DejaVuSans-subset.ttf")
+SIZES = (40, 100, 300)
+WORDS = ["bad", "dog", "quick", "brown", "fox"] * 10
+
+
+def main() -> None:
+    n_rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    quadcolor.set_cache(enabled=False)
+
+    start = time.perf_counter()
+    for _ in range(n_rounds):
+        for size in SIZES:
+            quadcolor.set_font(FONT, size)
+            quadcolor.make_graphics(WORDS)
+    rebuild = time.perf_counter() - start
+
+    quadfont = quadcolor.make_quadfont(FONT, SIZES[-1])
+    start = time.perf_counter()
+    for _ in range(n_rounds):
+        for size in SIZES:
+            quadcolor.make_graphics(WORDS, quadfont=quadfont, scale=size / SIZES[-1])
+    scaled = time.perf_counter() - start
+    print(f"{n_rounds} rounds of {len(WORDS)} words at {', '.join(map(str, SIZES))} pixels:")
+    print(f"set_font for each size:       {rebuild:6.2f} s")
+    print(f"make_graphics with scale:     {scaled:6.2f} s ({rebuild / scaled:.1f} times faster)")
+
+    quadcolor.load_font_dict()
+    default = quadcolor.current_quadfont()
+    for scale in (0.25, 0.5):
+        start = time.perf_counter()
+        default.scaled(scale)
+        made = time.perf_counter() - start
+        start = time.perf_counter()
+        default.scaled(scale)
+        print(f"default font at {default.size * scale:.0f} pixels: {1000 * made:6.1f} ms to resize, "
+              f"{1000 * (time.perf_counter() - start):6.3f} ms when kept")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark of saving a long flashcard deck to a single PDF or TIFF file, comparing make_flashcards (all pages in
+memory, then save_images) with iter_flashcards (each page saved as soon as it is drawn). Each run is done in a
+fresh process, so that its peak resident memory can be reported.
+
+Run with: python benchmarks/bench_streaming.py [n_pages]
+"""
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import quadcolor
+
+CARDS_PER_PAGE = 8 * 4
+
+
+def run(method: str, suffix: str, n_pages: int) -> None:
+    cards = [f"card {i}" for i in range(n_pages * CARDS_PER_PAGE)]
+    make = quadcolor.make_flashcards if method == "list" else quadcolor.iter_flashcards
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        quadcolor.save_images(make(cards, n_rows=8, n_columns=4), Path(directory) / ("deck" + suffix))
+        elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{suffix:5s} {method:6s}: {elapsed:7.2f} s, {n_pages / elapsed:6.1f} pages/s, peak RSS {peak:7.1f} MiB")
+
+
+def main() -> None:
+    if len(sys.argv) > 2:
+        run(sys.argv[2], sys.argv[3], int(sys.argv[1]))
+        return
+    n_pages = sys.argv[1] if len(sys.argv) > 1 else "100"
+    print(f"{n_pages} pages of 2550 x 3450 pixels")
+    for suffix in [".pdf", ".tif"]:
+        for method in ["list", "stream"]:
+            subprocess.run([sys.executable, __file__, n_pages, method, suffix], check=True)
+
+
+if __name__ == "__main__":
+    main()
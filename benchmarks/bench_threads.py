@@ -0,0 +1,64 @@
+"""
+Benchmark of drawing many small jobs with render_many: jobs per second for 1, 2, 4, ... threads, up to the number
+of CPUs (and at least 2), and the speedup over drawing them one after another in the calling thread. The images
+drawn by the threads are checked against the ones drawn one at a time.
+
+Threads share the font dictionary and the word cache. The speedup is reported along with the number of CPUs it was
+measured on: with one CPU, threads can't draw in parallel, and any speedup comes from overlapping work within the
+run (see render_many).
+
+Run with: python benchmarks/bench_threads.py [n_jobs] [backend]
+"""
+import os
+import sys
+import time
+
+import quadcolor
+
+
+def make_jobs(n_jobs: int, backend: str) -> list:
+    jobs = []
+    for i in range(n_jobs):
+        if i % 4 == 3:
+            jobs.append(dict(kind="graphics", text_list=[f"word {i}", "bad dog", "quick brown fox"],
+                             margins=(10, 10, 10, 10), backend=backend))
+        else:
+            jobs.append(dict(text_list=[f"card {i} {j}" for j in range(24)], n_rows=4, n_columns=3, width=1275,
+                             height=1650, backend=backend))
+    return jobs
+
+
+def digests(results: list) -> list:
+    return [[hash(image.tobytes()) for image in images] for images in results]
+
+
+def main() -> None:
+    n_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    backend = sys.argv[2] if len(sys.argv) > 2 else "pil"
+    n_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    jobs = make_jobs(n_jobs, backend)
+    quadcolor.config.font_dict.warm_up()
+    print(f"{n_jobs} jobs (flashcard decks of two 1275 x 1650 pages, and graphics), {backend} backend, {n_cpus} CPUs")
+
+    # the first pass fills the word cache, as it would be in a long-running process
+    expected = digests(quadcolor.render_many(jobs, workers=1))
+    start = time.perf_counter()
+    results = [quadcolor.render_many([job], workers=1)[0] for job in jobs]
+    serial = n_jobs / (time.perf_counter() - start)
+    del results
+    print(f"one at a time: {serial:6.1f} jobs/s")
+
+    workers = 1
+    while workers <= max(n_cpus, 2):
+        start = time.perf_counter()
+        results = quadcolor.render_many(jobs, workers=workers)
+        rate = n_jobs / (time.perf_counter() - start)
+        same = digests(results) == expected
+        del results
+        print(f"{workers:3d} threads:   {rate:6.1f} jobs/s, speedup {rate / serial:5.2f} on {n_cpus} CPUs"
+              f"{'' if same else ', IMAGES DIFFER'}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Benchmark of writing flashcard decks to PDF: drawing the pages as images and saving them with save_images (one JPEG
+bitmap per page), against save_flashcards_pdf (each glyph embedded once and placed by reference, with vector lines
+between the flashcards). Reports the time taken and the file size for decks of several lengths.
+
+Run with: python benchmarks/bench_vector_pdf.py [max_pages]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import quadcolor
+from quadcolor.vectorpdf import save_flashcards_pdf
+
+CARDS_PER_PAGE = 8 * 4
+
+
+def main() -> None:
+    max_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    quadcolor.config.font_dict.warm_up()
+    directory = tempfile.mkdtemp()
+    raster_file, vector_file = os.path.join(directory, "raster.pdf"), os.path.join(directory, "vector.pdf")
+    print(f"decks of 2550 x 3450 pixel pages with {CARDS_PER_PAGE} flashcards each, at 300 dpi")
+    print(f"{'pages':>6s} {'raster':>22s} {'vector':>22s}")
+    n_pages = 1
+    while n_pages <= max_pages:
+        cards = [f"card {i}" for i in range(n_pages * CARDS_PER_PAGE)]
+        start = time.perf_counter()
+        quadcolor.save_images(quadcolor.iter_flashcards(cards, n_rows=8, n_columns=4), raster_file)
+        raster_time = time.perf_counter() - start
+        start = time.perf_counter()
+        save_flashcards_pdf(cards, vector_file, n_rows=8, n_columns=4)
+        vector_time = time.perf_counter() - start
+        print(f"{n_pages:6d} {raster_time:7.2f} s {os.path.getsize(raster_file) / 1e6:8.2f} MB "
+              f"{vector_time:7.2f} s {os.path.getsize(vector_file) / 1e6:8.2f} MB")
+        n_pages *= 4
+
+
+if __name__ == "__main__":
+    main()
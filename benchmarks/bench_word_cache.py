@@ -0,0 +1,60 @@
+"""
+Benchmark of drawing text with and without the cache of rendered strings (set_word_cache), for a deck in which a
+small vocabulary of words is repeated many times: draw_text alone at several font sizes, then make_flashcards
+and make_graphics with the default font.
+
+Run with: python benchmarks/bench_word_cache.py [n_cards] [vocabulary_size]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+import matplotlib
+from PIL import Image
+
+import quadcolor
+from quadcolor import drawing
+
+FONT_FILE = Path(matplotlib.get_data_path()) / "fonts" / "ttf" / "DejaVuSans.ttf"
+SIZES = [24, 60, 150]
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    n_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    vocabulary_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    random.seed(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = ["".join(random.choice(letters) for _ in range(random.randint(2, 8)))
+                  for _ in range(vocabulary_size)]
+    cards = [random.choice(vocabulary) for _ in range(n_cards)]
+    print(f"{n_cards} cards, {vocabulary_size} distinct words")
+
+    quadcolor.config.font_dict.warm_up()
+    for enabled in [False, True]:
+        quadcolor.set_word_cache(enabled=enabled)
+        flashcards_time = timed(lambda: quadcolor.make_flashcards(cards, n_rows=8, n_columns=4))
+        graphics_time = timed(lambda: quadcolor.make_graphics(cards))
+        print(f"default font, cache {'on ' if enabled else 'off'}: make_flashcards {1000 * flashcards_time:8.1f} ms, "
+              f"make_graphics {1000 * graphics_time:8.1f} ms")
+    print(quadcolor.word_cache_stats())
+
+    quadcolor.set_cache(enabled=False)
+    for size in SIZES:
+        quadcolor.set_font(str(FONT_FILE), size)
+        image = Image.new("RGB", (3000, 3 * size), (255, 255, 255))
+        times = []
+        for enabled in [False, True]:
+            quadcolor.set_word_cache(enabled=enabled)
+            times.append(timed(lambda: [drawing.draw_text(card, image, (1500, 2 * size)) for card in cards]))
+        print(f"DejaVu Sans {size:3d} px, draw_text: cache off {1000 * times[0]:8.1f} ms, "
+              f"cache on {1000 * times[1]:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
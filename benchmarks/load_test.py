@@ -0,0 +1,109 @@
+"""
+Load test of the render server (python -m quadcolor serve): sends render requests from several concurrent clients,
+each over its own keep-alive connection, and reports the p50, p90 and p99 latency, the throughput and the number of
+requests answered with each status code. The test fails (with exit status 1) if any request is answered with an
+error other than 503, so it also checks that every kind, backend and format can be rendered.
+
+Unless --port or --unix is given, a server is started for the test (with --workers and --executor) and stopped
+afterwards.
+
+Run with: python benchmarks/load_test.py [-n requests] [-c concurrency] [--kind graphics|flashcards]
+    [--backend pil|numpy|palette] [--format png|jpeg|pdf|tiff]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def client(open_connection, bodies: list, latencies: list, statuses: dict) -> None:
+    reader, writer = await open_connection()
+    for body in bodies:
+        start = time.perf_counter()
+        writer.write(f"POST /render HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == 503:
+            # back off, as the Retry-After header asks (scaled down, to keep the test short)
+            await asyncio.sleep(0.05)
+    writer.close()
+
+
+async def run(args, open_connection) -> bool:
+    if args.kind == "graphics":
+        job = dict(kind="graphics", text=["this", "is a test"], margins=[10, 10, 10, 10])
+    else:
+        job = dict(text=[f"card {i}" for i in range(8)], n_rows=4, n_columns=2, width=1275, height=1650)
+    bodies = [json.dumps(dict(job, format=args.format, backend=args.backend)).encode() for _ in range(args.requests)]
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*[client(open_connection, bodies[i::args.concurrency], latencies, statuses)
+                           for i in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    ok = statuses.get(200, 0)
+    print(f"{args.requests} {args.kind} requests ({args.backend}, {args.format}), "
+          f"{args.concurrency} concurrent clients: {elapsed:.2f} s, {ok / elapsed:.1f} successful requests/s")
+    print(f"latency p50 {1000 * percentile(latencies, 0.5):.1f} ms, p90 {1000 * percentile(latencies, 0.9):.1f} ms, "
+          f"p99 {1000 * percentile(latencies, 0.99):.1f} ms, max {1000 * max(latencies):.1f} ms")
+    print("status counts:", dict(sorted(statuses.items())))
+    return set(statuses) <= {200, 503}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test of the quadcolor render server.")
+    parser.add_argument("-n", "--requests", type=int, default=500)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--kind", choices=["graphics", "flashcards"], default="graphics")
+    parser.add_argument("--backend", choices=["pil", "numpy", "palette"], default="pil")
+    parser.add_argument("--format", choices=["png", "jpeg", "pdf", "tiff"], default="png")
+    parser.add_argument("--port", type=int, help="port of a running server (default: start one)")
+    parser.add_argument("--unix", help="Unix socket of a running server (default: start one)")
+    parser.add_argument("--workers", type=int, default=None, help="workers of the started server")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process")
+    args = parser.parse_args()
+
+    server = None
+    unix_path = args.unix
+    if args.port is None and args.unix is None:
+        unix_path = os.path.join(tempfile.mkdtemp(), "quadcolor.sock")
+        command = [sys.executable, "-m", "quadcolor", "serve", "--unix", unix_path, "--executor", args.executor]
+        if args.workers:
+            command += ["--workers", str(args.workers)]
+        server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        print(server.stdout.readline().strip())
+    try:
+        if unix_path:
+            ok = asyncio.run(run(args, lambda: asyncio.open_unix_connection(unix_path)))
+        else:
+            ok = asyncio.run(run(args, lambda: asyncio.open_connection("127.0.0.1", args.port)))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Benchmark suite for quadcolor: times the main operations of the package and records their peak memory, and can save
+the results as a baseline and compare later runs against it (for example, after upgrading Pillow or NumPy).
+
+The benchmarks are importing the package, loading the default font dictionary, making font dictionaries with
+set_font at several sizes, measuring large word lists with get_bboxes, make_graphics, make_flashcards at several grid
+sizes, and saving pages with save_images to PNG, JPEG and PDF. Each benchmark runs in a fresh Python process, so that
+its memory is measured from a clean start and it isn't helped by the caches of the benchmarks before it; the import
+benchmark uses a fresh process for every repeat. Fonts are made from the subset of DejaVu Sans in benchmarks/data
+(see LICENSE_DEJAVU there), with the on-disk font dictionary cache disabled, so the suite runs offline.
+
+For each benchmark, the minimum and median time over the repeats are reported, along with the peak memory (maximum
+resident set size) of its process and how much of that the benchmark itself added. When comparing, a benchmark
+whose minimum time (the least noisy) or added memory is more than --threshold (a fraction) above the baseline is
+reported as a regression, and the exit status is 1.
+
+Times depend on the machine, so every run also times a fixed reference workload of Pillow and NumPy pixel work that
+doesn't use quadcolor (before and after the benchmarks, keeping the lower time), and times are compared as ratios to
+the reference time of their own run. This makes a baseline from another machine (such as benchmarks/baseline.json)
+roughly comparable; for close comparisons, save a baseline on your own machine first. Memory is compared as it is.
+
+Run with: python benchmarks/suite.py [-k substring] [-n repeats] [--save results.json] [--compare baseline.json]
+"""
+import argparse
+import functools
+import importlib
+import json
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+FONT_FILE = Path(__file__).parent / "data" / "DejaVuSans-subset.ttf"
+FONT_SIZES = [24, 48, 96, 192]
+GRIDS = [(1, 1), (4, 3), (8, 4)]
+SAVE_FORMATS = ["png", "jpeg", "pdf"]
+
+# setup functions of the benchmarks, by name: each one prepares its benchmark and returns the function to be timed
+BENCHMARKS = dict()
+# names of the benchmarks that need a fresh process for every repeat
+FRESH_PROCESS = {"import quadcolor"}
+# name of the reference workload that times are divided by when comparing (see setup_reference), and the least
+# number of times it is repeated, since it is short and its minimum time has to be steady
+REFERENCE = "reference"
+REFERENCE_REPEATS = 30
+
+
+def random_words(n_words: int, seed: int = 0) -> list:
+    generator = random.Random(seed)
+    return ["".join(generator.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(generator.randint(1, 12)))
+            for _ in range(n_words)]
+
+
+def setup_reference():
+    import numpy as np
+    from PIL import Image
+    image = Image.radial_gradient("L").resize((1024, 1024)).convert("RGB")
+    mask = Image.linear_gradient("L").resize((1024, 1024))
+
+    def run():
+        page = Image.new("RGB", (1024, 1024), "white")
+        page.paste(image, (0, 0), mask)
+        return np.asarray(page).astype(np.uint16).sum(axis=2).argmax()
+    return run
+
+
+def setup_import():
+    return lambda: importlib.import_module("quadcolor")
+
+
+def setup_load_font_dict():
+    import quadcolor
+    return lambda: (quadcolor.load_font_dict(), quadcolor.config.font_dict.warm_up())
+
+
+def setup_make_font_dict(size: int):
+    import quadcolor
+    quadcolor.set_cache(enabled=False)
+    return lambda: quadcolor.set_font(str(FONT_FILE), size)
+
+
+def setup_get_bboxes(n_words: int):
+    from quadcolor import drawing
+    words = random_words(n_words)
+    return lambda: drawing.get_bboxes(words, as_arrays=True)
+
+
+def setup_make_graphics(n_words: int):
+    import quadcolor
+    quadcolor.config.font_dict.warm_up()
+    words = random_words(n_words)
+    return lambda: quadcolor.make_graphics(words, margins=(10, 10, 10, 10))
+
+
+def setup_make_flashcards(n_rows: int, n_columns: int, backend: str, n_pages: int = 4):
+    import quadcolor
+    quadcolor.config.font_dict.warm_up()
+    words = random_words(n_rows * n_columns * n_pages)
+    return lambda: quadcolor.make_flashcards(words, n_rows=n_rows, n_columns=n_columns, backend=backend)
+
+
+def setup_save_images(image_format: str):
+    import quadcolor
+    pages = quadcolor.make_flashcards(random_words(48), n_rows=4, n_columns=3)
+    directory = tempfile.TemporaryDirectory()
+    output_file = Path(directory.name) / f"deck.{image_format}"
+    single_file = image_format == "pdf"
+    # the directory is removed when the process exits, since the returned function refers to it
+    return lambda: (directory, quadcolor.save_images(pages, output_file, single_file=single_file))
+
+
+BENCHMARKS["import quadcolor"] = setup_import
+BENCHMARKS["load_font_dict"] = setup_load_font_dict
+for font_size in FONT_SIZES:
+    BENCHMARKS[f"make_font_dict[size={font_size}]"] = functools.partial(setup_make_font_dict, font_size)
+BENCHMARKS["get_bboxes[words=100000]"] = functools.partial(setup_get_bboxes, 100000)
+BENCHMARKS["make_graphics[words=200]"] = functools.partial(setup_make_graphics, 200)
+for grid_rows, grid_columns in GRIDS:
+    BENCHMARKS[f"make_flashcards[grid={grid_rows}x{grid_columns},pages=4]"] = functools.partial(
+        setup_make_flashcards, grid_rows, grid_columns, "pil")
+BENCHMARKS["make_flashcards[grid=8x4,pages=4,backend=numpy]"] = functools.partial(
+    setup_make_flashcards, 8, 4, "numpy")
+for save_format in SAVE_FORMATS:
+    BENCHMARKS[f"save_images[{save_format},pages=4]"] = functools.partial(setup_save_images, save_format)
+
+
+def max_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB (ru_maxrss is in KB on Linux and bytes on macOS)."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1 << 20) if sys.platform == "darwin" else max_rss / (1 << 10)
+
+
+def run_in_this_process(name: str, n_repeats: int) -> dict:
+    """Run one benchmark in this process, returning its times and memory."""
+    run = setup_reference() if name == REFERENCE else BENCHMARKS[name]()
+    before = max_rss_mb()
+    times = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    peak = max_rss_mb()
+    return dict(times=times, peak_mb=peak, added_mb=peak - before)
+
+
+def run_benchmark(name: str, n_repeats: int) -> dict:
+    """Run one benchmark in fresh processes, returning a summary of its times and memory."""
+    n_processes, repeats_per_process = (n_repeats, 1) if name in FRESH_PROCESS else (1, n_repeats)
+    runs = []
+    for _ in range(n_processes):
+        output = subprocess.run([sys.executable, __file__, "--child", name, "-n", str(repeats_per_process)],
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output))
+    times = [seconds for result in runs for seconds in result["times"]]
+    return dict(min=min(times), median=statistics.median(times),
+                peak_mb=max(result["peak_mb"] for result in runs),
+                added_mb=statistics.median(result["added_mb"] for result in runs))
+
+
+def environment() -> dict:
+    """Versions of the things that affect the results."""
+    import numpy
+    import PIL
+    return dict(python=platform.python_version(), pillow=PIL.__version__, numpy=numpy.__version__,
+                platform=platform.platform(), machine=platform.machine())
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> int:
+    """Print each benchmark's ratios to the baseline, returning the number of regressions."""
+    if baseline.get("environment") != results["environment"]:
+        print("note: the baseline was recorded with", baseline.get("environment"))
+    # times are compared relative to the reference workload of each run, if the baseline has one
+    speed = 1
+    if REFERENCE in baseline:
+        speed = results[REFERENCE] / baseline[REFERENCE]
+        print(f"reference workload: {speed:.2f} times the baseline's time, which the time ratios are divided by")
+    else:
+        print("note: the baseline has no reference time, so its absolute times are compared")
+    n_regressions = 0
+    print(f"\n{'benchmark':52s} {'time':>8s} {'memory':>8s}  (ratio to baseline)")
+    for name, result in results["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if base is None:
+            print(f"{name:52s} {'(no baseline)':>17s}")
+            continue
+        time_ratio = result["min"] / base["min"] / speed
+        # tiny amounts of added memory are noise, so they are compared with at least 1 MB
+        memory_ratio = max(result["added_mb"], 1) / max(base["added_mb"], 1)
+        regressed = time_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        n_regressions += regressed
+        print(f"{name:52s} {time_ratio:8.2f} {memory_ratio:8.2f}{'  REGRESSION' if regressed else ''}")
+    return n_regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark suite for quadcolor.")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose names contain this")
+    parser.add_argument("-n", "--repeats", type=int, default=5, help="repeats of each benchmark (default: 5)")
+    parser.add_argument("--save", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare the results with a baseline saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fraction above the baseline that counts as a regression (default: 0.2)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_in_this_process(args.child, args.repeats)))
+        return
+
+    results = dict(environment=environment(), repeats=args.repeats, benchmarks=dict())
+    results[REFERENCE] = run_benchmark(REFERENCE, max(args.repeats, REFERENCE_REPEATS))["min"]
+    print(f"reference workload: {1000 * results[REFERENCE]:.1f} ms")
+    print(f"{'benchmark':52s} {'min':>10s} {'median':>10s} {'peak':>9s} {'added':>9s}")
+    for name in BENCHMARKS:
+        if args.filter not in name:
+            continue
+        result = run_benchmark(name, args.repeats)
+        results["benchmarks"][name] = result
+        print(f"{name:52s} {1000 * result['min']:7.1f} ms {1000 * result['median']:7.1f} ms "
+              f"{result['peak_mb']:6.0f} MB {result['added_mb']:6.0f} MB", flush=True)
+
+    # timed again at the end, so that a slow spell at the start of the run doesn't skew the comparison
+    results[REFERENCE] = min(results[REFERENCE], run_benchmark(REFERENCE, max(args.repeats, REFERENCE_REPEATS))["min"])
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2) + "\n")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
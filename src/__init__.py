@@ -4,20 +4,55 @@ The quadcolor package is used to draw and save images of four color letters.
 The most important functions that it exports are:
     make_graphics: draw colored letters in images whose dimensions are determined by the size of the text.
     make_flashcards: draw colored letters in equal-sized images whose size is set by the user.
+    make_array: draw colored letters into one (N, height, width, 3) uint8 array of equal-sized images (or a
+        memory-mapped .npy file), as for a dataset.
+    iter_flashcards: draw the same images as make_flashcards, one at a time (for saving long decks).
+    render_many: draw the images of several make_graphics and make_flashcards calls at once, in a pool of threads.
     get_flashcard_size: compute minimum width and height needed for flashcards for the given text.
+    plan_flashcards: work out where the strings of a deck go on its pages, on a given grid, on the densest grid
+        that they fit on, or in packed rows of cards of different widths (as make_flashcards does with its layout
+        argument).
+    iter_document: draw a long text (such as a reading passage or a whole book, from a string, file or iterator)
+        on pages, wrapping its words to the width of the page, one page at a time.
+    wrap_text: wrap a text into lines no wider than a given width, as iter_document does.
     display_images: show generated images of colored letters on screen.
-    save_images: save generated images of colored letters to one or more files.
+    save_images: save generated images of colored letters to one or more files (or a zip or tar archive),
+        optionally encoding them in several threads or processes at once.
+    encode_images: encode generated images in memory, optionally several at once.
+    encode_pages: encode generated images in memory as the pages of one PDF or TIFF file.
+    save_flashcards: draw and save the pages of make_flashcards, drawing and writing only the pages that changed since
+        the deck was last saved (see the incremental module).
+    save_flashcards_pdf: write the flashcards of make_flashcards straight to a small PDF file, with each glyph
+        embedded once instead of a bitmap of every page.
     set_font: set the font used for the drawn letters.
     set_colors: set the colors used for the drawn letters.
     set_parameters: set other parameters used for drawing letters.
+    set_cache: configure the on-disk cache of font dictionaries made by the three functions above.
+    set_build_workers: draw the characters of font dictionaries in parallel.
+    set_word_cache, word_cache_stats: configure and inspect the cache of rendered strings of letters.
+    recording: record the time taken by each stage of drawing and saving images, and counts of the work done, in
+        a context manager (see the instrument module).
+    make_quadfont: make a QuadFont, an immutable font and style that can be passed to the drawing functions (with
+        their quadfont argument) instead of changing the global settings, for example to draw with several fonts or
+        palettes at once.
 
 It also exports the load_font_dict function, which is used to load the default font dictionary when the
-package loads. This function probably won't usually be needed by the user.
+package loads. This function probably won't usually be needed by the user. The default font dictionary only
+decodes the images of a letter when that letter is first drawn; to decode some letters ahead of time (for example,
+in a worker process before it starts taking jobs), use config.font_dict.warm_up() or the preload argument of
+load_font_dict.
 """
 from .config import load_font_dict
-from .output import display_images, save_images
-from .main import make_graphics, make_flashcards, get_flashcard_size
-from .settings import set_font, set_colors, set_parameters
+from .output import display_images, save_images, encode_images, encode_pages
+from .main import make_graphics, make_array, make_flashcards, iter_flashcards, get_flashcard_size, render_many
+from .settings import set_font, set_colors, set_parameters, set_cache, set_build_workers, \
+    set_word_cache, word_cache_stats
+from .quadfont import QuadFont, make_quadfont, current_quadfont, use_quadfont
+from .instrument import recording
+from .vectorpdf import save_flashcards_pdf
+from .planner import plan_flashcards
+from .document import iter_document, wrap_text
+from .incremental import save_flashcards
 
 # use this if you'd like to remake the default font dictionary
 # from . import dev
@@ -0,0 +1,8 @@
+import sys
+
+if len(sys.argv) > 1 and sys.argv[1] == "serve":
+    from .server import main
+    main(sys.argv[2:])
+else:
+    from .batch import main
+    main()
@@ -0,0 +1,149 @@
+"""
+The atlas module contains functions for storing a font dictionary as a packed glyph atlas.
+
+An atlas consists of two files:
+
+sheet: a single lossless grayscale image (.png) or raw uint8 array (.npy) holding four planes of the same
+    height and width, stacked vertically: the red, green and blue channels of the quadrants images, then the masks.
+    The glyphs are packed in rows, at the same position in each plane.
+index: a json file giving, for each character, the rectangle [x, y, width, height] that its glyph occupies in the
+    sheet, along with the rest of its ColoredChar fields (x_divide, y_divide, width, top_coord, bottom_coord, and
+    colors and truncate_coord for the glyphs that don't keep a quadrants image, whose red, green and blue planes
+    are left empty).
+
+The whole sheet is read with one open, and glyphs are sliced out of it as numpy views. A .npy sheet is memory-mapped
+when it is a file on disk, so that only the pages holding the glyphs that are actually drawn are ever read.
+"""
+import io
+import json
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+from .lazyfontdict import LazyFontDict
+
+ATLAS_VERSION = 2
+
+
+def pack_rectangles(sizes: list, max_width: int = 2048) -> (list, int, int):
+    """
+    Pack rectangles of the given sizes into rows (shelves) no wider than max_width.
+
+    :param sizes: List of (width, height) tuples of int.
+    :param max_width: Maximum width of a row, in pixels (a wider rectangle gets a row of its own).
+    :return: A tuple of a list of (x, y) positions for the rectangles, the total width and the total height.
+    """
+    positions = []
+    x, y, row_height, total_width = 0, 0, 0, 0
+    for width, height in sizes:
+        if x > 0 and x + width > max_width:
+            y += row_height
+            x, row_height = 0, 0
+        positions.append((x, y))
+        x += width
+        row_height = max(row_height, height)
+        total_width = max(total_width, x)
+    return positions, total_width, y + row_height
+
+
+def make_atlas(font_dict, max_width: int = 2048) -> (np.ndarray, dict):
+    """
+    Pack the masks and quadrants images of a font dictionary into a single RGBA array.
+
+    :param font_dict: A font dictionary (such as config.font_dict) whose entries are ColoredChar objects.
+    :param max_width: Maximum width of the sheet, in pixels.
+    :return: A tuple of the (4, height, width) uint8 sheet and the index dictionary to be saved with it.
+    """
+    # packing the tallest glyphs first wastes less space at the tops of the rows
+    keys = sorted(font_dict.keys(), key=lambda key: font_dict[key].mask.size[1], reverse=True)
+    sizes = [font_dict[key].mask.size for key in keys]
+    positions, sheet_width, sheet_height = pack_rectangles(sizes, max_width=max_width)
+
+    sheet = np.zeros((4, sheet_height, sheet_width), dtype=np.uint8)
+    glyphs = dict()
+    for key, (x, y), (width, height) in zip(keys, positions, sizes):
+        colored_char = font_dict[key]
+        sheet[3, y:y + height, x:x + width] = np.asarray(colored_char.mask.convert("L"))
+        glyphs[key] = dict(rect=[x, y, width, height],
+                           x_divide=colored_char.x_divide, y_divide=colored_char.y_divide,
+                           width=colored_char.width, top_coord=colored_char.top_coord,
+                           bottom_coord=colored_char.bottom_coord)
+        if colored_char.colors is None:
+            sheet[:3, y:y + height, x:x + width] = np.asarray(colored_char.quadrants.convert("RGB")).transpose(2, 0, 1)
+        else:
+            glyphs[key].update(colors=colored_char.colors, truncate_coord=colored_char.truncate_coord)
+    return sheet, dict(version=ATLAS_VERSION, glyphs=glyphs)
+
+
+def save_atlas(font_dict, sheet_file, index_file, max_width: int = 2048) -> None:
+    """
+    Save a font dictionary as an atlas sheet file and an index file.
+
+    :param font_dict: A font dictionary (such as config.font_dict) whose entries are ColoredChar objects.
+    :param sheet_file: Filename of the sheet, ending in .png (compressed) or .npy (memory-mappable).
+    :param index_file: Filename of the json index.
+    :param max_width: Maximum width of the sheet, in pixels.
+    :return: None.
+    """
+    sheet_file = Path(sheet_file)
+    sheet, index = make_atlas(font_dict, max_width=max_width)
+    index["sheet"] = sheet_file.name
+    if sheet_file.suffix == ".npy":
+        np.save(sheet_file, sheet)
+    else:
+        Image.fromarray(sheet.reshape(-1, sheet.shape[2])).save(sheet_file, optimize=True)
+    with open(index_file, "w") as file:
+        json.dump(index, file)
+
+
+def read_sheet(data: bytes, suffix: str) -> np.ndarray:
+    """Decode the bytes of an atlas sheet file (.png or .npy) into a (4, height, width) uint8 array."""
+    if suffix == ".npy":
+        return np.load(io.BytesIO(data))
+    with Image.open(io.BytesIO(data)) as image:
+        planes = np.asarray(image)
+    return planes.reshape(4, -1, planes.shape[1])
+
+
+def map_sheet(sheet_file) -> np.ndarray:
+    """Open an atlas sheet file on disk, memory-mapping it if it is a .npy file."""
+    sheet_file = Path(sheet_file)
+    if sheet_file.suffix == ".npy":
+        return np.load(sheet_file, mmap_mode="r")
+    return read_sheet(sheet_file.read_bytes(), sheet_file.suffix)
+
+
+def load_atlas(index: dict, load_sheet) -> LazyFontDict:
+    """
+    Make a font dictionary from an atlas.
+
+    The sheet is only loaded (by calling load_sheet) when the first glyph is needed, and each glyph's images are
+    only made when that glyph is first looked up.
+    :param index: The dictionary stored in the atlas index file.
+    :param load_sheet: A function of no arguments that returns the sheet as a (4, height, width) uint8 array.
+    :return: A LazyFontDict containing the glyphs of the atlas.
+    """
+    sheet = None
+    metadata = dict()
+    rects = dict()
+    for key, value in index["glyphs"].items():
+        value = dict(value)
+        rects[key] = value.pop("rect")
+        if "colors" in value:
+            # json has no tuples, and Pillow only takes colors as tuples (or strings)
+            value["colors"] = tuple(tuple(color) if isinstance(color, list) else color for color in value["colors"])
+        metadata[key] = value
+
+    def load_images(key: chr) -> (Image.Image, Image.Image):
+        nonlocal sheet
+        if sheet is None:
+            sheet = load_sheet()
+        x, y, width, height = rects[key]
+        glyph = sheet[:, y:y + height, x:x + width]
+        mask = Image.fromarray(np.ascontiguousarray(glyph[3]))
+        if "colors" in metadata[key]:
+            return mask, None
+        quadrants = Image.fromarray(np.dstack(glyph[:3]))
+        return mask, quadrants
+
+    return LazyFontDict(metadata, load_images)
@@ -0,0 +1,332 @@
+"""
+The batch module runs a manifest of rendering jobs from the command line, as python -m quadcolor manifest.jsonl
+(python -m quadcolor serve runs the render server instead; see the server module).
+
+A manifest is either a JSON lines file, with one job object per line, or a CSV file with a header row, with one
+job per row. Each job has the following fields (only text and output are required):
+
+    kind: "flashcards" (the default) or "graphics", for make_flashcards or make_graphics.
+    text: list of strings to draw (in a CSV file, either a JSON list or the strings separated by "|").
+    output: output filename, as for save_images (relative to the manifest's directory).
+    n_rows, n_columns, width, height, margins, bg_color, boundary_color, x_offset, y_offset, backend, layout,
+        padding: as for make_flashcards (only margins, bg_color and backend apply to graphics).
+    single_file, dpi: as for save_images.
+    font, font_size: font filename (relative to the manifest's directory, or as found by ImageFont.truetype) and
+        size in pixels, as for set_font. If no font is given, the default font is used.
+    ul, ur, ll, lr, non: colors, as for set_colors.
+    a_height, characters_to_color, font_characters: as for set_parameters.
+
+In a CSV file, empty cells are ignored. Cells of the numeric, boolean, list and color fields that are valid JSON
+are decoded; the text, filename and other string fields are kept as strings (text is only decoded if it starts
+with "[", so that a text such as 123 is drawn as it is).
+
+The jobs are run by a pool of worker processes. Each distinct font configuration (font, size, colors and
+parameters) is made into a QuadFont once, before the workers start, and is kept for every job that uses it: workers
+that are started by forking inherit them, and otherwise each worker makes a configuration the first time it needs
+it (loading it from the on-disk cache of font dictionaries, if that is enabled; see the fontcache module). The
+global configuration is not changed.
+
+A job is skipped if its output files exist and it hasn't changed since they were written. This is checked
+against a state file next to the manifest (manifest.jsonl.state.json, for example), which records a hash of each
+job (including the size and modification time of its font file) and the files it wrote.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+import hashlib
+import inspect
+import json
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+import PIL
+
+from .main import make_graphics, iter_flashcards
+from .output import save_images
+from .quadfont import QuadFont, current_quadfont, make_quadfont
+from .settings import set_parameters
+
+FONT_FIELDS = ("font", "font_size", "ul", "ur", "ll", "lr", "non", "a_height", "characters_to_color",
+               "font_characters")
+FLASHCARD_FIELDS = ("n_rows", "n_columns", "width", "height", "margins", "bg_color", "boundary_color",
+                    "x_offset", "y_offset", "backend", "layout", "padding")
+GRAPHICS_FIELDS = ("margins", "bg_color", "backend")
+SAVE_FIELDS = ("single_file", "dpi")
+# fields whose values are tuples (JSON only has lists)
+TUPLE_FIELDS = ("margins", "bg_color", "boundary_color", "ul", "ur", "ll", "lr", "non")
+JOB_FIELDS = ("kind", "text", "output") + FONT_FIELDS + FLASHCARD_FIELDS + SAVE_FIELDS
+# fields whose values are strings, so that CSV cells for them aren't decoded as JSON (the parameters of
+# set_parameters are taken from its signature, so that they stay in step with it)
+STRING_FIELDS = ("kind", "text", "output", "font", "backend", "layout") + tuple(
+    name for name, parameter in inspect.signature(set_parameters).parameters.items() if parameter.annotation is str)
+
+# the QuadFont of each font configuration that has been made, by font_key
+_quadfonts: dict = dict()
+
+
+class ManifestError(Exception):
+    """
+    Error for handling a manifest file or job that can't be read.
+    """
+    pass
+
+
+def read_manifest(manifest_file) -> list:
+    """
+    Read the jobs in a manifest file (see the module docstring for its format).
+
+    Relative output and font filenames are resolved relative to the manifest's directory, and list values are
+    converted to tuples where the quadcolor functions expect them.
+    :param manifest_file: Filename of the manifest (a .csv file, or JSON lines otherwise).
+    :return: List of job dicts.
+    """
+    manifest_file = Path(manifest_file)
+    with open(manifest_file, newline="", encoding="utf-8") as file:
+        if manifest_file.suffix.lower() == ".csv":
+            rows = [{name: _decode_cell(name, value) for name, value in row.items() if name and value}
+                    for row in csv.DictReader(file)]
+        else:
+            rows = []
+            for line_number, line in enumerate(file, start=1):
+                if line.strip():
+                    try:
+                        rows.append(json.loads(line))
+                    except json.JSONDecodeError as error:
+                        raise ManifestError(f"{manifest_file}, line {line_number}: {error}") from None
+    return [normalize_job(row, manifest_file.parent, f"Job {number}") for number, row in enumerate(rows, start=1)]
+
+
+def _decode_cell(name: str, value: str):
+    if name in STRING_FIELDS and not (name == "text" and value.startswith("[")):
+        return value
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+def normalize_job(job: dict, directory=".", name: str = "The job", output_required: bool = True) -> dict:
+    """
+    Check the fields of a job and convert them to the types the quadcolor functions expect.
+
+    :param job: A job, as decoded from JSON (see the module docstring for its fields).
+    :param directory: Directory relative to which the output and font filenames are resolved.
+    :param name: How to refer to the job in error messages.
+    :param output_required: Must the job have an output field?
+    :return: The normalized job, as a new dict.
+    """
+    if not isinstance(job, dict):
+        raise ManifestError(f"{name} is not an object.")
+    unknown = set(job) - set(JOB_FIELDS)
+    if unknown:
+        raise ManifestError(f"{name} has unknown fields: {', '.join(sorted(unknown))}.")
+    for field in ("text", "output") if output_required else ("text",):
+        if field not in job:
+            raise ManifestError(f"{name} has no {field} field.")
+    directory = Path(directory)
+    job = dict(job)
+    job.setdefault("kind", "flashcards")
+    if job["kind"] not in ("flashcards", "graphics"):
+        raise ManifestError(f"{name} has kind {job['kind']!r}, which must be flashcards or graphics.")
+    if isinstance(job["text"], str):
+        job["text"] = job["text"].split("|")
+    if not isinstance(job["text"], list):
+        raise ManifestError(f"{name} has text that is not a list of strings.")
+    job["text"] = [str(text) for text in job["text"]]
+    if "output" in job:
+        job["output"] = str(directory / job["output"])
+    if "font" in job:
+        if "font_size" not in job:
+            raise ManifestError(f"{name} has a font but no font_size.")
+        if (directory / job["font"]).exists():
+            job["font"] = str(directory / job["font"])
+    elif any(field in job for field in FONT_FIELDS):
+        raise ManifestError(f"{name} sets colors or parameters of the default font, which can't be "
+                            "modified. Give a font to change them.")
+    for field in TUPLE_FIELDS:
+        if isinstance(job.get(field), list):
+            job[field] = tuple(job[field])
+    return job
+
+
+def font_key(job: dict) -> str:
+    """Return a str identifying the font configuration of a job (equal for jobs that can share a font dictionary)."""
+    return json.dumps({field: job[field] for field in FONT_FIELDS if field in job}, sort_keys=True)
+
+
+def job_digest(job: dict) -> str:
+    """
+    Compute a hash of everything that determines a job's output files.
+
+    :param job: A job dict, from read_manifest.
+    :return: A hex str.
+    """
+    stamp = dict(job, pillow_version=PIL.__version__)
+    if "font" in job and os.path.exists(job["font"]):
+        stat = os.stat(job["font"])
+        stamp["font_file"] = [stat.st_size, stat.st_mtime_ns]
+    return hashlib.sha256(json.dumps(stamp, sort_keys=True).encode()).hexdigest()
+
+
+def get_quadfont(job: dict) -> QuadFont:
+    """
+    Get the QuadFont of the font configuration of a job, making it if it hasn't been made yet.
+
+    :param job: A job dict, from normalize_job.
+    :return: The QuadFont (the default configuration, if the job doesn't give a font).
+    """
+    key = font_key(job)
+    if key not in _quadfonts:
+        _quadfonts[key] = make_quadfont(job["font"], job["font_size"],
+                                        **{field: job[field] for field in FONT_FIELDS[2:] if field in job})
+    return _quadfonts[key]
+
+
+def make_images(job: dict):
+    """
+    Draw the images of a job, with the QuadFont of its font configuration.
+
+    :param job: A job dict, from normalize_job.
+    :return: List of Image.Image's for graphics, or an iterator of them (one per page) for flashcards.
+    """
+    quadfont = get_quadfont(job)
+    if job["kind"] == "graphics":
+        return make_graphics(job["text"], quadfont=quadfont,
+                             **{field: job[field] for field in GRAPHICS_FIELDS if field in job})
+    return iter_flashcards(job["text"], quadfont=quadfont,
+                           **{field: job[field] for field in FLASHCARD_FIELDS if field in job})
+
+
+def run_job(job: dict) -> list:
+    """
+    Draw and save the images of a job.
+
+    :param job: A job dict, from read_manifest.
+    :return: List of the filenames written.
+    """
+    images = make_images(job)
+    Path(job["output"]).parent.mkdir(parents=True, exist_ok=True)
+    save_args = {field: job[field] for field in SAVE_FIELDS if field in job}
+    return [str(path) for path in save_images(images, job["output"], **save_args)]
+
+
+def _timed_run_job(job: dict) -> (list, float):
+    start = time.perf_counter()
+    return run_job(job), time.perf_counter() - start
+
+
+def remember_default_config() -> None:
+    """
+    Record the global configuration as the one used by jobs that don't give a font.
+
+    This is called before running jobs. It is also the initializer of worker processes, since one that wasn't
+    forked starts with the configuration the package was loaded with.
+    """
+    _quadfonts.setdefault(font_key(dict()), current_quadfont())
+
+
+def _load_state(state_file: Path) -> dict:
+    try:
+        with open(state_file, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return dict()
+
+
+def _save_state(state: dict, state_file: Path) -> None:
+    with tempfile.NamedTemporaryFile("w", dir=state_file.parent, suffix=".tmp", delete=False,
+                                     encoding="utf-8") as file:
+        json.dump(state, file, indent=1, sort_keys=True)
+    os.replace(file.name, state_file)
+
+
+def is_up_to_date(job: dict, state: dict) -> bool:
+    """Are the output files recorded in state for this job all present, and was the job unchanged since then?"""
+    entry = state.get(job["output"])
+    return (entry is not None and entry["digest"] == job_digest(job) and bool(entry["files"])
+            and all(os.path.exists(file) for file in entry["files"]))
+
+
+def run_batch(manifest_file, workers: int = None, force: bool = False, log=sys.stdout) -> int:
+    """
+    Run the jobs in a manifest file, skipping those whose outputs are up to date.
+
+    :param manifest_file: Filename of the manifest (see the module docstring for its format).
+    :param workers: Number of worker processes (None means one per CPU, and 0 or 1 means to run the jobs in
+        this process).
+    :param force: Should jobs be run even if their outputs are up to date?
+    :param log: File to which a line is written for each job.
+    :return: The number of jobs that failed.
+    """
+    manifest_file = Path(manifest_file)
+    state_file = manifest_file.with_name(manifest_file.name + ".state.json")
+    jobs = read_manifest(manifest_file)
+    state = _load_state(state_file)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    remember_default_config()
+    pending = []
+    for job in jobs:
+        if not force and is_up_to_date(job, state):
+            print(f"up to date: {job['output']}", file=log)
+        else:
+            pending.append(job)
+    # jobs with the same font configuration are run together, and each configuration is made once, up front
+    pending.sort(key=font_key)
+
+    for job in pending:
+        try:
+            get_quadfont(job)
+        except Exception:
+            # the job will fail again when it is run, and be reported then
+            pass
+
+    n_failed = 0
+
+    def finish(job: dict, result) -> None:
+        nonlocal n_failed
+        if isinstance(result, Exception):
+            n_failed += 1
+            state.pop(job["output"], None)
+            print(f"failed: {job['output']}: {type(result).__name__}: {result}", file=log)
+        else:
+            files, seconds = result
+            state[job["output"]] = dict(digest=job_digest(job), files=files)
+            print(f"done: {job['output']} ({seconds:.2f} s)", file=log)
+        # the state is saved after every job, so an interrupted batch doesn't redo the jobs it finished
+        _save_state(state, state_file)
+
+    if workers <= 1 or len(pending) <= 1:
+        for job in pending:
+            try:
+                result = _timed_run_job(job)
+            except Exception as error:
+                result = error
+            finish(job, result)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                 initializer=remember_default_config) as pool:
+            futures = {pool.submit(_timed_run_job, job): job for job in pending}
+            for future in as_completed(futures):
+                finish(futures[future], future.exception() or future.result())
+    return n_failed
+
+
+def main(argv: list = None) -> None:
+    """Command line entry point (python -m quadcolor)."""
+    parser = argparse.ArgumentParser(prog="python -m quadcolor",
+                                     description="Render the jobs in a manifest of quadcolor jobs, skipping "
+                                                 "those whose outputs are up to date.")
+    parser.add_argument("manifest", help="JSON lines (.jsonl) or CSV (.csv) file with one job per line or row")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of worker processes (default: one per CPU; 0 or 1 runs jobs in this process)")
+    parser.add_argument("-f", "--force", action="store_true", help="run jobs even if their outputs are up to date")
+    args = parser.parse_args(argv)
+    try:
+        n_failed = run_batch(args.manifest, workers=args.workers, force=args.force)
+    except (OSError, ManifestError) as error:
+        parser.exit(2, f"{parser.prog}: error: {error}\n")
+    sys.exit(1 if n_failed else 0)
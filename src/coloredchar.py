@@ -2,7 +2,6 @@ from dataclasses import dataclass
 from PIL import Image
 
 
-@dataclass
 class ColoredChar:
     """
     All information needed to render a (colored or uncolored) character.
@@ -14,16 +13,158 @@ class ColoredChar:
     width: the width of the mask and quadrants.
     top_coord: the top coordinate of the mask and quadrants.
     bottom_coord: the bottom coordinate of the mask and quadrants.
+    colors: the colors of the quadrants: a tuple of the upper left, upper right, lower left and lower right colors
+        of a colored character, or a tuple of the one color of an uncolored character (None if the ColoredChar was
+        made with a quadrants image).
+    truncate_coord: the y coordinate down to which the top of a colored, substituted "a" is whited out, or None.
 
     The baseline of the character in the mask has y coordinate 0. The top and bottom coordinates are relative to
     this (with Pillow's convention of increasing y coordinates as one goes downwards on screen).
 
+    A ColoredChar made from colors keeps only its mask as an image, and makes the quadrants image each time it is
+    asked for (paint draws the quadrants into another image without making it). Pillow stores RGB images with four
+    bytes per pixel, so this takes about a fifth of the memory of keeping the quadrants image. The characters of
+    the default font are loaded with their quadrants images, which are kept as they are.
+
     The main use for this class is as an entry in config.font_dict.
     """
+    __slots__ = ("mask", "_quadrants", "x_divide", "y_divide", "width", "top_coord", "bottom_coord", "colors",
+                 "truncate_coord")
+
+    def __init__(self, mask: Image.Image, quadrants: Image.Image, x_divide: int, y_divide: int, width: int,
+                 top_coord: int, bottom_coord: int, colors: tuple = None, truncate_coord: int = None) -> None:
+        if quadrants is None and colors is None:
+            raise ValueError("A ColoredChar needs either a quadrants image or the colors of its quadrants.")
+        self.mask = mask
+        self._quadrants = quadrants
+        self.x_divide = x_divide
+        self.y_divide = y_divide
+        self.width = width
+        self.top_coord = top_coord
+        self.bottom_coord = bottom_coord
+        self.colors = colors
+        self.truncate_coord = truncate_coord
+
+    def __repr__(self) -> str:
+        return (f"ColoredChar(size={self.mask.size}, x_divide={self.x_divide}, y_divide={self.y_divide}, "
+                f"width={self.width}, top_coord={self.top_coord}, bottom_coord={self.bottom_coord}, "
+                f"colors={self.colors}, truncate_coord={self.truncate_coord})")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ColoredChar):
+            return NotImplemented
+        return ((self.x_divide, self.y_divide, self.width, self.top_coord, self.bottom_coord) ==
+                (other.x_divide, other.y_divide, other.width, other.top_coord, other.bottom_coord) and
+                self.mask == other.mask and self.quadrants == other.quadrants)
+
+    __hash__ = None
+
+    @property
+    def quadrants(self) -> Image.Image:
+        """The quadrants image (made from the colors, if it isn't kept)."""
+        if self._quadrants is not None:
+            return self._quadrants
+        if len(self.colors) == 1:
+            return Image.new("RGB", self.mask.size, self.colors[0])
+        quadrants = Image.new("RGB", self.mask.size)
+        self.paint(quadrants)
+        return quadrants
+
+    @property
+    def n_bytes(self) -> int:
+        """Approximate memory used by the images."""
+        width, height = self.mask.size
+        return width * height * (1 if self._quadrants is None else 5)
+
+    def paint(self, image: Image.Image, position=(0, 0)) -> None:
+        """
+        Paint the quadrants into an RGB image, as image.paste(self.quadrants, position) would.
+
+        :param image: The image to paint in.
+        :param position: (x, y) tuple of int giving the position in the image of the upper left corner of the mask.
+        :return: None.
+        """
+        if self._quadrants is not None:
+            image.paste(self._quadrants, position)
+            return
+        x, y = position
+        for color, (left, top, right, bottom) in self._color_boxes():
+            image.paste(color, (x + left, y + top, x + right, y + bottom))
+
+    def resized(self, scale: float):
+        """
+        Make a copy of this ColoredChar resized by the given factor, as for a smaller (or larger) font.
+
+        The coordinates are scaled and rounded, the mask is resampled with a Lanczos filter, and a quadrants image
+        (if it is kept) is resampled with the nearest pixels, so that its colors stay the same.
+        :param scale: The factor to resize by.
+        :return: The resized ColoredChar.
+        """
+        top_coord, bottom_coord = round(self.top_coord * scale), round(self.bottom_coord * scale)
+        size = (round(self.mask.size[0] * scale), bottom_coord - top_coord)
+
+        def resample(image: Image.Image, method: int) -> Image.Image:
+            if 0 in image.size or 0 in size:
+                return Image.new(image.mode, size)
+            return image.resize(size, method)
+
+        quadrants = None if self._quadrants is None else resample(self._quadrants, Image.NEAREST)
+        truncate_coord = None if self.truncate_coord is None else round(self.truncate_coord * scale)
+        return ColoredChar(mask=resample(self.mask, Image.LANCZOS), quadrants=quadrants,
+                           x_divide=round(self.x_divide * scale), y_divide=round(self.y_divide * scale),
+                           width=round(self.width * scale), top_coord=top_coord, bottom_coord=bottom_coord,
+                           colors=self.colors, truncate_coord=truncate_coord)
+
+    def _color_boxes(self) -> list:
+        """
+        The (color, box) pairs that make up the quadrants image, in boxes that don't overlap.
+
+        The quadrants are rectangles that include their right and bottom edges (as ImageDraw draws them), with the
+        right quadrants over the left ones and the lower quadrants over the upper ones, so they are clipped here.
+        """
+        width, height = self.mask.size
+        if len(self.colors) == 1:
+            return [(self.colors[0], (0, 0, width, height))]
+        # where the right and lower quadrants start, relative to the upper left corner of the mask (x_divide is the
+        # midpoint of the left and right coordinates, rounded down)
+        x_divide = min(width, self.width // 2)
+        y_divide = max(0, min(height, self.y_divide - self.top_coord))
+        top = 0
+        boxes = []
+        if self.truncate_coord is not None:
+            top = max(0, min(height, self.truncate_coord - self.top_coord + 1))
+            boxes.append(((255, 255, 255), (0, 0, width, top)))
+        y_divide = max(top, y_divide)
+        ul_color, ur_color, ll_color, lr_color = self.colors
+        boxes += [(ul_color, (0, top, x_divide, y_divide)), (ur_color, (x_divide, top, width, y_divide)),
+                  (ll_color, (0, y_divide, x_divide, height)), (lr_color, (x_divide, y_divide, width, height))]
+        return [(color, box) for color, box in boxes if box[2] > box[0] and box[3] > box[1]]
+
+
+@dataclass
+class Glyph:
+    """
+    A rasterized character, before any coloring is applied.
+
+    mask: an image that is white where the character appears and black elsewhere (with gray possible as well).
+    x_divide: x coordinate that separates the two left quadrants from the two right quadrants.
+    y_divide: y coordinate that separates the two upper quadrants from the two lower quadrants.
+    width: the width of the mask.
+    left_coord: the left coordinate of the mask.
+    top_coord: the top coordinate of the mask.
+    bottom_coord: the bottom coordinate of the mask.
+    drawn_char: the character actually drawn in the mask (a "d" for an "a" that is substituted with a truncated "d").
+    truncate_coord: the y coordinate down to which the top of a substituted "a" is whited out, or None.
+
+    Coordinates are relative to the baseline, as in ColoredChar. Glyphs are kept in config.glyphs, so that the
+    colors of config.font_dict can be changed without drawing the characters again.
+    """
     mask: Image.Image
-    quadrants: Image.Image
     x_divide: int
     y_divide: int
     width: int
+    left_coord: int
     top_coord: int
     bottom_coord: int
+    drawn_char: chr
+    truncate_coord: int = None
@@ -2,24 +2,41 @@
 The config module contains several global variables for the quadcolor package:
 
 font_dict: a dictionary containing colored letters, set (behind the scenes) by calling font_dict.make_font_dict()
+    (for the default font, this is a LazyFontDict that decodes each letter's images when it is first needed)
+glyphs: a dictionary of the uncolored Glyphs that font_dict was made from, so that it can be recolored cheaply
 font: an ImageFont.FreeTypeFont that can be set by the user with settings.set_font()
+pixel_size: the size in pixels of the letters of font_dict when it wasn't made from font (None means
+    default_font_size, the size that the package's default font was drawn at)
 ul_color, ur_color, ll_color, lr_color, non_color: RGB color triples set by the user with settings.set_colors()
 substitute_a, to_color, characters: parameters for coloring letters set by the user with settings.set_parameters()
+cache_enabled, cache_dir, cache_max_bytes: settings of the on-disk font dictionary cache, set with settings.set_cache()
+build_workers, build_executor: how many workers (and what kind) draw the characters of font_dict, set with
+    settings.set_build_workers()
+word_cache_enabled: whether drawing.draw_text keeps rendered strings in wordcache.word_cache, set with
+    settings.set_word_cache()
 
 Also, the module contains the function load_font_dict(), which is used to load the default font dictionary into
 font_dict when the package is loaded. This is necessary since there is no guarantee what fonts any particular
 computer will have.
+
+The font, colors and parameters above are the global configuration, which the drawing functions use unless they are
+given a QuadFont (see the quadfont module), an immutable object that holds the same things.
 """
+from collections.abc import Mapping
 import io
 import json
+import os
 from pathlib import Path
 from PIL import Image, ImageFont
 import pkgutil
 
-from .coloredchar import ColoredChar
+from . import atlas
+from .lazyfontdict import LazyFontDict
 
-font_dict: dict = dict()
+font_dict: Mapping = dict()
+glyphs: dict = dict()
 font: ImageFont.FreeTypeFont = None
+pixel_size: int = None
 ul_color: tuple = (255, 0, 0)
 ur_color: tuple = (0, 0, 255)
 ll_color: tuple = (128, 0, 128)
@@ -31,33 +48,83 @@ to_color: chr = "[a-z]"
 # usual printable ascii characters, plus left single quote, right single quote, left double quote, right double quote
 characters: str = str([chr(i) for i in range(32, 127)]) + u"\u2018\u2019\u201C\u201D"
 
+# size in pixels that the default font (Century Gothic) was drawn at: its x-height is 159 pixels
+default_font_size: int = 300
+
+# on-disk cache of font dictionaries made by set_font, set_colors and set_parameters (see the fontcache module),
+# which is only used if it is enabled with set_cache or QUADCOLOR_CACHE_DIR is set, so that nothing is written
+# outside of the calling program's own files unless asked for
+cache_enabled: bool = bool(os.environ.get("QUADCOLOR_CACHE_DIR"))
+cache_dir: Path = Path(os.environ.get("QUADCOLOR_CACHE_DIR") or
+                       Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "quadcolor")
+cache_max_bytes: int = 512 * 1024 * 1024
+
+# parallel drawing of the characters in font_dict (0 means to draw them one at a time in the calling thread)
+build_workers: int = 0
+build_executor: str = "process"
+
+# in-memory cache of strings of letters that have already been rendered (see the wordcache module)
+word_cache_enabled: bool = True
+
 
 # loads the default font_dict into the global variable font_dict
 def load_font_dict(metadata_filename: str = "default_font_metadata.json", mask_filename: str = "default_font_mask.jpg",
-                   quadrants_filename="default_font_quadrants.jpg", input_directory="default_font") -> None:
-    global font_dict
-    font_dict = dict()
+                   quadrants_filename="default_font_quadrants.jpg", input_directory="default_font",
+                   preload: str = "", atlas_filename: str = "default_font_atlas.json") -> None:
+    """
+    Load the default font dictionary into config.font_dict.
+
+    If the atlas index file exists in input_directory, the font is loaded from the packed atlas that it describes
+    (see the atlas module). Otherwise, the older layout of one metadata file plus a mask image and a quadrants
+    image per character is used.
+
+    Only the metadata (or atlas index) file is read here. The images of each character are decoded the first
+    time that character is looked up in config.font_dict (or when config.font_dict.warm_up() is called).
+    :param metadata_filename: Name of the json file containing everything but the images.
+    :param mask_filename: Base name of the mask image files (the character code is appended to the stem).
+    :param quadrants_filename: Base name of the quadrants image files (the character code is appended to the stem).
+    :param input_directory: Directory (relative to the package) containing the font files.
+    :param preload: String of characters whose images should be decoded right away.
+    :param atlas_filename: Name of the json index file of the packed atlas.
+    :return: None.
+    """
+    global font_dict, pixel_size
+    pixel_size = None
     input_directory = Path(input_directory)
+
+    try:
+        raw_index = pkgutil.get_data(__package__, str(input_directory / atlas_filename))
+    except FileNotFoundError:
+        raw_index = None
+    if raw_index is not None:
+        index = json.loads(raw_index)
+        sheet_file = input_directory / index["sheet"]
+        font_dict = atlas.load_atlas(index, lambda: atlas.read_sheet(pkgutil.get_data(__package__, str(sheet_file)),
+                                                                     sheet_file.suffix))
+        font_dict.warm_up(preload)
+        return
+
     metadata_file = input_directory / Path(metadata_filename)
     mask_file = Path(mask_filename)
     quadrants_file = Path(quadrants_filename)
 
     raw_data = pkgutil.get_data(__package__, str(metadata_file))
     pre_font_dict = json.loads(raw_data)
-    for key, value in pre_font_dict.items():
+
+    def load_images(key: chr) -> (Image.Image, Image.Image):
         file = str((input_directory /
                     mask_file.stem.replace(mask_file.stem,
                                            mask_file.stem + "_" + str(ord(key)))).with_suffix(".jpg"))
         raw_mask = pkgutil.get_data(__package__, file)
         mask = Image.open(io.BytesIO(raw_mask))
+        mask.load()
         file = str((input_directory /
                     quadrants_file.stem.replace(quadrants_file.stem,
                                                 quadrants_file.stem + "_" + str(ord(key)))).with_suffix(".jpg"))
         raw_quadrants = pkgutil.get_data(__package__, file)
         quadrants = Image.open(io.BytesIO(raw_quadrants))
+        quadrants.load()
+        return mask, quadrants
 
-        font_dict[key] = ColoredChar(mask=mask, quadrants=quadrants,
-                                     x_divide=value["x_divide"], y_divide=value["y_divide"],
-                                     width=value["width"], top_coord=value["top_coord"],
-                                     bottom_coord=value["bottom_coord"])
-
+    font_dict = LazyFontDict(pre_font_dict, load_images)
+    font_dict.warm_up(preload)
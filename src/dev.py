@@ -7,12 +7,15 @@ To make the initial config.font_dict, a font_dict was created. This was followed
 save_font_dict_metadata()
 save_font_dict_images()
 
-Then the files that were created were placed in the data directory.
+Then the files that were created were placed in the data directory. The default font is now also stored as a packed
+atlas (see the atlas module), which is what config.load_font_dict() reads when it is present. It was made with:
+
+save_font_dict_atlas()
 """
 import json
 from pathlib import Path
 
-from . import config
+from . import atlas, config
 
 
 def save_font_dict_metadata(filename: str = "default_font_metadata.json") -> None:
@@ -46,3 +49,10 @@ def save_font_dict_images(mask_filename: str = "default_font_mask.jpg",
                                             quadrants_file.stem + "_" + str(ord(key)))).with_suffix(".jpg")
         value.quadrants.save(file)
 
+
+def save_font_dict_atlas(sheet_filename: str = "default_font_atlas.png",
+                         index_filename: str = "default_font_atlas.json",
+                         output_directory=".") -> None:
+    """Save config.font_dict as a packed atlas: one lossless sheet of all the images, plus a json index."""
+    output_directory = Path(output_directory)
+    atlas.save_atlas(config.font_dict, output_directory / sheet_filename, output_directory / index_filename)
@@ -0,0 +1,229 @@
+"""
+The document module draws long texts, such as reading passages or whole books, on pages of a given size.
+
+The text is read one line at a time (from a str, a text file, or any iterable of str), and each line is a paragraph.
+Its words are wrapped to the width of the page, using the widths of the letters in the font, and the wrapped lines
+are put on pages, which are drawn and yielded one at a time. Nothing refers to a page once it has been yielded, so a
+book of any length can be drawn and saved (by passing the pages straight to save_images) in constant memory.
+
+Each word is drawn on its own, so the word cache (see the wordcache module) holds the common words of the text, and
+most words are drawn with a single paste.
+"""
+import io
+import os
+
+from . import instrument, pagepool
+from .drawing import OutOfFontError
+from .main import check_backend, draw_page
+from .quadfont import QuadFont, current_quadfont
+
+# ways of lining up the lines of a paragraph
+ALIGNMENTS = ("left", "center", "right", "justify")
+
+
+def read_lines(text):
+    """
+    Read the lines of a text one at a time.
+
+    :param text: The text: a str, the Path of a text file (which is read as UTF-8), or an iterable of str (such as
+        an open text file), each of which is one or more lines.
+    :return: Iterator of the lines, without their line breaks.
+    """
+    if isinstance(text, str):
+        text = io.StringIO(text)
+    elif isinstance(text, os.PathLike):
+        with open(text, encoding="utf-8") as file:
+            for chunk in file:
+                yield from chunk.splitlines() or [""]
+        return
+    for chunk in text:
+        yield from chunk.splitlines() or [""]
+
+
+def _check_characters(words: list, quadfont: QuadFont, missing: str) -> list:
+    """Replace the characters of the words that are not in the font with missing (or raise OutOfFontError)."""
+    unknown = set("".join(words)).difference(quadfont.font_dict.keys())
+    if not unknown:
+        return words
+    if missing is None:
+        raise OutOfFontError(min(unknown) + " is not in the current quadcolor font dictionary. Use the missing "
+                                            "argument to draw something else in place of such characters.")
+    table = {ord(char): missing for char in unknown}
+    return [word.translate(table) for word in words]
+
+
+def _split_word(word: str, width: int, max_width: int, quadfont: QuadFont) -> list:
+    """Split a word that is wider than max_width into pieces that aren't (unless they are single letters)."""
+    if width <= max_width:
+        return [(word, width)]
+    pieces = []
+    start, piece_width = 0, 0
+    for i, letter_width in enumerate(quadfont.metrics.measure(list(word))[0].tolist()):
+        if i > start and piece_width + letter_width > max_width:
+            pieces.append((word[start:i], piece_width))
+            start, piece_width = i, 0
+        piece_width += letter_width
+    pieces.append((word[start:], piece_width))
+    return pieces
+
+
+def space_width(quadfont: QuadFont) -> int:
+    """The width of a space between words: that of a space in the font, or of an "n" if the font has no space."""
+    widths = quadfont.metrics.measure([" ", "n"])[0]
+    return int(widths[0] if " " in quadfont.font_dict.keys() else widths[1])
+
+
+def wrap_paragraph(paragraph: str, max_width: int, quadfont: QuadFont = None, missing: str = None) -> list:
+    """
+    Wrap the words of a paragraph into lines.
+
+    Words are separated by runs of whitespace, and are put on a line as long as it stays no wider than max_width
+    (with a space between words). A word that is wider than max_width on its own is broken between letters.
+    :param paragraph: The paragraph, as a str.
+    :param max_width: Maximum width of a line, in pixels.
+    :param quadfont: The font and style to measure with (the global configuration if None).
+    :param missing: String to use in place of characters that are not in the font (None means to raise
+        OutOfFontError, as draw_text does).
+    :return: List of the lines, each a list of (word, width) tuples (one empty line for a blank paragraph).
+    """
+    if quadfont is None:
+        quadfont = current_quadfont()
+    words = paragraph.split()
+    if not words:
+        return [[]]
+    with instrument.Stage("wrap_text"):
+        words = _check_characters(words, quadfont, missing)
+        space = space_width(quadfont)
+        lines = []
+        line, line_width = [], 0
+        for word, width in zip(words, quadfont.metrics.measure(words)[0].tolist()):
+            for piece, piece_width in _split_word(word, width, max_width, quadfont):
+                if line and line_width + space + piece_width > max_width:
+                    lines.append(line)
+                    line, line_width = [], 0
+                line_width += piece_width + (space if line else 0)
+                line.append((piece, piece_width))
+        lines.append(line)
+    return lines
+
+
+def wrap_text(text, max_width: int, quadfont: QuadFont = None, missing: str = None):
+    """
+    Wrap a text into lines no wider than max_width, as iter_document does.
+
+    The lines can be drawn with make_graphics, for example.
+    :param text: The text, as for read_lines.
+    :param max_width: Maximum width of a line, in pixels.
+    :param quadfont: The font and style to measure with (the global configuration if None).
+    :param missing: String to use in place of characters that are not in the font (None means to raise
+        OutOfFontError).
+    :return: Iterator of the lines, as str.
+    """
+    if quadfont is None:
+        quadfont = current_quadfont()
+    for paragraph in read_lines(text):
+        for line in wrap_paragraph(paragraph, max_width, quadfont, missing):
+            yield " ".join(word for word, _ in line)
+
+
+def _place_line(line: list, left: int, max_width: int, space: int, align: str, last: bool) -> list:
+    """Find the x coordinates of the words of a line, lined up as given by align."""
+    natural_width = sum(width for _, width in line) + space * (len(line) - 1)
+    if align == "justify" and not last and len(line) > 1:
+        # share out the space left over among the gaps between the words
+        extra = max(max_width - natural_width, 0)
+        gaps = [space + extra * (i + 1) // (len(line) - 1) - extra * i // (len(line) - 1)
+                for i in range(len(line) - 1)] + [0]
+    else:
+        gaps = [space] * len(line)
+        if align == "center":
+            left += (max_width - natural_width) // 2
+        elif align == "right":
+            left += max_width - natural_width
+    x_positions = []
+    for (_, width), gap in zip(line, gaps):
+        x_positions.append(left)
+        left += width + gap
+    return x_positions
+
+
+def _generate_pages(text, quadfont: QuadFont, margins, text_width: int, first_baseline: int, line_height: int,
+                    lines_per_page: int, align: str, missing: str):
+    """Wrap and paginate a text, yielding the (word, x, baseline) tuples of each page as soon as it is full."""
+    space = space_width(quadfont)
+    items, n_lines = [], 0
+    for paragraph in read_lines(text):
+        lines = wrap_paragraph(paragraph, text_width, quadfont, missing)
+        for k, line in enumerate(lines):
+            if n_lines == lines_per_page:
+                yield items
+                items, n_lines = [], 0
+            baseline = first_baseline + n_lines * line_height
+            x_positions = _place_line(line, margins[0], text_width, space, align, k == len(lines) - 1)
+            items.extend((word, x, baseline) for (word, _), x in zip(line, x_positions))
+            n_lines += 1
+    if n_lines:
+        yield items
+
+
+def iter_document(text, width: int = 2550, height: int = 3300, margins=(150, 150, 150, 150),
+                  line_height: int = None, align: str = "left", bg_color=(255, 255, 255), missing: str = None,
+                  backend: str = "pil", workers: int = 0, quadfont: QuadFont = None):
+    """
+    Draw a long text on pages, wrapping its lines to the width of the page, yielding the pages one at a time.
+
+    Each line of the text is a paragraph, whose words are wrapped to lines no wider than the page less its margins
+    (see wrap_paragraph); a blank line is left blank. The text is read, wrapped and drawn only as the pages are
+    requested, and only one page (or, with several workers, two per worker) is in memory at a time, so
+    save_images(iter_document(text_file, ...), "book.pdf") draws and saves a book in constant memory. The arguments
+    are checked when this function is called, not when the first page is requested.
+    :param text: The text: a str, the Path of a text file (which is read as UTF-8), or an iterable of str (such as
+        an open text file).
+    :param width: Page width in pixels.
+    :param height: Page height in pixels.
+    :param margins: Tuple of four ints giving the left, top, right, bottom margins of the page, in pixels.
+    :param line_height: Distance between the baselines of neighboring lines, in pixels (None means 1.2 times the
+        distance from the top of the tallest letter in the font to the bottom of the lowest one).
+    :param align: "left", "center", "right" or "justify" (the last line of a justified paragraph is lined up on
+        the left).
+    :param bg_color: Tuple of three ints giving the RGB background color (each int between 0 and 255).
+    :param missing: String to draw in place of characters that are not in the font (None means to raise
+        OutOfFontError, as draw_text does).
+    :param backend: "pil", "numpy" or "palette", as for make_flashcards.
+    :param workers: Number of worker processes to draw the pages in (0 or 1 means to draw them in the calling
+        process; see iter_flashcards).
+    :param quadfont: The font and style to draw with (the global configuration if None).
+    :return: Iterator of Image.Image's, one per page.
+    """
+    check_backend(backend)
+    if type(workers) != int or workers < 0:
+        raise ValueError("Number of workers must be a nonnegative integer.")
+    if align not in ALIGNMENTS:
+        raise ValueError("Align must be one of " + ", ".join(ALIGNMENTS) + ".")
+    if type(width) != int or type(height) != int or width <= 0 or height <= 0:
+        raise ValueError("Width and height must be positive integers.")
+    left_margin, top_margin, right_margin, bottom_margin = margins
+    text_width, text_height = width - left_margin - right_margin, height - top_margin - bottom_margin
+    if text_width <= 0 or text_height <= 0:
+        raise ValueError("The margins must leave room for text on the page.")
+    if quadfont is None:
+        quadfont = current_quadfont()
+
+    # how far the letters of the font reach above and below the baseline
+    above, below = -int(quadfont.metrics.tops.min()), int(quadfont.metrics.bottoms.max())
+    if line_height is None:
+        line_height = round(1.2 * (above + below))
+    if type(line_height) != int or line_height <= 0:
+        raise ValueError("Line height must be a positive integer.")
+    lines_per_page = max(1, (text_height - above - below) // line_height + 1)
+
+    pages = _generate_pages(text, quadfont, margins, text_width, top_margin + above, line_height, lines_per_page,
+                            align, missing)
+    # draw_page shifts text down by half the x-height, as draw_text does, so shift it back up onto the baselines
+    y_shift = quadfont.font_dict["x"].mask.size[1] // 2 if "x" in quadfont.font_dict.keys() else 0
+    page_settings = dict(width=width, height=height, bg_color=bg_color, boundary_color=bg_color, n_rows=1,
+                         n_columns=1, h_centered=False, x_offset=0, y_offset=-y_shift, backend=backend,
+                         quadfont=quadfont)
+    if workers > 1:
+        return pagepool.render_pages(pages, draw_page, workers=workers, **page_settings)
+    return (draw_page(items, **page_settings) for items in pages)
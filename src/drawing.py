@@ -1,53 +1,99 @@
 from PIL import Image
 
-from . import config
+from . import config, instrument
+from .quadfont import QuadFont, current_quadfont
+from .wordcache import PIXELS_PER_PASTE, WordStrip, word_cache
 
 
-def get_bboxes(text_list: list) -> (list, list, list):
+@instrument.timed("get_bboxes")
+def get_bboxes(text_list: list, as_arrays: bool = False, quadfont: QuadFont = None) -> (list, list, list):
     """
     Get the width, top coordinate, and bottom coordinate of each entry in a list of str.
 
     The baseline of the text is taken to have a y coordinate of 0, and the top and bottom coordinates are
-    computed relative to this. All dimensions are in pixels.
+    computed relative to this. All dimensions are in pixels. Characters that are not in the font dictionary are
+    ignored. The whole list is measured at once, using the precomputed tables of the QuadFont's metrics.
     :param text_list: A list of str, whose widths, top coordinates, and bottom coordinates are to be computed.
+    :param as_arrays: Should NumPy arrays be returned instead of lists (which is faster for long lists)?
+    :param quadfont: The font and style to measure with (the global configuration if None).
     :return: A tuple of three lists of ints: a width list, a top coordinates list, and a bottom coordinates list.
     """
-    # font_dict = config.font_dict
-    widths = [0 for _ in range(len(text_list))]
-    tops = [0 for _ in range(len(text_list))]
-    bottoms = [0 for _ in range(len(text_list))]
-
-    for i, text in enumerate(text_list):
-        for j in text:
-            # needs error handling if j is not in font_dict
-            if j in config.font_dict.keys():
-                widths[i] += config.font_dict[j].width
-                if j != " ":
-                    tops[i] = min(tops[i], config.font_dict[j].top_coord)
-                    bottoms[i] = max(bottoms[i], config.font_dict[j].bottom_coord)
-
-    return widths, tops, bottoms
+    widths, tops, bottoms = (quadfont or current_quadfont()).metrics.measure(text_list)
+    if as_arrays:
+        return widths, tops, bottoms
+    return widths.tolist(), tops.tolist(), bottoms.tolist()
 
 
 class OutOfFontError(Exception):
     """
-    Error for handling when a character is not included in config.font_dict
+    Error for handling when a character is not included in the font dictionary
     """
     pass
 
 
+@instrument.timed("glyph_lookup")
+def get_colored_chars(letters: str, quadfont: QuadFont = None) -> list:
+    """Look up the ColoredChar of each letter of a string in a QuadFont, raising OutOfFontError if needed."""
+    font_dict = (quadfont or current_quadfont()).font_dict
+    try:
+        return [font_dict[letter] for letter in letters]
+    except KeyError as error:
+        raise OutOfFontError(error.args[0] + " is not in the current quadcolor font dictionary. "
+                             "Use set_font to specify a font and then set_parameters to "
+                             "specify which characters are in the quadcolor font dictionary.") from None
+
+
+@instrument.timed("make_strip")
+def make_strip(letters: str, quadfont: QuadFont = None) -> WordStrip:
+    """
+    Composite the colored letters of a string into a single WordStrip, to be pasted by draw_text.
+
+    The letters don't overlap, so pasting the strip (with its mask) gives exactly the same result as pasting each
+    letter in turn. If pasting the strip would be slower than pasting the letters (because it would have too many
+    more pixels than the letters), then no image is made, and draw_text pastes the letters one at a time.
+    :param letters: String of letters.
+    :param quadfont: The font and style of the letters (the global configuration if None).
+    :return: A WordStrip of the letters.
+    """
+    colored_chars = get_colored_chars(letters, quadfont)
+    width = sum(colored_char.width for colored_char in colored_chars)
+    top_coord = min((colored_char.top_coord for colored_char in colored_chars), default=0)
+    bottom_coord = max((colored_char.bottom_coord for colored_char in colored_chars), default=0)
+
+    letters_area = sum(colored_char.width * (colored_char.bottom_coord - colored_char.top_coord)
+                       for colored_char in colored_chars)
+    if width * (bottom_coord - top_coord) - letters_area > PIXELS_PER_PASTE * (len(colored_chars) - 1):
+        return WordStrip(colored_chars=colored_chars, image=None, width=width, top_coord=top_coord)
+
+    quadrants = Image.new("RGB", (width, bottom_coord - top_coord))
+    mask = Image.new("L", (width, bottom_coord - top_coord), 0)
+    current_x_pos = 0
+    for colored_char in colored_chars:
+        position = (current_x_pos, colored_char.top_coord - top_coord)
+        colored_char.paint(quadrants, position)
+        mask.paste(colored_char.mask, position)
+        current_x_pos += colored_char.width
+    quadrants.putalpha(mask)
+    return WordStrip(colored_chars=colored_chars, image=quadrants, width=width, top_coord=top_coord)
+
+
 # draw a line of letters at a specified position on a given image
+@instrument.timed("draw_text")
 def draw_text(letters: str, image: Image.Image, pos=(0, 0),
               h_centered: bool = True, v_centered: bool = True,
-              x_offset=0, y_offset=0) -> Image.Image:
+              x_offset=0, y_offset=0, quadfont: QuadFont = None) -> Image.Image:
     """
     Draw the specified letters string in colored letters.
 
-    The letters will be drawn in the specified image at the specified (x, y) position, using the quadcolor font.
+    The letters will be drawn in the specified image at the specified (x, y) position, using the given QuadFont (or
+    the global configuration of fonts and colors, if none is given).
     The baseline of the letters will be at the specified y position. If h_centered is True, then the letters will be
     horizontally centered at the specified x position; otherwise, their leftmost extreme will be there. If
     v_centered is True, then the text will be shifted downward by half the x-height, if x is in the font_dict.
 
+    The letters are composited into a single strip (see make_strip), which is kept in wordcache.word_cache so that
+    drawing the same letters again usually only takes one paste (unless config.word_cache_enabled is False).
+
     In keeping with the PIL package, x coordinates increase from left to right, while y coordinates increase from
     top to bottom. The point (0, 0) is at the upper left corner of the image.
 
@@ -58,35 +104,44 @@ def draw_text(letters: str, image: Image.Image, pos=(0, 0),
     :param v_centered: Should the text be shifted vertically by half the x-height?
     :param x_offset: Amount by which to shift the text of every flashcard horizontally (positive means to the right).
     :param y_offset: Amount by which to shift the text of every flashcard vertically (positive means downward).
+    :param quadfont: The font and style to draw with (the global configuration if None).
     :return: The original image but with the colored letters drawn in it.
     """
     x_pos, y_pos = pos
+    if quadfont is None:
+        quadfont = current_quadfont()
 
     y_shift = 0
-    if v_centered and "x" in config.font_dict.keys():
+    if v_centered and "x" in quadfont.font_dict.keys():
         # to vertically center, offset by half the x-height
-        y_shift = config.font_dict["x"].quadrants.size[1] // 2
+        y_shift = quadfont.font_dict["x"].mask.size[1] // 2
 
-    width = 0
-
-    for letter in letters:
-        if letter in config.font_dict.keys():
-            width += config.font_dict[letter].width
-        else:
-            raise OutOfFontError(letter + " is not in the current quadcolor font dictionary. "
-                                 "Use set_font to specify a font and then set_parameters to "
-                                 "specify which characters are in the quadcolor font dictionary.")
+    if config.word_cache_enabled:
+        strip = word_cache.get(letters, quadfont, make_strip)
+        colored_chars, width = strip.colored_chars, strip.width
+    else:
+        strip = None
+        colored_chars = get_colored_chars(letters, quadfont)
+        width = sum(colored_char.width for colored_char in colored_chars)
 
     current_x_pos = x_pos - (width // 2) if h_centered else int(x_pos)
-    for letter in letters:
-        if letter in config.font_dict.keys():
-            image.paste(config.font_dict[letter].quadrants,
-                        (current_x_pos + x_offset, y_pos + config.font_dict[letter].top_coord + y_shift + y_offset),
-                        config.font_dict[letter].mask)
-            current_x_pos += config.font_dict[letter].width
+    instrument.count("glyphs_pasted", len(colored_chars))
+    if strip is not None and strip.image is not None:
+        instrument.count("pastes")
+        image.paste(strip.image, (current_x_pos + x_offset, y_pos + strip.top_coord + y_shift + y_offset),
+                    strip.image)
+        return image
+
+    instrument.count("pastes", len(colored_chars))
+    for colored_char in colored_chars:
+        image.paste(colored_char.quadrants,
+                    (current_x_pos + x_offset, y_pos + colored_char.top_coord + y_shift + y_offset),
+                    colored_char.mask)
+        current_x_pos += colored_char.width
     return image
 
 
+@instrument.timed("compute_layout")
 def compute_layout(images: list,
                    top_margin: int, left_margin: int, bottom_margin: int, right_margin: int,
                    n_rows: int = 0, n_columns: int = 0,
@@ -95,7 +150,8 @@ def compute_layout(images: list,
     Compute (image number, x, y) tuples of positions to place text at for a grid layout (for flashcards).
 
     All coordinates and dimensions are in pixels.
-    :param images: A list of images (Image.Image objects) on which to make the grid layouts.
+    :param images: A list of images (Image.Image objects) on which to make the grid layouts, or of the
+        (width, height) tuples of their sizes.
     :param top_margin: Top margin in each image, in pixels.
     :param left_margin: Left margin in each image, in pixels.
     :param bottom_margin: Bottom margin in each image, in pixels.
@@ -106,7 +162,7 @@ def compute_layout(images: list,
     :return: List of (image number, x, y) tuples specifying image numbers and positions in a text layout.
     """
     n_pages = len(images)
-    page_sizes = [image.size for image in images]
+    page_sizes = [image if isinstance(image, tuple) else image.size for image in images]
 
     if n_columns == 0:
         # rows specified but no columns, so do that many lines per page
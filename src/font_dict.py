@@ -1,26 +1,33 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import math
 from PIL import Image, ImageFont, ImageDraw
 import re
 
-from .coloredchar import ColoredChar
-from . import config
+from .coloredchar import ColoredChar, Glyph
+from . import config, fontcache, instrument
 
 
-def make_colored_char(char: chr, font: ImageFont.FreeTypeFont, ul_color=(255, 0, 0), ur_color=(0, 0, 255),
-                      ll_color=(128, 0, 128), lr_color=(130, 130, 131), non_color=(0, 0, 0),
-                      substitute_a: chr = "", to_color: str = "[a-z]") -> ColoredChar:
+def get_x_heights(font: ImageFont.FreeTypeFont) -> (int, int):
     """
-    Make a ColoredChar object from the specified font.
+    Get the X-height and x-height of a font, which are used to compute where the quadrants of its characters divide.
 
-    :param char: The character to be colored.
+    :param font: The font whose heights are to be computed.
+    :return: A tuple of two ints: the height of "X" and the height of "x", in pixels.
+    """
+    x_bbox = font.getbbox("X", anchor="ls")
+    lower_x_bbox = font.getbbox("x", anchor="ls")
+    return x_bbox[3] - x_bbox[1], lower_x_bbox[3] - lower_x_bbox[1]
+
+
+def make_glyph(char: chr, font: ImageFont.FreeTypeFont, substitute_a: chr = "", x_heights=None) -> Glyph:
+    """
+    Make a Glyph object (an uncolored rasterized character) from the specified font.
+
+    :param char: The character to be rasterized.
     :param font: The font from which the character is to be taken.
-    :param ul_color: RGB color for the upper left quadrant of the character.
-    :param ur_color: RGB color for the upper right quadrant of the character.
-    :param ll_color: RGB color for the lower left quadrant of the character.
-    :param lr_color: RGB color for the lower right quadrant of the character.
-    :param non_color: RGB color for characters that at not to be colored.
     :param substitute_a: The character whose height is to be used to truncate a "d" to make it a rounded "a".
-    :param to_color: A regular expression that determines which characters should be colored.
-    :return: A ColoredChar object.
+    :param x_heights: The (X-height, x-height) tuple of the font, as given by get_x_heights (computed if None).
+    :return: A Glyph object.
     """
     anchor = "ls"
     if char == "a" and substitute_a:
@@ -44,34 +51,251 @@ def make_colored_char(char: chr, font: ImageFont.FreeTypeFont, ul_color=(255, 0,
     d = ImageDraw.Draw(mask)
     d.text((0, 0), char, fill=255, font=font, anchor="lt")
 
-    # make the foreground image to be colored by quadrants (non_color by default)
-    quadrants = Image.new("RGB", bbox_shape, non_color)
+    if x_heights is None:
+        x_heights = get_x_heights(font)
+    # distance from top to X-height (or x-height) is the coordinate of the bottom minus top
+    x_height = x_heights[0] if char.isupper() else x_heights[1]
+    x_divide, y_divide = (left + right) // 2, -x_height // 2
+
+    truncate_coord = font.getbbox(substitute_a, anchor=anchor)[1] if truncate_top else None
+
+    return Glyph(mask=mask, x_divide=x_divide, y_divide=y_divide, width=right - left,
+                 left_coord=left, top_coord=top, bottom_coord=bottom,
+                 drawn_char=char, truncate_coord=truncate_coord)
+
+
+# font and settings used by the worker processes (or threads) of make_glyphs, set once per worker by _init_worker
+_worker_args: tuple = ()
+
+
+def _init_worker(font: ImageFont.FreeTypeFont, substitute_a: chr, x_heights: tuple) -> None:
+    global _worker_args
+    _worker_args = (font, substitute_a, x_heights)
+
+
+def _make_glyph_chunk(chars: list) -> list:
+    font, substitute_a, x_heights = _worker_args
+    return [make_glyph(char=char, font=font, substitute_a=substitute_a, x_heights=x_heights) for char in chars]
 
-    if char.isupper():
-        # distance from top to X-height is the coordinate of the bottom minus top
-        x_height = font.getbbox("X", anchor="ls")[3] - font.getbbox("X", anchor="ls")[1]
+
+def make_glyphs(chars, font: ImageFont.FreeTypeFont, substitute_a: chr = "",
+                workers: int = 0, executor: str = "process") -> dict:
+    """
+    Make the Glyph objects of several characters, optionally in parallel.
+
+    With more than one worker, the characters are split into chunks that are rasterized by a pool of worker
+    processes (or threads). The font is sent to each worker once, when it starts. The result is the same as
+    rasterizing the characters one at a time.
+    :param chars: The characters to be rasterized (a str, or any iterable of characters).
+    :param font: The font from which the characters are to be taken.
+    :param substitute_a: The character whose height is to be used to truncate a "d" to make it a rounded "a".
+    :param workers: Number of worker processes or threads (0 or 1 means to rasterize in the calling thread).
+    :param executor: "process" for a process pool, or "thread" for a thread pool.
+    :return: A dictionary whose keys are the characters and whose entries are their Glyph objects.
+    """
+    chars = list(dict.fromkeys(chars))
+    x_heights = get_x_heights(font)
+    if workers <= 1 or len(chars) <= 1:
+        return {char: make_glyph(char=char, font=font, substitute_a=substitute_a, x_heights=x_heights)
+                for char in chars}
+
+    if executor == "process":
+        pool_class = ProcessPoolExecutor
+    elif executor == "thread":
+        pool_class = ThreadPoolExecutor
     else:
-        # distance from top to x-height is the coordinate of the bottom minus top
-        x_height = font.getbbox("x", anchor="ls")[3] - font.getbbox("x", anchor="ls")[1]
-    x_divide, y_divide = (left + right) // 2, -x_height // 2
+        raise ValueError('executor must be "process" or "thread".')
+
+    # a few chunks per worker, so that the work stays balanced when some glyphs are larger than others
+    chunk_size = math.ceil(len(chars) / (4 * workers))
+    chunks = [chars[i:i + chunk_size] for i in range(0, len(chars), chunk_size)]
+    with pool_class(max_workers=workers, initializer=_init_worker,
+                    initargs=(font, substitute_a, x_heights)) as pool:
+        glyph_chunks = list(pool.map(_make_glyph_chunk, chunks))
+    return {char: glyph for chunk, glyph_chunk in zip(chunks, glyph_chunks) for char, glyph in zip(chunk, glyph_chunk)}
+
+
+def quadrant_colors(glyph: Glyph, ul_color=(255, 0, 0), ur_color=(0, 0, 255),
+                    ll_color=(128, 0, 128), lr_color=(130, 130, 131), non_color=(0, 0, 0),
+                    to_color: str = "[a-z]") -> tuple:
+    """
+    Find the colors of the quadrants of a glyph.
+
+    :param glyph: The Glyph object to be colored.
+    :param ul_color: RGB color for the upper left quadrant of the character.
+    :param ur_color: RGB color for the upper right quadrant of the character.
+    :param ll_color: RGB color for the lower left quadrant of the character.
+    :param lr_color: RGB color for the lower right quadrant of the character.
+    :param non_color: RGB color for characters that at not to be colored.
+    :param to_color: A regular expression that determines which characters should be colored.
+    :return: A tuple of the four quadrant colors if the glyph is to be colored, or a tuple of non_color if not.
+    """
+    if re.search(to_color, glyph.drawn_char):
+        return ul_color, ur_color, ll_color, lr_color
+    return non_color,
+
+
+def color_glyph(glyph: Glyph, ul_color=(255, 0, 0), ur_color=(0, 0, 255),
+                ll_color=(128, 0, 128), lr_color=(130, 130, 131), non_color=(0, 0, 0),
+                to_color: str = "[a-z]") -> Image.Image:
+    """
+    Make the quadrants image of a glyph.
+
+    :param glyph: The Glyph object to be colored.
+    :param ul_color: RGB color for the upper left quadrant of the character.
+    :param ur_color: RGB color for the upper right quadrant of the character.
+    :param ll_color: RGB color for the lower left quadrant of the character.
+    :param lr_color: RGB color for the lower right quadrant of the character.
+    :param non_color: RGB color for characters that at not to be colored.
+    :param to_color: A regular expression that determines which characters should be colored.
+    :return: An RGB image with the same dimensions as the glyph's mask.
+    """
+    colors = quadrant_colors(glyph, ul_color=ul_color, ur_color=ur_color, ll_color=ll_color, lr_color=lr_color,
+                             non_color=non_color, to_color=to_color)
+    return colored_char_from_glyph(glyph, colors=colors).quadrants
+
+
+def make_colored_char(char: chr, font: ImageFont.FreeTypeFont, ul_color=(255, 0, 0), ur_color=(0, 0, 255),
+                      ll_color=(128, 0, 128), lr_color=(130, 130, 131), non_color=(0, 0, 0),
+                      substitute_a: chr = "", to_color: str = "[a-z]") -> ColoredChar:
+    """
+    Make a ColoredChar object from the specified font.
+
+    :param char: The character to be colored.
+    :param font: The font from which the character is to be taken.
+    :param ul_color: RGB color for the upper left quadrant of the character.
+    :param ur_color: RGB color for the upper right quadrant of the character.
+    :param ll_color: RGB color for the lower left quadrant of the character.
+    :param lr_color: RGB color for the lower right quadrant of the character.
+    :param non_color: RGB color for characters that at not to be colored.
+    :param substitute_a: The character whose height is to be used to truncate a "d" to make it a rounded "a".
+    :param to_color: A regular expression that determines which characters should be colored.
+    :return: A ColoredChar object.
+    """
+    glyph = make_glyph(char=char, font=font, substitute_a=substitute_a)
+    colors = quadrant_colors(glyph, ul_color=ul_color, ur_color=ur_color, ll_color=ll_color,
+                             lr_color=lr_color, non_color=non_color, to_color=to_color)
+    return colored_char_from_glyph(glyph, colors=colors)
+
+
+def colored_char_from_glyph(glyph: Glyph, quadrants: Image.Image = None, colors: tuple = None) -> ColoredChar:
+    """
+    Make a ColoredChar from a Glyph and either its quadrants image or its colors (the mask is shared, not copied).
+
+    :param glyph: The Glyph object.
+    :param quadrants: Its quadrants image, or None.
+    :param colors: If quadrants is None, the colors of its quadrants, as given by quadrant_colors.
+    :return: A ColoredChar object.
+    """
+    # only colored glyphs have the top of a substituted "a" whited out
+    truncate_coord = glyph.truncate_coord if quadrants is None and len(colors) == 4 else None
+    return ColoredChar(mask=glyph.mask, quadrants=quadrants, x_divide=glyph.x_divide, y_divide=glyph.y_divide,
+                       width=glyph.width, top_coord=glyph.top_coord, bottom_coord=glyph.bottom_coord,
+                       colors=colors, truncate_coord=truncate_coord)
+
+
+def glyph_from_colored_char(char: chr, colored_char: ColoredChar, style=config) -> Glyph:
+    """
+    Recover the Glyph of a character in a font dictionary (for example, one loaded from the font dictionary cache).
+
+    :param char: The character.
+    :param colored_char: Its ColoredChar, made from style.font with style.substitute_a.
+    :param style: The configuration the ColoredChar was made with (the config module by default, or a QuadFont).
+    :return: A Glyph object.
+    """
+    truncate_top = char == "a" and style.substitute_a
+    truncate_coord = style.font.getbbox(style.substitute_a, anchor="ls")[1] if truncate_top else None
+    # x_divide is the midpoint of the left and right coordinates, rounded down
+    return Glyph(mask=colored_char.mask, x_divide=colored_char.x_divide, y_divide=colored_char.y_divide,
+                 width=colored_char.width, left_coord=colored_char.x_divide - colored_char.width // 2,
+                 top_coord=colored_char.top_coord, bottom_coord=colored_char.bottom_coord,
+                 drawn_char="d" if truncate_top else char, truncate_coord=truncate_coord)
+
+
+def changed_coloring(old_to_color: str, style=config) -> str:
+    """
+    Find the characters whose coloring would change if style.to_color were set in place of old_to_color.
+
+    :param old_to_color: The previous regular expression that determined which characters should be colored.
+    :param style: The configuration with the new to_color (the config module by default, or a QuadFont).
+    :return: A string of the characters of style.characters that are colored under exactly one of the two.
+    """
+    changed = ""
+    for char in dict.fromkeys(style.characters):
+        drawn_char = "d" if char == "a" and style.substitute_a else char
+        if (re.search(old_to_color, drawn_char) is None) != (re.search(style.to_color, drawn_char) is None):
+            changed += char
+    return changed
 
-    # if this matches the coloring condition, color the four quadrants
-    if re.search(to_color, char):
-        quadrants_draw = ImageDraw.Draw(quadrants)
-        quadrants_draw.rectangle((0, 0, max(0, x_divide - left), max(0, y_divide - top)), fill=ul_color)
-        quadrants_draw.rectangle((min(right - left, x_divide - left), 0, right - left, max(0, y_divide - top)),
-                                 fill=ur_color)
-        quadrants_draw.rectangle((0, min(bottom - top, y_divide - top), max(0, x_divide - left), bottom - top),
-                                 fill=ll_color)
-        quadrants_draw.rectangle((min(right - left, x_divide - left), min(bottom - top, y_divide - top),
-                                  right - left, bottom - top), fill=lr_color)
 
-        if truncate_top:
-            midline = font.getbbox(substitute_a, anchor=anchor)[1]
-            quadrants_draw.rectangle((0, 0, right - left, midline - top), fill="white")
+@instrument.timed("build_font_dict")
+def build_font_dict(style, old_font_dict, old_glyphs: dict, rasterize: str = "", recolor: str = None) -> (dict, dict):
+    """
+    Make the font dictionary of a configuration from that of a similar one, redoing as little work as possible.
+
+    Characters are only drawn (rasterized) if they are listed in rasterize or are not in the old font dictionary;
+    the glyphs of all others are reused from old_glyphs (or recovered from old_font_dict). Drawing is done in
+    parallel if config.build_workers is more than 1 (see settings.set_build_workers). Only the characters
+    that are listed in recolor (all characters, if it is None), along with any that were rasterized, get new
+    quadrants images. Characters that are not in style.characters are dropped. Nothing is modified, so this can
+    be used to make font dictionaries that aren't config.font_dict.
+
+    The on-disk cache is checked first, and the result is saved in it.
+    :param style: The configuration to make the font dictionary for: the config module or a QuadFont (or anything
+        else with the font, color and parameter attributes that they have).
+    :param old_font_dict: The font dictionary of the similar configuration (possibly empty).
+    :param old_glyphs: The glyphs of the similar configuration (possibly empty).
+    :param rasterize: String of characters that must be drawn again (for example, "a" if substitute_a changed).
+    :param recolor: String of characters whose quadrants images must be made again (all characters if None).
+    :return: A tuple of the new font dictionary and its glyphs (which is empty if it was loaded from the cache,
+        since the glyphs can be recovered from the font dictionary when needed).
+    """
+    cached_font_dict = fontcache.lookup(style)
+    if cached_font_dict is not None:
+        return cached_font_dict, dict()
 
-    return ColoredChar(mask=mask, quadrants=quadrants, x_divide=x_divide, y_divide=y_divide,
-                       width=right - left, top_coord=top, bottom_coord=bottom)
+    glyphs = dict()
+    new_chars = []
+    for char in style.characters:
+        if char in glyphs:
+            continue
+        if char not in rasterize and char in old_glyphs:
+            glyphs[char] = old_glyphs[char]
+        elif char not in rasterize and char in old_font_dict:
+            glyphs[char] = glyph_from_colored_char(char, old_font_dict[char], style)
+        else:
+            # a placeholder, to keep the characters in order
+            glyphs[char] = None
+            new_chars.append(char)
+    if new_chars:
+        glyphs.update(make_glyphs(new_chars, font=style.font, substitute_a=style.substitute_a,
+                                  workers=config.build_workers, executor=config.build_executor))
+
+    colors = dict(ul_color=style.ul_color, ur_color=style.ur_color, ll_color=style.ll_color,
+                  lr_color=style.lr_color, non_color=style.non_color)
+    font_dict = dict()
+    for char, glyph in glyphs.items():
+        if recolor is None or char in recolor or char in new_chars:
+            font_dict[char] = colored_char_from_glyph(glyph, colors=quadrant_colors(glyph, to_color=style.to_color,
+                                                                                    **colors))
+        else:
+            font_dict[char] = old_font_dict[char]
+    fontcache.store(font_dict, style)
+    return font_dict, glyphs
+
+
+def update_font_dict(rasterize: str = "", recolor: str = None) -> dict:
+    """
+    Update config.font_dict after a change to the colors or parameters, redoing as little work as possible.
+
+    See build_font_dict, which does the work, starting from config.font_dict and config.glyphs.
+    :param rasterize: String of characters that must be drawn again (for example, "a" if substitute_a changed).
+    :param recolor: String of characters whose quadrants images must be made again (all characters if None).
+    :return: The updated font dictionary, which is also config.font_dict.
+    """
+    config.font_dict, config.glyphs = build_font_dict(config, config.font_dict, config.glyphs,
+                                                      rasterize=rasterize, recolor=recolor)
+    return config.font_dict
 
 
 def make_font_dict() -> dict:
@@ -80,17 +304,15 @@ def make_font_dict() -> dict:
 
     This dictionary is to be used as the quadcolor global variable config.font_dict. The keys are the characters
     that can be drawn (colored or uncolored), and the entries are ColoredChar objects.
+
+    If the on-disk cache (see the fontcache module) already contains a font dictionary made from the same font
+    and settings, it is loaded from there instead of being made again. Otherwise, the newly made font dictionary
+    is saved in the cache.
     :return: A font dictionary, to be used as config.font_dict.
     """
-    # clear the current global font dictionary
+    # clear the current global font dictionary and glyphs, so that every character is drawn again
     config.font_dict = dict()
+    config.glyphs = dict()
 
     # repopulate the global font dictionary
-    for char in config.characters:
-        config.font_dict[char] = make_colored_char(char=char, font=config.font,
-                                                   ul_color=config.ul_color, ur_color=config.ur_color,
-                                                   ll_color=config.ll_color, lr_color=config.lr_color,
-                                                   non_color=config.non_color,
-                                                   substitute_a=config.substitute_a,
-                                                   to_color=config.to_color)
-    return config.font_dict
+    return update_font_dict()
@@ -0,0 +1,166 @@
+"""
+The fontcache module contains a persistent on-disk cache of font dictionaries made by font_dict.make_font_dict().
+
+Each cache entry is an atlas (see the atlas module), with a memory-mappable .npy sheet, whose filename is a hash
+of everything that goes into making the font dictionary: the contents of the font file, the font size, the five
+colors, substitute_a, to_color and the characters. When the total size of the cache exceeds config.cache_max_bytes,
+the least recently used entries are deleted.
+
+The cache is configured with settings.set_cache(). It is off unless it is enabled there or the QUADCOLOR_CACHE_DIR
+environment variable is set (to the directory to keep it in); otherwise it is stored in the quadcolor directory of
+$XDG_CACHE_HOME (or ~/.cache). Failing to read or write the cache is never an error: the font dictionary is made
+as it would be without it.
+"""
+from functools import lru_cache
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+import weakref
+import PIL
+
+from . import atlas, config, instrument
+
+# the hash of each font's file when it was first asked for, so that a font (and the font dictionaries and QuadFonts
+# made from it) keeps being identified by the file its letters were drawn from, even if the file is changed later
+_font_hashes = weakref.WeakKeyDictionary()
+
+
+def font_file_hash(font) -> str:
+    """
+    Return the sha256 hash of the contents of the file of the given font, or "" if it has no file path.
+
+    The hash of a font object is computed once, the first time it is asked for, and the file is only read again
+    (for another font object) when its size or modification time has changed.
+    """
+    file_hash = _font_hashes.get(font)
+    if file_hash is not None:
+        return file_hash
+    path = getattr(font, "path", None)
+    if not isinstance(path, (str, bytes, os.PathLike)):
+        return ""
+    stat = os.stat(path)
+    file_hash = _file_hash(os.fsdecode(path), stat.st_size, stat.st_mtime_ns)
+    _font_hashes[font] = file_hash
+    return file_hash
+
+
+@lru_cache(maxsize=64)
+def _file_hash(path: str, size: int, mtime_ns: int) -> str:
+    # size and mtime_ns are only part of the key of the cache, so that a changed file is read again
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(style=config) -> str:
+    """
+    Compute the cache key of the font dictionary that a configuration would make.
+
+    :param style: The configuration: the config module (the default) or a QuadFont, or anything else with their
+        font, ul_color, ur_color, ll_color, lr_color, non_color, substitute_a, to_color and characters attributes.
+    :return: A hex str, or "" if the font can't be cached (for example, if it was loaded from a file object).
+    """
+    file_hash = font_file_hash(style.font)
+    if not file_hash:
+        return ""
+    key = dict(atlas_version=atlas.ATLAS_VERSION, pillow_version=PIL.__version__,
+               font_file=file_hash, size=style.font.size, index=style.font.index,
+               layout_engine=style.font.layout_engine,
+               colors=[style.ul_color, style.ur_color, style.ll_color, style.lr_color, style.non_color],
+               substitute_a=style.substitute_a, to_color=style.to_color, characters=style.characters)
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def lookup(style=config):
+    """
+    Load the font dictionary for a configuration from the cache.
+
+    :param style: The configuration (the config module by default; see cache_key).
+    :return: A LazyFontDict, or None if the cache is disabled or doesn't contain the font dictionary.
+    """
+    if not config.cache_enabled or style.font is None:
+        return None
+    try:
+        key = cache_key(style)
+        if not key:
+            return None
+        index_file = Path(config.cache_dir) / (key + ".json")
+        sheet_file = index_file.with_suffix(".npy")
+        with open(index_file) as file:
+            index = json.load(file)
+        sheet = atlas.map_sheet(sheet_file)
+        # record the use, for least recently used eviction
+        os.utime(index_file)
+    except (OSError, ValueError):
+        instrument.count("font_cache_misses")
+        return None
+    instrument.count("font_cache_hits")
+    return atlas.load_atlas(index, lambda: sheet)
+
+
+def store(font_dict, style=config) -> None:
+    """
+    Save a font dictionary made from a configuration in the cache, then evict old entries if needed.
+
+    Failing to write to the cache (for example, because its directory is read-only) is not an error.
+    :param font_dict: The font dictionary to be saved.
+    :param style: The configuration it was made from (the config module by default; see cache_key).
+    :return: None.
+    """
+    if not config.cache_enabled or style.font is None:
+        return
+    try:
+        key = cache_key(style)
+        if not key:
+            return
+        cache_dir = Path(config.cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # write to temporary files and then rename them, so that other processes never see partial entries
+        with tempfile.TemporaryDirectory(dir=cache_dir) as temp_dir:
+            temp_sheet = Path(temp_dir) / (key + ".npy")
+            temp_index = Path(temp_dir) / (key + ".json")
+            atlas.save_atlas(font_dict, temp_sheet, temp_index)
+            os.replace(temp_sheet, cache_dir / temp_sheet.name)
+            os.replace(temp_index, cache_dir / temp_index.name)
+        evict()
+    except OSError:
+        pass
+
+
+def evict(max_bytes: int = None) -> None:
+    """
+    Delete the least recently used cache entries until the cache is no larger than max_bytes.
+
+    :param max_bytes: Maximum total size of the cache, in bytes (config.cache_max_bytes if None).
+    :return: None.
+    """
+    if max_bytes is None:
+        max_bytes = config.cache_max_bytes
+    cache_dir = Path(config.cache_dir)
+    if not cache_dir.is_dir():
+        return
+    entries = []
+    total = 0
+    for index_file in cache_dir.glob("*.json"):
+        sheet_file = index_file.with_suffix(".npy")
+        try:
+            size = index_file.stat().st_size + (sheet_file.stat().st_size if sheet_file.exists() else 0)
+            entries.append((index_file.stat().st_mtime, index_file, sheet_file, size))
+        except OSError:
+            continue
+        total += size
+    for _, index_file, sheet_file, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        index_file.unlink(missing_ok=True)
+        sheet_file.unlink(missing_ok=True)
+        total -= size
+
+
+def clear() -> None:
+    """Delete every entry in the font dictionary cache."""
+    evict(max_bytes=0)
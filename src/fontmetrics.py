@@ -0,0 +1,68 @@
+import numpy as np
+
+from .lazyfontdict import LazyFontDict
+
+
+class FontMetrics:
+    """
+    Compact tables of the width, top coordinate and bottom coordinate of every character in a font dictionary.
+
+    codepoints: sorted array of the codepoints of the characters in the font dictionary.
+    index_table: array whose entry at each codepoint (up to one past the largest codepoint in the font dictionary)
+        is the index of that character in the tables below.
+    widths, tops, bottoms: arrays of the width, top coordinate and bottom coordinate of each of these characters,
+        followed by one extra entry of zeros that is used for characters that aren't in the font dictionary.
+
+    The top and bottom coordinates of a space are stored as zeros, since spaces don't count towards the height of
+    a text. The tables are used to measure many texts at once with NumPy; see measure().
+    """
+    def __init__(self, font_dict) -> None:
+        keys = sorted(key for key in font_dict.keys() if len(key) == 1)
+        self.codepoints = np.array([ord(key) for key in keys], dtype=np.uint32)
+        size = len(keys) + 1
+        self.widths = np.zeros(size, dtype=np.int32)
+        self.tops = np.zeros(size, dtype=np.int32)
+        self.bottoms = np.zeros(size, dtype=np.int32)
+        self.index_table = np.full(int(self.codepoints.max(initial=0)) + 2, len(keys), dtype=np.int32)
+        self.index_table[self.codepoints] = np.arange(len(keys), dtype=np.int32)
+        for i, key in enumerate(keys):
+            if isinstance(font_dict, LazyFontDict):
+                # use the metadata, so that the images aren't decoded just to measure text
+                fields = font_dict.fields(key)
+                width, top_coord, bottom_coord = fields["width"], fields["top_coord"], fields["bottom_coord"]
+            else:
+                width, top_coord, bottom_coord = (font_dict[key].width, font_dict[key].top_coord,
+                                                  font_dict[key].bottom_coord)
+            self.widths[i] = width
+            if key != " ":
+                self.tops[i] = top_coord
+                self.bottoms[i] = bottom_coord
+
+    def lookup(self, codes: np.ndarray) -> np.ndarray:
+        """Convert an array of codepoints to indices into the tables (the last index for unknown characters)."""
+        # codepoints past the end of the index table are clipped to its last entry, which is unknown
+        return self.index_table[np.minimum(codes, len(self.index_table) - 1)]
+
+    def measure(self, text_list: list) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        Compute the width, top coordinate, and bottom coordinate of each entry in a list of str, all at once.
+
+        Characters that aren't in the font dictionary are ignored, as in drawing.get_bboxes().
+        :param text_list: A list of str to be measured.
+        :return: A tuple of three int arrays: widths, top coordinates and bottom coordinates.
+        """
+        lengths = np.fromiter(map(len, text_list), dtype=np.int64, count=len(text_list))
+        codes = np.frombuffer("".join(text_list).encode("utf-32-le"), dtype=np.uint32)
+        indices = self.lookup(codes)
+
+        widths = np.zeros(len(text_list), dtype=np.int64)
+        tops = np.zeros(len(text_list), dtype=np.int64)
+        bottoms = np.zeros(len(text_list), dtype=np.int64)
+        nonempty = lengths > 0
+        if codes.size:
+            # each reduction runs from the start of one nonempty text to the start of the next one
+            starts = (np.cumsum(lengths) - lengths)[nonempty]
+            widths[nonempty] = np.add.reduceat(self.widths[indices], starts)
+            tops[nonempty] = np.minimum(np.minimum.reduceat(self.tops[indices], starts), 0)
+            bottoms[nonempty] = np.maximum(np.maximum.reduceat(self.bottoms[indices], starts), 0)
+        return widths, tops, bottoms
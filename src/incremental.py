@@ -0,0 +1,229 @@
+"""
+The incremental module saves flashcard decks so that saving an edited deck again only draws and writes the pages
+that changed.
+
+save_flashcards draws and saves the pages of make_flashcards, as save_images would, and writes a manifest next to
+the output (deck.pdf.manifest.json for deck.pdf, for example) with a hash of everything that goes into each page: the
+texts on it and where they go (as laid out by the planner module), the page settings, the font and colors, and the
+output format and encoder options. When the deck is saved again, a page whose hash is in the manifest isn't drawn:
+
+- Pages saved to separate files (deck-1.png, deck-2.png, ...) are left as they are, so only the changed pages'
+  files are written.
+- Pages of a PDF are copied from the old file (the encoded image of each page, as it was written), and only the
+  changed pages are drawn and encoded, so editing one card takes the time of one page plus copying the rest.
+- Other files that hold every page (such as a TIFF file or a zip archive) are written again in full if any page
+  changed, and are left alone otherwise.
+
+Inserting or removing cards moves the cards after them to other positions, so those pages change too; editing a
+card's text (or replacing one card with another) changes only its page.
+"""
+from contextlib import nullcontext
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+import tempfile
+import zlib
+import PIL
+
+from . import fontcache, instrument, planner
+from .main import _generate_flashcards, check_backend
+from .output import ARCHIVE_SUFFIXES, check_workers, encode_image, save_images
+from .pdfwriter import INDEXED_COMPRESS_LEVEL, PdfWriter
+from .quadfont import QuadFont, current_quadfont
+
+# version of the manifest format and of what goes into the hashes, which is changed whenever the drawing changes
+MANIFEST_VERSION = 1
+
+
+def style_digest(quadfont: QuadFont) -> str:
+    """
+    Compute a hash of a QuadFont's font, colors and parameters, for the hashes of pages.
+
+    A font loaded from a file is identified by the hash of the contents of the file (see fontcache.cache_key). A
+    font dictionary that wasn't made from a font file (such as the package's default font) is identified by its
+    size and the measurements of its letters.
+    :param quadfont: The QuadFont.
+    :return: A hex str.
+    """
+    key = fontcache.cache_key(quadfont) if quadfont.font is not None else ""
+    if not key:
+        metrics = quadfont.metrics
+        digest = hashlib.sha256()
+        for array in (metrics.codepoints, metrics.widths, metrics.tops, metrics.bottoms):
+            digest.update(array.tobytes())
+        key = json.dumps([quadfont.size, quadfont.ul_color, quadfont.ur_color, quadfont.ll_color, quadfont.lr_color,
+                          quadfont.non_color, quadfont.substitute_a, quadfont.to_color, quadfont.characters,
+                          digest.hexdigest()])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def page_digests(text_list: list, plan: planner.Layout, settings: dict) -> list:
+    """
+    Compute a hash of everything that goes into each page of a deck.
+
+    :param text_list: List of strings of the deck.
+    :param plan: The Layout of the deck, from planner.plan_flashcards.
+    :param settings: Dict of everything else that goes into every page (JSON-serializable).
+    :return: List of hex str, one per page.
+    """
+    pages = [[] for _ in range(plan.n_pages)]
+    for text, (number, x, y) in zip(text_list, plan.positions):
+        pages[number].append((text, x, y))
+    common = json.dumps(settings, sort_keys=True)
+    digests = []
+    for number, items in enumerate(pages):
+        lines = None if plan.page_lines is None else plan.page_lines[number]
+        digests.append(hashlib.sha256(json.dumps([common, items, lines]).encode()).hexdigest())
+    return digests
+
+
+def _load_manifest(manifest_file: Path) -> dict:
+    try:
+        with open(manifest_file, encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return dict()
+    return manifest if manifest.get("version") == MANIFEST_VERSION else dict()
+
+
+def _save_manifest(manifest: dict, manifest_file: Path) -> None:
+    # written to a temporary file first, so that an interrupted save leaves the old manifest (or none)
+    with tempfile.NamedTemporaryFile("w", dir=manifest_file.parent, suffix=".tmp", delete=False,
+                                     encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(file.name, manifest_file)
+
+
+@instrument.timed("save_flashcards")
+def save_flashcards(text_list: list, output_file, n_rows: int = 0, n_columns: int = 0, width: int = 2550,
+                    height: int = 3450, margins=(0, 0, 0, 0), bg_color=(255, 255, 255),
+                    boundary_color=(180, 180, 180), x_offset=0, y_offset=0, backend: str = "pil", workers: int = 0,
+                    quadfont: QuadFont = None, layout: str = "grid", padding: int = 20, scale: float = 1,
+                    single_file: bool = True, dpi=300, force: bool = False, **options) -> list:
+    """
+    Draw and save the pages of make_flashcards, drawing and writing only the pages that changed since the last save.
+
+    The files written are the same as those of save_images(make_flashcards(...), output_file, ...), except that a
+    PDF file with a single page is also written by PdfWriter, and a manifest of the hashes of the pages is written
+    next to them (see the module docstring). Pages whose hashes are in the manifest of the last save are reused, and
+    files of pages that no longer exist are deleted.
+    :param text_list: List of strings to make colored text images of.
+    :param output_file: Filename of the output file, as for save_images.
+    :param force: Should every page be drawn and written, even if it hasn't changed?
+    :param options: Options for the encoder, as for save_images.
+    :return: List of the Paths of the files of the pages (including those that were reused).
+    The other arguments are as for make_flashcards and save_images.
+    """
+    check_backend(backend)
+    check_workers(workers, "thread")
+    output_file = Path(output_file)
+    quadfont = (quadfont or current_quadfont()).scaled(scale)
+    plan = planner.plan_flashcards(text_list, layout=layout, n_rows=n_rows, n_columns=n_columns, width=width,
+                                   height=height, margins=margins, padding=padding, quadfont=quadfont)
+    page_settings = dict(width=width, height=height, bg_color=bg_color, boundary_color=boundary_color,
+                         n_rows=plan.n_rows, n_columns=plan.n_columns, h_centered=plan.h_centered,
+                         x_offset=x_offset, y_offset=y_offset, backend=backend, quadfont=quadfont)
+    suffix = output_file.suffix.lower()
+    # whether save_images writes all the pages into one file
+    single = suffix in ARCHIVE_SUFFIXES or (single_file and suffix in (".pdf", ".tif", ".tiff"))
+    # the "pil" and "numpy" backends draw the same pages, so only whether the pages are palette images is hashed
+    settings = dict(version=MANIFEST_VERSION, pillow_version=PIL.__version__, style=style_digest(quadfont),
+                    output=[suffix, single, dpi, options], palette=backend == "palette",
+                    page={name: value for name, value in page_settings.items() if name not in ("backend", "quadfont")})
+    digests = page_digests(text_list, plan, settings)
+
+    manifest_file = output_file.with_name(output_file.name + ".manifest.json")
+    old_manifest = dict() if force else _load_manifest(manifest_file)
+    old_pages = old_manifest.get("pages", [])
+    old_files = [output_file.with_name(name) for name in old_manifest.get("files", [])]
+
+    def draw(page_numbers) -> iter:
+        return _generate_flashcards(text_list, plan, workers, page_numbers=set(page_numbers), **page_settings)
+
+    if suffix == ".pdf" and single_file:
+        pages, files = _save_pdf(digests, old_pages, draw, output_file, dpi, options), [output_file]
+    elif single:
+        pages, files = [dict(digest=digest) for digest in digests], [output_file]
+        if [page.get("digest") for page in old_pages] != digests or not output_file.exists():
+            save_images(draw(range(plan.n_pages)), output_file, single_file, dpi, **options)
+        else:
+            instrument.count("pages_reused", plan.n_pages)
+    else:
+        pages = [dict(digest=digest) for digest in digests]
+        if plan.n_pages == 1:
+            files = [output_file]
+        else:
+            files = [output_file.with_name(f"{output_file.stem}-{i + 1}{output_file.suffix}")
+                     for i in range(plan.n_pages)]
+        changed = [i for i, file in enumerate(files) if i >= len(old_pages) or i >= len(old_files) or
+                   old_pages[i].get("digest") != digests[i] or old_files[i] != file or not file.exists()]
+        instrument.count("pages_reused", plan.n_pages - len(changed))
+        for i, image in zip(changed, draw(changed)):
+            files[i].write_bytes(encode_image(image, output_file.suffix, dpi, **options))
+
+    for file in set(old_files).difference(files):
+        file.unlink(missing_ok=True)
+    _save_manifest(dict(version=MANIFEST_VERSION, files=[file.name for file in files], pages=pages), manifest_file)
+    if instrument.active():
+        instrument.count("bytes_written", sum(file.stat().st_size for file in files))
+    return files
+
+
+def _save_pdf(digests: list, old_pages: list, draw, output_file: Path, dpi, options: dict) -> list:
+    """
+    Write the pages of a deck to a PDF file, copying the encoded images of unchanged pages from the old file.
+
+    :return: List of the manifest entries of the pages: their hashes, and where their images are in the new file.
+    """
+    # any page of the old file can be reused, wherever it was
+    reusable = dict()
+    if output_file.exists():
+        reusable = {page["digest"]: page for page in old_pages if "offset" in page}
+    changed = [i for i, digest in enumerate(digests) if digest not in reusable]
+    instrument.count("pages_reused", len(digests) - len(changed))
+    images = draw(changed)
+    pages = []
+    # written to a temporary file first, since the pages are copied from the old file
+    with tempfile.NamedTemporaryFile(dir=output_file.parent, suffix=".tmp", delete=False) as file:
+        temporary_file = Path(file.name)
+        try:
+            with open(output_file, "rb") if reusable else nullcontext() as old_file, PdfWriter(file) as writer:
+                for digest in digests:
+                    if digest in reusable:
+                        page = reusable[digest]
+                        old_file.seek(page["offset"])
+                        data = old_file.read(page["length"])
+                        pixel_width, pixel_height = page["size"]
+                        palette = page.get("palette")
+                    else:
+                        with instrument.Stage("encode"):
+                            image = next(images)
+                            # encoded as PdfWriter.write_image would, keeping the encoded bytes for the manifest
+                            pixel_width, pixel_height = image.size
+                            if image.mode == "P":
+                                data = zlib.compress(image.tobytes(),
+                                                     options.get("compress_level", INDEXED_COMPRESS_LEVEL))
+                                palette = bytes(image.getpalette()).hex()
+                            else:
+                                encoded = io.BytesIO()
+                                image.save(encoded, "JPEG", **options)
+                                data = encoded.getvalue()
+                                palette = None
+                    if palette is None:
+                        image_number = writer.write_jpeg(data, pixel_width, pixel_height)
+                    else:
+                        image_number = writer.write_indexed(data, pixel_width, pixel_height,
+                                                            list(bytes.fromhex(palette)))
+                    writer.add_xobject_page(image_number, pixel_width, pixel_height, dpi)
+                    pages.append(dict(digest=digest, offset=writer.stream_offsets[image_number], length=len(data),
+                                      size=[pixel_width, pixel_height]))
+                    if palette is not None:
+                        pages[-1]["palette"] = palette
+        except BaseException:
+            file.close()
+            temporary_file.unlink()
+            raise
+    os.replace(temporary_file, output_file)
+    return pages
@@ -0,0 +1,173 @@
+"""
+The instrument module records where the time of a render goes, for finding out why a render is slow.
+
+Use recording() as a context manager around the calls to be measured:
+
+    with quadcolor.recording() as record:
+        quadcolor.save_images(quadcolor.iter_flashcards(words, 8, 4), "deck.pdf")
+    print(record.stats())
+    record.save_trace("deck-trace.json")
+
+While a Recording is active, the instrumented stages of the package (making font dictionaries, looking up glyphs,
+drawing text, laying out and drawing pages, drawing the lines between flashcards, and encoding images) are timed
+each time they run, counts are kept (glyphs pasted, pages allocated, bytes written, font dictionary cache hits and
+misses), and the word cache's hits, misses and evictions during the recording are noted. stats() sums these up,
+and trace_events() and save_trace() give each timed call as an event in the Chrome trace format, which can be
+viewed in chrome://tracing or Perfetto.
+
+Everything in the calling process is recorded, including the threads of render_many; the worker processes of
+iter_flashcards and of the batch runner are not. When no Recording is active, an instrumented function only costs
+one extra function call and a check of an empty tuple.
+"""
+from functools import wraps
+import json
+import os
+import threading
+import time
+
+from .wordcache import word_cache
+
+# the Recordings that are active (usually none, or one)
+_recordings: tuple = ()
+_lock = threading.Lock()
+
+
+class Recording:
+    """
+    The timings and counts recorded while a recording() context is active.
+
+    events: list of (stage name, start time, duration, thread id) tuples, with times in seconds from perf_counter.
+    counts: dictionary of the counts, by name.
+    word_cache: dictionary of the word cache's hits, misses and evictions during the recording.
+    """
+    def __init__(self) -> None:
+        self.events = []
+        self.counts = dict()
+        self.word_cache = dict()
+        self.start = None
+        self.end = None
+        self._lock = threading.Lock()
+        self._word_cache_start = None
+
+    def __enter__(self):
+        global _recordings
+        self._word_cache_start = word_cache.stats()
+        self.start = time.perf_counter()
+        with _lock:
+            _recordings = _recordings + (self,)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _recordings
+        with _lock:
+            _recordings = tuple(record for record in _recordings if record is not self)
+        self.end = time.perf_counter()
+        end_stats = word_cache.stats()
+        self.word_cache = {name: end_stats[name] - self._word_cache_start[name]
+                           for name in ("hits", "misses", "evictions")}
+
+    def add_event(self, name: str, start: float, duration: float) -> None:
+        self.events.append((name, start, duration, threading.get_ident()))
+
+    def add_count(self, name: str, n: int) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def stats(self) -> dict:
+        """
+        Sum up the recording.
+
+        :return: A dictionary with the wall time of the recording (wall_ms), and dictionaries of the number of calls,
+            total time and longest time of each stage (stages), of the counts (counts), and of the word cache's hits,
+            misses and evictions (word_cache). Times are in milliseconds.
+        """
+        stages = dict()
+        for name, _, duration, _ in self.events:
+            stage_stats = stages.setdefault(name, dict(calls=0, total_ms=0.0, max_ms=0.0))
+            stage_stats["calls"] += 1
+            stage_stats["total_ms"] += 1000 * duration
+            stage_stats["max_ms"] = max(stage_stats["max_ms"], 1000 * duration)
+        end = self.end if self.end is not None else time.perf_counter()
+        return dict(wall_ms=1000 * (end - self.start), stages=stages, counts=dict(self.counts),
+                    word_cache=dict(self.word_cache))
+
+    def trace_events(self) -> list:
+        """
+        Return the timed calls as Chrome trace events (complete events, with times in microseconds from the start
+        of the recording), followed by one counter event with the final counts.
+        """
+        pid = os.getpid()
+        events = [dict(name=name, cat="quadcolor", ph="X", ts=1e6 * (start - self.start), dur=1e6 * duration,
+                       pid=pid, tid=tid)
+                  for name, start, duration, tid in self.events]
+        end = self.end if self.end is not None else time.perf_counter()
+        events.append(dict(name="counts", cat="quadcolor", ph="C", ts=1e6 * (end - self.start), pid=pid, tid=0,
+                           args=dict(self.counts)))
+        return events
+
+    def save_trace(self, filename) -> None:
+        """Save the trace events to a JSON file that can be opened in chrome://tracing or Perfetto."""
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump(dict(traceEvents=self.trace_events(), displayTimeUnit="ms"), file)
+
+
+def recording() -> Recording:
+    """
+    Make a Recording, to be used as a context manager around the calls whose stages are to be timed and counted.
+
+    :return: The Recording.
+    """
+    return Recording()
+
+
+def active() -> bool:
+    """Return whether any Recording is active (so that counts that take some work to compute can be skipped)."""
+    return bool(_recordings)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to the count of the given name in every active Recording."""
+    for record in _recordings:
+        record.add_count(name, n)
+
+
+def timed(name: str):
+    """
+    Decorator that records each call of a function as a stage of the given name in every active Recording.
+
+    :param name: Name of the stage.
+    :return: The decorator.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _recordings:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                for record in _recordings:
+                    record.add_event(name, start, duration)
+        return wrapper
+    return decorator
+
+
+class Stage:
+    """
+    Context manager that records the code inside it as a stage of the given name in every active Recording.
+    """
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        duration = time.perf_counter() - self.start
+        for record in _recordings:
+            record.add_event(self.name, self.start, duration)
@@ -0,0 +1,67 @@
+from collections.abc import Mapping
+import threading
+
+from .coloredchar import ColoredChar
+
+
+class LazyFontDict(Mapping):
+    """
+    A read-only font dictionary whose ColoredChar entries are only made the first time they are looked up.
+
+    metadata: a dictionary whose keys are the characters in the font, and whose entries are dictionaries of the
+        ColoredChar fields other than the images (x_divide, y_divide, width, top_coord, bottom_coord, and possibly
+        colors and truncate_coord).
+    load_images: a function that takes a character and returns a (mask, quadrants) tuple of its images (with None
+        for the quadrants of a character whose metadata gives its colors).
+
+    Membership tests, iteration and len() only use the metadata, so no images are decoded until a character
+    is actually needed. Use warm_up() to decode some (or all) characters ahead of time. Lookups are safe from
+    several threads at once: each character is decoded only once.
+    """
+    def __init__(self, metadata: dict, load_images) -> None:
+        self._metadata = metadata
+        self._load_images = load_images
+        self._loaded = dict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: chr) -> ColoredChar:
+        colored_char = self._loaded.get(key)
+        if colored_char is not None:
+            return colored_char
+        fields = self._metadata[key]
+        with self._lock:
+            if key not in self._loaded:
+                mask, quadrants = self._load_images(key)
+                self._loaded[key] = ColoredChar(mask=mask, quadrants=quadrants, **fields)
+            return self._loaded[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._metadata
+
+    def __iter__(self):
+        return iter(self._metadata)
+
+    def __len__(self) -> int:
+        return len(self._metadata)
+
+    def fields(self, key: chr) -> dict:
+        """Return the ColoredChar fields of a character other than its images, without decoding the images."""
+        return self._metadata[key]
+
+    def warm_up(self, characters: str = None) -> None:
+        """
+        Decode the images of the given characters now, rather than when they are first drawn.
+
+        :param characters: A string of the characters to decode (all characters in the font if None). Characters
+            that are not in the font are ignored.
+        :return: None.
+        """
+        if characters is None:
+            characters = self._metadata.keys()
+        for char in characters:
+            if char in self._metadata:
+                self[char]
+
+    def loaded_characters(self) -> str:
+        """Return a string of the characters whose images have already been decoded."""
+        return "".join(self._loaded.keys())
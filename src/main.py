@@ -1,49 +1,174 @@
-import math
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import os
+import numpy as np
 from PIL import Image, ImageDraw
-from . import drawing
+from . import compositing, drawing, instrument, pagepool, palette, planner
+from .quadfont import QuadFont, current_quadfont
 
+# ways of drawing the letters: "pil" pastes them into images, "numpy" blends them into arrays (see compositing),
+# "palette" draws them into palette images (see palette)
+BACKENDS = ("pil", "numpy", "palette")
 
-def make_graphics(text_list: list, margins=(0, 0, 0, 0), bg_color=(255, 255, 255)) -> list:
+
+def check_backend(backend: str) -> None:
+    """Raise a ValueError if backend is not one of BACKENDS."""
+    if backend not in BACKENDS:
+        raise ValueError("Backend must be one of " + ", ".join(BACKENDS) + ".")
+
+
+@instrument.timed("make_graphics")
+def make_graphics(text_list: list, margins=(0, 0, 0, 0), bg_color=(255, 255, 255), backend: str = "pil",
+                  quadfont: QuadFont = None, scale: float = 1) -> list:
     """
     Generate a list of colored text images, each having dimensions determined its text.
 
     :param text_list: List of strings to make colored text images of.
     :param margins: Tuple of four ints giving the left, top, right, bottom margins around text, in pixels.
     :param bg_color: Tuple of three ints giving the RGB background color (each int between 0 and 255).
+    :param backend: "pil" to paste the letters into images, or "numpy" to blend them into arrays (the images
+        are identical either way), or "palette" to draw them into "P" mode images with one byte per pixel, which
+        are smaller and faster to save (with the antialiasing of the letters rounded, see the palette module).
+    :param quadfont: The font and style to draw with (the global configuration set by set_font, set_colors and
+        set_parameters if None).
+    :param scale: Factor to scale the letters of the font by (see QuadFont.scaled), for example 0.25 for
+        thumbnails of the same text. The margins are not scaled.
     :return: List of Image.Image's, each one displaying an item from text_list in colored letters.
     """
+    check_backend(backend)
+    quadfont = (quadfont or current_quadfont()).scaled(scale)
     left_margin, top_margin, right_margin, bottom_margin = margins
     images: list = [None for _ in range(len(text_list))]
-    widths, tops, bottoms = drawing.get_bboxes(text_list=text_list)
+    instrument.count("pages_allocated", len(text_list))
+    widths, tops, bottoms = drawing.get_bboxes(text_list=text_list, quadfont=quadfont)
     for i in range(len(text_list)):
-        images[i] = Image.new("RGB", (widths[i] + left_margin + right_margin,
-                                      bottoms[i] - tops[i] + top_margin + bottom_margin), bg_color)
-        images[i] = drawing.draw_text(letters=text_list[i], image=images[i],
-                                      pos=(left_margin + (widths[i] // 2), top_margin - tops[i]),
-                                      h_centered=True, v_centered=False)
+        size = (widths[i] + left_margin + right_margin, bottoms[i] - tops[i] + top_margin + bottom_margin)
+        pos = (left_margin + (widths[i] // 2), top_margin - tops[i])
+        if backend == "numpy":
+            page = compositing.new_page(*size, bg_color=bg_color)
+            compositing.draw_text(letters=text_list[i], page=page, pos=pos, h_centered=True, v_centered=False,
+                                  quadfont=quadfont)
+            images[i] = Image.fromarray(page)
+        elif backend == "palette":
+            page = palette.new_page(*size)
+            palette.draw_text(letters=text_list[i], page=page, pos=pos, h_centered=True, v_centered=False,
+                              quadfont=quadfont)
+            images[i] = palette.to_image(page, palette.make_palette(quadfont, bg_color))
+        else:
+            images[i] = Image.new("RGB", size, bg_color)
+            images[i] = drawing.draw_text(letters=text_list[i], image=images[i], pos=pos,
+                                          h_centered=True, v_centered=False, quadfont=quadfont)
     return images
 
 
-def get_flashcard_size(text_list: list) -> (int, int):
+# ways of lining up the strings of make_array horizontally and vertically
+H_ALIGNMENTS = ("left", "center", "right")
+V_ALIGNMENTS = ("baseline", "center")
+
+
+@instrument.timed("make_array")
+def make_array(text_list: list, size=None, margins=(0, 0, 0, 0), bg_color=(255, 255, 255), h_align: str = "center",
+               v_align: str = "baseline", align_size: int = 1, out=None, quadfont: QuadFont = None) -> np.ndarray:
+    """
+    Draw a list of strings into one (N, height, width, 3) uint8 array of equal-sized images, as for a dataset.
+
+    The images are drawn straight into the array (with the "numpy" backend), without making an Image.Image or a
+    separate array for each string. Unless size is given, every image is just large enough for all the strings
+    to fit, with the margins around them, rounded up to a multiple of align_size (for example 8 or 32, for the
+    tensor shapes of a neural network). A string that doesn't fit in an image of the given size is cropped.
+    :param text_list: List of N strings to make colored text images of.
+    :param size: Tuple of two ints giving the width and height of each image, in pixels (None means to compute
+        them from the strings, as get_flashcard_size does, plus the margins).
+    :param margins: Tuple of four ints giving the left, top, right, bottom margins around text, in pixels.
+    :param bg_color: Tuple of three ints giving the RGB background color (each int between 0 and 255).
+    :param h_align: "left", "center" or "right": where each string goes between the left and right margins.
+    :param v_align: "baseline" to draw every string on the same baseline (so that the letters of all the images
+        line up), or "center" to center each string between the top and bottom margins.
+    :param align_size: Number that the computed width and height are rounded up to a multiple of.
+    :param out: Where to draw the images: None for a new array, the path of a .npy file to create as a
+        memory-mapped array (so that datasets larger than memory can be written), or an existing uint8 array of
+        shape (N, height, width, 3) (such as a slice of a larger array), in which case size is taken from it.
+    :param quadfont: The font and style to draw with (the global configuration if None).
+    :return: The array of images (a numpy.memmap, flushed to the file, when out is a path).
+    """
+    if h_align not in H_ALIGNMENTS:
+        raise ValueError("Horizontal alignment must be one of " + ", ".join(H_ALIGNMENTS) + ".")
+    if v_align not in V_ALIGNMENTS:
+        raise ValueError("Vertical alignment must be one of " + ", ".join(V_ALIGNMENTS) + ".")
+    if type(align_size) != int or align_size <= 0:
+        raise ValueError("Align size must be a positive integer.")
+    if quadfont is None:
+        quadfont = current_quadfont()
+    left_margin, top_margin, right_margin, bottom_margin = margins
+    widths, tops, bottoms = drawing.get_bboxes(text_list, as_arrays=True, quadfont=quadfont)
+    if isinstance(out, np.ndarray):
+        size = (out.shape[2], out.shape[1]) if out.ndim == 4 else None
+    if size is None:
+        inner_height = 0
+        if len(text_list):
+            inner_height = bottoms.max() - tops.min() if v_align == "baseline" else (bottoms - tops).max()
+        width = int(widths.max() if len(text_list) else 0) + left_margin + right_margin
+        height = int(inner_height) + top_margin + bottom_margin
+        size = (-(-max(width, 1) // align_size) * align_size, -(-max(height, 1) // align_size) * align_size)
+    width, height = size
+    if type(width) != int or type(height) != int or width <= 0 or height <= 0:
+        raise ValueError("Width and height must be positive integers.")
+
+    shape = (len(text_list), height, width, 3)
+    if out is None:
+        out = np.empty(shape, dtype=np.uint8)
+    elif isinstance(out, np.ndarray):
+        if out.shape != shape or out.dtype != np.uint8:
+            raise ValueError("Out must be a uint8 array of shape (number of strings, height, width, 3).")
+    else:
+        out = np.lib.format.open_memmap(out, mode="w+", dtype=np.uint8, shape=shape)
+    instrument.count("pages_allocated", 1)
+
+    inner_width, inner_height = width - left_margin - right_margin, height - top_margin - bottom_margin
+    if h_align == "left":
+        x_positions = np.full(len(text_list), left_margin)
+    else:
+        x_positions = left_margin + (inner_width - widths) // (2 if h_align == "center" else 1)
+    if v_align == "baseline":
+        # the same baseline for every string, as low as the strings reaching furthest up need
+        y_positions = np.full(len(text_list), top_margin - (tops.min() if len(text_list) else 0))
+    else:
+        y_positions = top_margin + (inner_height - (bottoms - tops)) // 2 - tops
+    background = compositing.new_page(width, height, bg_color=bg_color)
+    for i, letters in enumerate(text_list):
+        # each image is filled and drawn in turn, so that it is only brought into the CPU caches once
+        out[i] = background
+        compositing.draw_text(letters=letters, page=out[i], pos=(int(x_positions[i]), int(y_positions[i])),
+                              h_centered=False, v_centered=False, quadfont=quadfont)
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+def get_flashcard_size(text_list: list, quadfont: QuadFont = None) -> (int, int):
     """
     Compute the minimum width and height, in pixels, needed to display all the strings in the given list.
 
     This is useful when deciding how large to make flashcards. Each string in the given text list is to be
     set on a flashcard. This function outputs the minimum dimensions that such flashcards must have, if
-    they are all to be the same size, using the current quadcolor font.
+    they are all to be the same size, using the current quadcolor font (or the given QuadFont). To have the number
+    of rows and columns chosen from these sizes, use make_flashcards with layout="auto" (or plan_flashcards).
     :param text_list: List of strings, where each string is to occupy a single flashcard.
+    :param quadfont: The font and style to measure with (the global configuration if None).
     :return: A tuple giving width and height, in pixels.
     """
-    widths, tops, bottoms = drawing.get_bboxes(text_list)
-    heights = [bottoms[i] - tops[i] for i, _ in enumerate(tops)]
-    return max(widths), max(heights)
+    widths, tops, bottoms = drawing.get_bboxes(text_list, as_arrays=True, quadfont=quadfont)
+    return int(widths.max()), int((bottoms - tops).max())
 
 
+@instrument.timed("make_flashcards")
 def make_flashcards(text_list: list,
                     n_rows: int = 0, n_columns: int = 0,
                     width: int = 2550, height: int = 3450,
                     margins=(0, 0, 0, 0), bg_color=(255, 255, 255),
-                    boundary_color=(180, 180, 180), x_offset=0, y_offset=0) -> list:
+                    boundary_color=(180, 180, 180), x_offset=0, y_offset=0, backend: str = "pil",
+                    workers: int = 0, quadfont: QuadFont = None, layout: str = "grid", padding: int = 20,
+                    scale: float = 1) -> list:
     """
     Generate a list of equal-sized four color text images with specified page dimensions and layout.
 
@@ -57,6 +182,14 @@ def make_flashcards(text_list: list,
 
     If n_rows and n_columns both remain at their default values of 0, then the same result is produced
     as if both were equal to 1. That is, each str in text_list will be placed on a single image.
+
+    The above describes the default layout, "grid". With layout="auto", n_rows and n_columns are ignored, and the
+    densest grid on which every string fits on its card (with at least padding pixels between strings) is used
+    instead, so there's no need to find a card size with get_flashcard_size. With layout="packed", the cards are
+    laid out in rows, each card as wide as its string plus the padding, so that short strings share rows; the lines
+    between the cards are drawn in boundary_color, as for a grid. See the planner module.
+
+    All the pages are kept in memory; to render and save a large deck one page at a time, use iter_flashcards.
     :param text_list: List of strings to make colored text images of.
     :param n_rows: Number of rows per page of flashcards.
     :param n_columns: Number of columns per page of flashcards.
@@ -67,63 +200,201 @@ def make_flashcards(text_list: list,
     :param boundary_color: Tuple of three ints giving the RGB color of the lines between flashcards.
     :param x_offset: Amount by which to shift the text of every flashcard horizontally (positive means to the right).
     :param y_offset: Amount by which to shift the text of every flashcard vertically (positive means downward).
-    :return:
+    :param backend: "pil" to paste the letters into images, or "numpy" to blend them into arrays (the images
+        are identical either way), or "palette" to draw them into "P" mode images with one byte per pixel, which
+        are smaller and faster to save (with the antialiasing of the letters rounded, see the palette module).
+    :param workers: Number of worker processes to draw the pages in (0 or 1 means to draw them in the calling
+        process; see iter_flashcards).
+    :param quadfont: The font and style to draw with (the global configuration set by set_font, set_colors and
+        set_parameters if None).
+    :param layout: "grid", "auto" or "packed" (see above).
+    :param padding: Minimum space between strings on neighboring cards, in pixels, for the "auto" and "packed"
+        layouts.
+    :param scale: Factor to scale the letters of the font by (see QuadFont.scaled). The pages, margins and padding
+        are not scaled.
+    :return: List of Image.Image's, one per page.
     """
-    if type(n_rows) != int or type(n_columns) != int:
-        raise ValueError("Number of rows and columns must be nonnegative integers.")
-    if n_rows < 0 or n_columns < 0:
-        raise ValueError("Number of rows and columns must be nonnegative integers.")
-    if type(width) != int or type(height) != int:
-        raise ValueError("Width and height must be positive integers.")
-    if width <= 0 or height <= 0:
-        raise ValueError("Width and height must be positive integers.")
+    return list(iter_flashcards(text_list=text_list, n_rows=n_rows, n_columns=n_columns, width=width, height=height,
+                                margins=margins, bg_color=bg_color, boundary_color=boundary_color,
+                                x_offset=x_offset, y_offset=y_offset, backend=backend, workers=workers,
+                                quadfont=quadfont, layout=layout, padding=padding, scale=scale))
 
-    left_margin, top_margin, right_margin, bottom_margin = margins
-    n_lines = len(text_list)
-
-    images: list
-    if n_rows == 0:
-        # if no rows specified, use 1 row and 1 column
-        n_rows = 1
-        n_columns = 1
-
-    if not n_columns:
-        # only n_rows specified, so multiple lines per image layout
-        n_pages = math.ceil(n_lines / n_rows)
-        h_centered = False
-        images = [Image.new("RGB", (width, height), bg_color) for _ in range(n_pages)]
+
+def iter_flashcards(text_list: list,
+                    n_rows: int = 0, n_columns: int = 0,
+                    width: int = 2550, height: int = 3450,
+                    margins=(0, 0, 0, 0), bg_color=(255, 255, 255),
+                    boundary_color=(180, 180, 180), x_offset=0, y_offset=0, backend: str = "pil",
+                    workers: int = 0, quadfont: QuadFont = None, layout: str = "grid", padding: int = 20,
+                    scale: float = 1):
+    """
+    Generate the same pages as make_flashcards, but one at a time.
+
+    Each page is finished (including the lines between flashcards) before it is yielded, and nothing refers to
+    it afterwards, so only one page needs to be in memory at a time. Passing the result straight to save_images
+    renders and saves a deck of any length in constant memory. The arguments are checked when this function is
+    called, not when the first page is requested.
+
+    With more than one worker, the pages are drawn in a pool of worker processes, each of which gets a copy of the
+    current font dictionary once, when it starts. Finished pages are passed back through shared memory rather
+    than pickled, and are yielded in order, with at most two pages per worker drawn ahead of the one being used.
+    :param text_list: List of strings to make colored text images of.
+    :param n_rows: Number of rows per page of flashcards.
+    :param n_columns: Number of columns per page of flashcards.
+    :param width: Page width in pixels.
+    :param height: Page height in pixels.
+    :param margins: Tuple of four ints giving the left, top, right, bottom margins around text, in pixels.
+    :param bg_color: Tuple of three ints giving the RGB background color (each int between 0 and 255).
+    :param boundary_color: Tuple of three ints giving the RGB color of the lines between flashcards.
+    :param x_offset: Amount by which to shift the text of every flashcard horizontally (positive means to the right).
+    :param y_offset: Amount by which to shift the text of every flashcard vertically (positive means downward).
+    :param backend: "pil" to paste the letters into images, or "numpy" to blend them into arrays (the images
+        are identical either way), or "palette" to draw them into "P" mode images with one byte per pixel, which
+        are smaller and faster to save (with the antialiasing of the letters rounded, see the palette module).
+    :param workers: Number of worker processes to draw the pages in (0 or 1 means to draw them in the calling
+        process).
+    :param quadfont: The font and style to draw with (the global configuration set by set_font, set_colors and
+        set_parameters if None).
+    :param layout: "grid", "auto" or "packed" (see make_flashcards).
+    :param padding: Minimum space between strings on neighboring cards, in pixels, for the "auto" and "packed"
+        layouts.
+    :param scale: Factor to scale the letters of the font by (see QuadFont.scaled). The pages, margins and padding
+        are not scaled.
+    :return: Iterator of Image.Image's, one per page.
+    """
+    check_backend(backend)
+    if type(workers) != int or workers < 0:
+        raise ValueError("Number of workers must be a nonnegative integer.")
+    quadfont = (quadfont or current_quadfont()).scaled(scale)
+    plan = planner.plan_flashcards(text_list, layout=layout, n_rows=n_rows, n_columns=n_columns, width=width,
+                                   height=height, margins=margins, padding=padding, quadfont=quadfont)
+    return _generate_flashcards(text_list, plan, workers, width=width, height=height,
+                                bg_color=bg_color, boundary_color=boundary_color, n_rows=plan.n_rows,
+                                n_columns=plan.n_columns, h_centered=plan.h_centered, x_offset=x_offset,
+                                y_offset=y_offset, backend=backend, quadfont=quadfont)
+
+
+def _generate_flashcards(text_list, plan: planner.Layout, workers, page_numbers=None, **page_settings):
+    """
+    Draw the pages laid out by iter_flashcards, yielding each one as soon as it is finished.
+
+    Only the pages whose numbers are in page_numbers are drawn, if it isn't None.
+    """
+    # positions are in the order of text_list, which fills the pages in order
+    pages = ([(text_list[i], x, y) for i, (_, x, y) in page_positions]
+             for number, page_positions in itertools.groupby(enumerate(plan.positions), key=lambda item: item[1][0])
+             if page_numbers is None or number in page_numbers)
+    if workers > 1:
+        images = pagepool.render_pages(pages, draw_page, workers=workers, **page_settings)
     else:
-        # n_rows and n_columns specified, so a grid layout on each image
-        n_pages = math.ceil(n_lines / (n_rows * n_columns))
-        h_centered = True
-        images = [Image.new("RGB", (width, height), bg_color) for _ in range(n_pages)]
-
-    positions = drawing.compute_layout(images=images,
-                                       top_margin=top_margin, left_margin=left_margin,
-                                       bottom_margin=bottom_margin, right_margin=right_margin,
-                                       n_rows=n_rows, n_columns=n_columns,
-                                       h_centered=h_centered)
-
-    for i, position in enumerate(positions[:n_lines]):
-        page, x, y = position
-        images[page] = drawing.draw_text(letters=text_list[i], image=images[page],
-                                         pos=(x, y), h_centered=h_centered,
-                                         x_offset=x_offset, y_offset=y_offset)
-
-    if n_rows > 1:
-        for page, image in enumerate(images):
-            page_width, page_height = image.size
-            page_draw = ImageDraw.Draw(images[page])
-            for i in range(1, n_rows):
-                page_draw.line([(0, i*page_height//n_rows), (page_width, i*page_height//n_rows)],
-                               fill=boundary_color)
-
-    if n_columns > 1:
-        for page, image in enumerate(images):
-            page_width, page_height = image.size
-            page_draw = ImageDraw.Draw(images[page])
-            for j in range(1, n_columns):
-                page_draw.line([(j*page_width//n_columns, 0), (j*page_width//n_columns, page_height)],
-                               fill=boundary_color)
+        images = (draw_page(items, **page_settings) for items in pages)
+    numbers = range(plan.n_pages) if page_numbers is None else sorted(page_numbers)
+    for number, image in zip(numbers, images):
+        if plan.page_lines is not None:
+            draw_lines(image, plan.page_lines[number], page_settings["boundary_color"])
+        yield image
 
-    return images
+
+def render_many(jobs: list, workers: int = None) -> list:
+    """
+    Draw the images of several jobs at once, in a pool of threads.
+
+    Each job is a dict of keyword arguments for make_flashcards, or for make_graphics if it has kind="graphics" (as
+    in a batch manifest, but with text_list instead of text). Jobs can give different QuadFonts, so several fonts
+    and palettes can be drawn together; jobs that don't give one all use the global configuration as it is when
+    render_many is called, even if it is changed while they are being drawn.
+
+    The pixel work (filling pages, pasting whole strings of letters, and NumPy's blending) is done by Pillow and
+    NumPy, which release the GIL while they run it, so on a machine with several CPUs the threads draw in parallel,
+    up to the limit set by the Python code that runs between those calls. With one CPU, threads can only overlap
+    that Python code with the pixel work, which gives a much smaller speedup (see benchmarks/bench_threads.py).
+    :param jobs: List of dicts of keyword arguments, one per job.
+    :param workers: Number of threads (None means one per CPU).
+    :return: List of the lists of Image.Image's of the jobs, in the order of jobs.
+    """
+    if workers is not None and (type(workers) != int or workers <= 0):
+        raise ValueError("Number of workers must be a positive integer.")
+    quadfont = current_quadfont()
+    calls = []
+    for job in jobs:
+        job = dict(job)
+        kind = job.pop("kind", "flashcards")
+        if kind not in ("flashcards", "graphics"):
+            raise ValueError("Kind must be flashcards or graphics.")
+        job["quadfont"] = job.get("quadfont") or quadfont
+        calls.append((make_graphics if kind == "graphics" else make_flashcards, job))
+    if not calls:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(calls))) as pool:
+        return list(pool.map(lambda call: call[0](**call[1]), calls))
+
+
+@instrument.timed("draw_page")
+def draw_page(items: list, width: int, height: int, bg_color, boundary_color, n_rows: int, n_columns: int,
+              h_centered: bool, x_offset: int, y_offset: int, backend: str, quadfont: QuadFont) -> Image.Image:
+    """
+    Draw one page of flashcards.
+
+    :param items: List of (text, x, y) tuples giving each string on the page and its position (from compute_layout).
+    :return: The page, as an Image.Image. The other parameters are as for make_flashcards.
+    """
+    instrument.count("pages_allocated")
+    if backend == "numpy":
+        page = compositing.new_page(width, height, bg_color=bg_color)
+        for text, x, y in items:
+            compositing.draw_text(letters=text, page=page, pos=(x, y), h_centered=h_centered,
+                                  x_offset=x_offset, y_offset=y_offset, quadfont=quadfont)
+        image = Image.fromarray(page)
+    elif backend == "palette":
+        page = palette.new_page(width, height)
+        for text, x, y in items:
+            palette.draw_text(letters=text, page=page, pos=(x, y), h_centered=h_centered,
+                              x_offset=x_offset, y_offset=y_offset, quadfont=quadfont)
+        image = palette.to_image(page, palette.make_palette(quadfont, bg_color, boundary_color))
+    else:
+        image = Image.new("RGB", (width, height), bg_color)
+        for text, x, y in items:
+            image = drawing.draw_text(letters=text, image=image, pos=(x, y), h_centered=h_centered,
+                                      x_offset=x_offset, y_offset=y_offset, quadfont=quadfont)
+    draw_boundaries(image, n_rows, n_columns, boundary_color)
+    return image
+
+
+@instrument.timed("draw_boundaries")
+def draw_boundaries(image: Image.Image, n_rows: int, n_columns: int, boundary_color=(180, 180, 180)) -> None:
+    """
+    Draw the lines between the rows and columns of flashcards on a page.
+
+    :param image: The page.
+    :param n_rows: Number of rows of flashcards on the page.
+    :param n_columns: Number of columns of flashcards on the page.
+    :param boundary_color: Tuple of three ints giving the RGB color of the lines (a palette image's lines are drawn
+        in its boundary color, palette.BOUNDARY_INDEX).
+    :return: None (image is modified in place).
+    """
+    if image.mode == "P":
+        boundary_color = palette.BOUNDARY_INDEX
+    page_width, page_height = image.size
+    page_draw = ImageDraw.Draw(image)
+    for i in range(1, n_rows):
+        page_draw.line([(0, i*page_height//n_rows), (page_width, i*page_height//n_rows)], fill=boundary_color)
+    for j in range(1, n_columns):
+        page_draw.line([(j*page_width//n_columns, 0), (j*page_width//n_columns, page_height)], fill=boundary_color)
+
+
+@instrument.timed("draw_boundaries")
+def draw_lines(image: Image.Image, lines: list, boundary_color=(180, 180, 180)) -> None:
+    """
+    Draw the lines between the cards of a page of a packed layout.
+
+    :param image: The page.
+    :param lines: List of ((x0, y0), (x1, y1)) line segments (from planner.Layout.page_lines).
+    :param boundary_color: Tuple of three ints giving the RGB color of the lines (a palette image's lines are drawn
+        in its boundary color, palette.BOUNDARY_INDEX).
+    :return: None (image is modified in place).
+    """
+    if image.mode == "P":
+        boundary_color = palette.BOUNDARY_INDEX
+    page_draw = ImageDraw.Draw(image)
+    for line in lines:
+        page_draw.line(line, fill=boundary_color)
@@ -1,35 +1,239 @@
-import matplotlib.pyplot as plt
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import io
+import itertools
 from pathlib import Path
+import tarfile
+import time
+import zipfile
+from PIL import Image, TiffImagePlugin
+from . import instrument
+from .pdfwriter import PdfWriter
+
+# suffixes of the archives that save_images can write the images into, in one pass
+ARCHIVE_SUFFIXES = (".zip", ".tar")
+# suffixes of the formats that can hold several images in one file, one per page
+MULTIPAGE_SUFFIXES = (".pdf", ".tif", ".tiff")
 
 
 def display_images(images: list) -> None:
     """Use matplotlib to display a list of images."""
+    # matplotlib is slow to import and only needed here, so don't import it when the package loads
+    import matplotlib.pyplot as plt
     for i, img in enumerate(images):
         plt.imshow(img)
         plt.show()
 
 
-def save_images(images: list, output_file, single_file=True, dpi=300) -> None:
+@instrument.timed("save_images")
+def save_images(images, output_file, single_file=True, dpi=300, workers: int = 0, executor: str = "thread",
+                **options) -> list:
     """
     Save a list of images, according to the conventions of the image save method in the Pillow package.
 
     The actual saving is done via the Pillow package, so whatever output formats that package can handle (as
     specified by the file extension) can be used here. If single_file is True and the output format can be
-    used to save multiple images into a single file (as for pdf files, one image per page), then all images
-    will be saved to a single file.
-    :param images: List of Image.Images to be saved.
+    used to save multiple images into a single file (as for pdf and tiff files, one image per page), then all
+    images will be saved to a single file.
+
+    If output_file ends in .zip or .tar after the image format (as in cards.png.zip), the images are encoded in
+    that format and written into a single archive, in one pass, as the files that would otherwise be written
+    (cards-1.png, cards-2.png, ...). This avoids writing many small files.
+
+    images can be any iterable, such as the iterator returned by iter_flashcards. Each image is written as soon
+    as it is produced and not referred to afterwards, so pages can be generated and saved one at a time.
+
+    When the images are written to separate files (or into an archive), they can be encoded by several workers at
+    once (see encode_images); the files are still written in order by the calling thread.
+    :param images: Iterable of Image.Images to be saved.
     :param output_file: Filename of the output file (will be appended with "-number" if multiple files are saved).
     :param single_file: Should all the images be saved to a single output file, if possible (as for a pdf)?
     :param dpi: Dots per inch in the output file.
-    :return: None.
-    """
-    output_file = Path(output_file)
-    if output_file.suffix:
-        if len(images) == 1:
-            images[0].save(output_file, dpi=(dpi, dpi))
-        elif output_file.suffix == ".pdf" and single_file:
-            images[0].save(output_file, save_all=True, append_images=images[1:], dpi=(dpi, dpi))
-        else:
-            for i, image in enumerate(images):
-                stem = Path(str(output_file.with_suffix("")) + "-" + str(i + 1))
-                image.save(stem.with_suffix(output_file.suffix), dpi=(dpi, dpi))
+    :param workers: Number of workers to encode separate files in (0 or 1 means to encode them one at a time).
+    :param executor: "thread" to encode in a pool of threads, or "process" to use a pool of worker processes.
+    :param options: Options for the encoder, passed to Pillow's save method (for example, compress_level and
+        optimize for png files, or quality for jpeg files and for the pages of a single-file pdf).
+    :return: List of the Paths of the files that were written.
+    """
+    check_workers(workers, executor)
+    files = _save_images(images, Path(output_file), single_file, dpi, workers, executor, options)
+    if instrument.active():
+        instrument.count("bytes_written", sum(file.stat().st_size for file in files))
+    return files
+
+
+def check_workers(workers: int, executor: str) -> None:
+    """Raise a ValueError if workers is not a nonnegative integer or executor is not "thread" or "process"."""
+    if type(workers) != int or workers < 0:
+        raise ValueError("Number of workers must be a nonnegative integer.")
+    if executor not in ("process", "thread"):
+        raise ValueError('Executor must be "process" or "thread".')
+
+
+def _save_images(images, output_file: Path, single_file: bool, dpi: int, workers: int, executor: str,
+                 options: dict) -> list:
+    """Save images as save_images does, encoding each one as an instrumented stage."""
+    if not output_file.suffix:
+        return []
+    if output_file.suffix.lower() in ARCHIVE_SUFFIXES:
+        return _save_archive(images, output_file, dpi, workers, executor, options)
+    images = iter(images)
+    first = next(images, None)
+    if first is None:
+        return []
+    second = next(images, None)
+    if second is None:
+        with instrument.Stage("encode"):
+            _save_image(first, output_file, output_file.suffix, dpi, options)
+        return [output_file]
+    images = itertools.chain((first, second), images)
+    del first, second
+
+    suffix = output_file.suffix.lower()
+    if suffix in MULTIPAGE_SUFFIXES and single_file:
+        _write_pages(images, output_file, suffix, dpi, options)
+    else:
+        files = []
+        stem = str(output_file.with_suffix(""))
+        for i, data in enumerate(encode_images(images, output_file.suffix, dpi, workers, executor, **options)):
+            files.append(Path(f"{stem}-{i + 1}{output_file.suffix}"))
+            files[-1].write_bytes(data)
+        return files
+    return [output_file]
+
+
+def _save_archive(images, output_file: Path, dpi: int, workers: int, executor: str, options: dict) -> list:
+    """Encode images and write them into a zip or tar archive, as the files that save_images would write."""
+    image_suffix = Path(output_file.stem).suffix
+    if not image_suffix:
+        raise ValueError("The name of an archive must include the image format, as in cards.png.zip.")
+    stem = Path(output_file.stem).stem
+    encoded = encode_images(images, image_suffix, dpi, workers, executor, **options)
+    if output_file.suffix.lower() == ".zip":
+        # the images are already compressed, so they are stored as they are
+        with zipfile.ZipFile(output_file, "w", compression=zipfile.ZIP_STORED) as archive:
+            for i, data in enumerate(encoded):
+                archive.writestr(f"{stem}-{i + 1}{image_suffix}", data)
+    else:
+        with tarfile.open(output_file, "w") as archive:
+            for i, data in enumerate(encoded):
+                member = tarfile.TarInfo(f"{stem}-{i + 1}{image_suffix}")
+                member.size = len(data)
+                member.mtime = int(time.time())
+                archive.addfile(member, io.BytesIO(data))
+    return [output_file]
+
+
+def encode_image(image: Image.Image, image_format: str, dpi=300, **options) -> bytes:
+    """
+    Encode an image in memory.
+
+    :param image: The image.
+    :param image_format: The format, as a Pillow format name ("PNG") or a file extension ("png" or ".png").
+    :param dpi: Dots per inch in the encoded file.
+    :param options: Options for the encoder, as for save_images.
+    :return: The encoded image.
+    """
+    data = io.BytesIO()
+    with instrument.Stage("encode"):
+        _save_image(image, data, image_format, dpi, options)
+    return data.getvalue()
+
+
+def _save_image(image: Image.Image, file, image_format: str, dpi, options: dict) -> None:
+    """
+    Save one image to a file name or binary file object, in a Pillow format name or file extension's format.
+
+    Palette images (from the "palette" backend) are converted to RGB for formats that can't hold them (JPEG), and
+    written to PDF files by PdfWriter, which compresses them (Pillow writes their pixels as hexadecimal text).
+    """
+    extension = "." + image_format.lower().lstrip(".")
+    pillow_format = Image.registered_extensions().get(extension, image_format.upper())
+    if image.mode == "P" and pillow_format == "PDF":
+        with PdfWriter(file) as writer:
+            writer.add_image_page(image, dpi=dpi, **options)
+        return
+    if image.mode == "P" and pillow_format == "JPEG":
+        image = image.convert("RGB")
+    image.save(file, pillow_format, dpi=(dpi, dpi), **options)
+
+
+def encode_pages(images, image_format: str, dpi=300, **options) -> bytes:
+    """
+    Encode images in memory as the pages of one PDF or TIFF file, as save_images writes them to a single file.
+
+    :param images: Iterable of Image.Images to be encoded.
+    :param image_format: "PDF" or "TIFF", as a Pillow format name or a file extension ("pdf", ".tif" or ".tiff").
+    :param dpi: Dots per inch in the encoded file.
+    :param options: Options for the encoder, as for save_images.
+    :return: The encoded file.
+    """
+    extension = "." + image_format.lower().lstrip(".")
+    if extension not in MULTIPAGE_SUFFIXES:
+        raise ValueError("Only PDF and TIFF files can hold several images.")
+    images = iter(images)
+    first = next(images, None)
+    if first is None:
+        raise ValueError("There are no images to encode.")
+    second = next(images, None)
+    data = io.BytesIO()
+    if second is None:
+        with instrument.Stage("encode"):
+            _save_image(first, data, extension, dpi, options)
+    else:
+        images = itertools.chain((first, second), images)
+        del first, second
+        _write_pages(images, data, extension, dpi, options)
+    return data.getvalue()
+
+
+def _write_pages(images, file, suffix: str, dpi, options: dict) -> None:
+    """Write images to a file name or binary file object as the pages of one PDF or TIFF file."""
+    if suffix.lower() == ".pdf":
+        with PdfWriter(file) as writer:
+            for image in images:
+                with instrument.Stage("encode"):
+                    writer.add_image_page(image, dpi=dpi, **options)
+    else:
+        with TiffImagePlugin.AppendingTiffWriter(file, True) as tiff_file:
+            for image in images:
+                with instrument.Stage("encode"):
+                    image.save(tiff_file, format="TIFF", dpi=(dpi, dpi), **options)
+                    tiff_file.newFrame()
+
+
+def encode_images(images, image_format: str, dpi=300, workers: int = 0, executor: str = "thread", **options):
+    """
+    Encode images in memory, possibly several at once, yielding the encoded images in order.
+
+    With more than one worker, the images are encoded in a pool of threads or processes, with at most two images
+    per worker submitted ahead of the one being yielded, so that a long iterator of images (such as that of
+    iter_flashcards) is never held in memory all at once. Images sent to worker processes have to be pickled, so
+    threads are usually faster.
+    :param images: Iterable of Image.Images to be encoded.
+    :param image_format: The format, as a Pillow format name ("PNG") or a file extension ("png" or ".png").
+    :param dpi: Dots per inch in the encoded files.
+    :param workers: Number of workers (0 or 1 means to encode the images one at a time in the calling thread).
+    :param executor: "thread" for a pool of threads, or "process" for a pool of worker processes.
+    :param options: Options for the encoder, as for save_images.
+    :return: Iterator of the encoded images, as bytes.
+    """
+    check_workers(workers, executor)
+    return _generate_encoded(images, image_format, dpi, workers, executor, options)
+
+
+def _generate_encoded(images, image_format: str, dpi, workers: int, executor: str, options: dict):
+    if workers <= 1:
+        for image in images:
+            yield encode_image(image, image_format, dpi, **options)
+        return
+    pool_class = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        in_flight = deque()
+        for image in images:
+            in_flight.append(pool.submit(encode_image, image, image_format, dpi, **options))
+            del image
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
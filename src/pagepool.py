@@ -0,0 +1,97 @@
+"""
+The pagepool module draws pages of flashcards in a pool of worker processes (see main.iter_flashcards).
+
+Each worker gets a copy of the QuadFont (including its font dictionary) once, from the pool's initializer, so the
+tasks themselves only carry the text and positions of the strings on one page. Pickling a finished page takes
+longer than drawing it, so workers copy each page into one of a ring of shared memory blocks instead, and the
+calling process copies it back out into a new image. Palette pages (see the palette module) are copied one byte per
+pixel, and their palettes are sent back with the tasks' results.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from PIL import Image
+
+from . import config, instrument
+
+# function and settings used by the worker processes to draw pages, set once per worker by _init_worker
+_worker_draw_page = None
+_worker_page_settings: dict = dict()
+# shared memory blocks that the worker has attached to, by name
+_worker_blocks: dict = dict()
+
+
+def _init_worker(word_cache_enabled: bool, draw_page, page_settings: dict) -> None:
+    global _worker_draw_page, _worker_page_settings
+    config.word_cache_enabled = word_cache_enabled
+    _worker_draw_page = draw_page
+    _worker_page_settings = page_settings
+
+
+def _draw_into_block(block_name: str, items: list) -> list:
+    """
+    Draw a page and copy its pixels into the named shared memory block, four bytes per pixel (one for a palette
+    image).
+
+    :return: The palette of the page if it is a palette image, or None.
+    """
+    if block_name not in _worker_blocks:
+        _worker_blocks[block_name] = shared_memory.SharedMemory(name=block_name)
+    image = _worker_draw_page(items, **_worker_page_settings)
+    if image.mode == "P":
+        data = image.tobytes()
+        _worker_blocks[block_name].buf[:len(data)] = data
+        return image.getpalette()
+    # Pillow stores RGB pixels in four bytes, so this layout is the quickest to copy back out in the calling process
+    data = image.tobytes("raw", "RGBX")
+    _worker_blocks[block_name].buf[:len(data)] = data
+    return None
+
+
+def render_pages(pages, draw_page, workers: int, **page_settings):
+    """
+    Draw pages of flashcards in a pool of worker processes, yielding them in order.
+
+    :param pages: Iterable of lists of (text, x, y) tuples, one list per page.
+    :param draw_page: The function that draws a page, given one of those lists and page_settings as keyword
+        arguments (it is sent to the workers, so it must be a module-level function).
+    :param workers: Number of worker processes.
+    :param page_settings: Keyword arguments for draw_page that are the same for every page, including width,
+        height and the QuadFont to draw with.
+    :return: Iterator of the drawn pages, as RGB Image.Image's (or palette ones, if draw_page draws those).
+    """
+    size = (page_settings["width"], page_settings["height"])
+    n_bytes = size[0] * size[1] * 4
+    # two blocks per worker, so that each worker has its next page to draw while its last one is copied out
+    blocks = [shared_memory.SharedMemory(create=True, size=n_bytes) for _ in range(2 * workers)]
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(config.word_cache_enabled, draw_page, page_settings)) as pool:
+            pages = iter(pages)
+            free_blocks = deque(blocks)
+            in_flight = deque()
+            while True:
+                while free_blocks:
+                    items = next(pages, None)
+                    if items is None:
+                        break
+                    block = free_blocks.popleft()
+                    in_flight.append((pool.submit(_draw_into_block, block.name, items), block))
+                if not in_flight:
+                    return
+                future, block = in_flight.popleft()
+                with instrument.Stage("wait_for_page"):
+                    page_palette = future.result()
+                with instrument.Stage("copy_page"):
+                    if page_palette is None:
+                        image = Image.frombytes("RGB", size, block.buf[:n_bytes], "raw", "RGBX")
+                    else:
+                        image = Image.frombytes("P", size, block.buf[:size[0] * size[1]])
+                        image.putpalette(page_palette)
+                instrument.count("pages_allocated")
+                free_blocks.append(block)
+                yield image
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,202 @@
+"""
+The palette module draws pages as palette ("P" mode) images, which take one byte per pixel instead of the four that
+Pillow uses for an RGB pixel, and which PNG, TIFF and PDF files store as they are, without compressing three color
+bands.
+
+The pixels of a page can only be the background color, the color of the lines between flashcards, or one of the
+colors of the letters (the four quadrant colors, the color of uncolored letters, and the white at the top of a
+substituted "a") blended with the background by the antialiasing of the letters' edges. The palette of a page holds
+the background, the line color and LEVELS blends of each color of the letters, from faint to solid (see
+make_palette), so the masks of the letters are rounded to LEVELS levels instead of 255, which can't be seen at
+print resolution.
+
+Each letter is converted once per QuadFont to an array of palette indices (0 where the letter isn't drawn), and
+the letters of a string are laid side by side in a line array, which is kept in the word cache like the strips of
+the other backends. Drawing a line on a page only copies its nonzero indices, since the blends with the
+background are already in the palette. Where the letters of two lines overlap (a word that runs past its flashcard
+into the next one, say), the blend of the two isn't in the palette, so each pixel gets whichever of the two indices
+is nearer to that blend (see OVERWRITES): the faint edge of a letter doesn't wipe out the solid ink of another, and
+a nearly solid letter covers whatever is under it, as pasting it would.
+"""
+from dataclasses import dataclass
+import numpy as np
+from PIL import Image, ImageColor
+
+from . import config, instrument
+from .drawing import get_colored_chars
+from .quadfont import QuadFont, current_quadfont
+from .wordcache import word_cache
+
+# number of blends of each color of the letters with the background in the palette
+LEVELS = 42
+# palette indices of the background and of the lines between flashcards
+BACKGROUND_INDEX = 0
+BOUNDARY_INDEX = 1
+# palette index of the faintest blend of the first color of the letters
+FIRST_LETTER_INDEX = 2
+# the level (0 for the background and the lines, up to LEVELS for solid) of the blend at each palette index
+INDEX_LEVELS = np.zeros(256, dtype=np.int32)
+INDEX_LEVELS[FIRST_LETTER_INDEX:] = np.arange(256 - FIRST_LETTER_INDEX) % LEVELS + 1
+# OVERWRITES[old, new] is whether drawing index new over index old gives new rather than old. Pasting a letter at
+# level m over a letter at level a gives a blend that differs from the new index by about a * (1 - m) and from the
+# old one by about m (in units of the distance between a letter's color and the background), so the new index is
+# kept when a * (LEVELS - m) <= m * LEVELS.
+OVERWRITES = (INDEX_LEVELS[:, np.newaxis] * (LEVELS - INDEX_LEVELS) <= INDEX_LEVELS * LEVELS) & (INDEX_LEVELS > 0)
+
+
+@dataclass
+class IndexLine:
+    """
+    A string of letters laid out by make_index_line, ready to be drawn into pages by draw_text.
+
+    indices: the read-only (height, width) uint8 array of the palette indices of the letters (0 where the letters
+        aren't drawn).
+    top_coord: the top coordinate of the line, relative to the baseline of the letters.
+    """
+    indices: np.ndarray
+    top_coord: int
+
+    @property
+    def n_bytes(self) -> int:
+        """Memory used by the array."""
+        return self.indices.nbytes
+
+
+def letter_colors(quadfont: QuadFont) -> list:
+    """The colors of the letters of a QuadFont, in the order of their blends in the palette."""
+    return [quadfont.ul_color, quadfont.ur_color, quadfont.ll_color, quadfont.lr_color, quadfont.non_color,
+            (255, 255, 255)]
+
+
+def make_palette(quadfont: QuadFont, bg_color=(255, 255, 255), boundary_color=(180, 180, 180)) -> list:
+    """
+    Make the palette of pages drawn with a QuadFont.
+
+    :param quadfont: The font and style of the letters.
+    :param bg_color: The RGB background color (or a color name).
+    :param boundary_color: The RGB color of the lines between flashcards (or a color name).
+    :return: List of 768 ints, the red, green and blue of each of 256 colors, as for Image.putpalette.
+    """
+    if isinstance(bg_color, str):
+        bg_color = ImageColor.getrgb(bg_color)
+    if isinstance(boundary_color, str):
+        boundary_color = ImageColor.getrgb(boundary_color)
+    background = np.array(bg_color[:3], dtype=np.uint32)
+    colors = np.array([color[:3] for color in letter_colors(quadfont)], dtype=np.uint32)
+    weights = np.array([round(level * 255 / LEVELS) for level in range(1, LEVELS + 1)], dtype=np.uint32)
+    # blended as Pillow's paste blends, with the same rounding (see compositing.blend)
+    blends = background * (255 - weights[np.newaxis, :, np.newaxis]) + colors[:, np.newaxis] * weights[:, np.newaxis]
+    blends = ((blends + 128) + ((blends + 128) >> 8)) >> 8
+    entries = [tuple(background.tolist()), tuple(boundary_color[:3])]
+    entries += [tuple(blend) for blend in blends.reshape(-1, 3).tolist()]
+    entries += [(0, 0, 0)] * (256 - len(entries))
+    return [value for entry in entries for value in entry]
+
+
+def get_glyph_indices(letters: str, quadfont: QuadFont = None) -> list:
+    """
+    Get the arrays of palette indices of the letters of a string, converting them only once per font.
+
+    Each pixel gets the blend of the color of its quadrant (the nearest of the colors of the letters, since the
+    quadrants images of the default font are JPEG images) at the level of its mask.
+    :param letters: String of letters.
+    :param quadfont: The font and style of the letters (the global configuration if None).
+    :return: A list of (height, width) uint8 arrays.
+    """
+    if quadfont is None:
+        quadfont = current_quadfont()
+    arrays = quadfont.glyph_indices
+    missing = [letter for letter in dict.fromkeys(letters) if letter not in arrays]
+    colors = np.array(letter_colors(quadfont), dtype=np.int32)
+    for letter, colored_char in zip(missing, get_colored_chars("".join(missing), quadfont)):
+        mask = np.asarray(colored_char.mask).astype(np.uint16)
+        levels = (mask * LEVELS + 127) // 255
+        quadrants = np.asarray(colored_char.quadrants.convert("RGB")).astype(np.int32)
+        distances = ((quadrants[:, :, np.newaxis] - colors) ** 2).sum(axis=3)
+        color_indices = distances.argmin(axis=2)
+        indices = np.where(levels > 0, FIRST_LETTER_INDEX + color_indices * LEVELS + levels - 1, 0)
+        arrays[letter] = indices.astype(np.uint8)
+    return [arrays[letter] for letter in letters]
+
+
+@instrument.timed("make_line")
+def make_index_line(letters: str, quadfont: QuadFont = None) -> IndexLine:
+    """
+    Lay out the palette indices of the letters of a string side by side, as compositing.make_line does.
+
+    :param letters: String of letters.
+    :param quadfont: The font and style of the letters (the global configuration if None).
+    :return: The IndexLine.
+    """
+    colored_chars = get_colored_chars(letters, quadfont)
+    glyph_indices = get_glyph_indices(letters, quadfont)
+    width = sum(colored_char.width for colored_char in colored_chars)
+    top_coord = min((colored_char.top_coord for colored_char in colored_chars), default=0)
+    bottom_coord = max((colored_char.bottom_coord for colored_char in colored_chars), default=0)
+
+    indices = np.zeros((bottom_coord - top_coord, width), dtype=np.uint8)
+    x = 0
+    for colored_char, glyph in zip(colored_chars, glyph_indices):
+        y = colored_char.top_coord - top_coord
+        height, glyph_width = glyph.shape
+        indices[y:y + height, x:x + glyph_width] = glyph
+        x += colored_char.width
+    indices.flags.writeable = False
+    return IndexLine(indices=indices, top_coord=top_coord)
+
+
+@instrument.timed("draw_text")
+def draw_text(letters: str, page: np.ndarray, pos=(0, 0),
+              h_centered: bool = True, v_centered: bool = True,
+              x_offset=0, y_offset=0, quadfont: QuadFont = None) -> np.ndarray:
+    """
+    Draw the specified letters string into a page array of palette indices, like drawing.draw_text does in an image.
+
+    :param letters: String of letters to be drawn.
+    :param page: A (height, width) uint8 array of palette indices to draw the letters in.
+    :param pos: (x, y) tuple of int giving the image coordinates of the position for the letters.
+    :param h_centered: Should the text be centered horizontally at the specified position?
+    :param v_centered: Should the text be shifted vertically by half the x-height?
+    :param x_offset: Amount by which to shift the text horizontally (positive means to the right).
+    :param y_offset: Amount by which to shift the text vertically (positive means downward).
+    :param quadfont: The font and style to draw with (the global configuration if None).
+    :return: The page array, with the letters drawn in it.
+    """
+    x_pos, y_pos = pos
+    if quadfont is None:
+        quadfont = current_quadfont()
+
+    y_shift = 0
+    if v_centered and "x" in quadfont.font_dict.keys():
+        # to vertically center, offset by half the x-height
+        y_shift = quadfont.font_dict["x"].mask.size[1] // 2
+
+    if config.word_cache_enabled:
+        line = word_cache.get(letters, quadfont, make_index_line)
+    else:
+        line = make_index_line(letters, quadfont)
+    indices = line.indices
+    x = (x_pos - (indices.shape[1] // 2) if h_centered else int(x_pos)) + x_offset
+    y = y_pos + line.top_coord + y_shift + y_offset
+    instrument.count("glyphs_pasted", len(letters))
+
+    height, width = indices.shape
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + width, page.shape[1]), min(y + height, page.shape[0])
+    if x0 < x1 and y0 < y1:
+        region = indices[y0 - y:y1 - y, x0 - x:x1 - x]
+        target = page[y0:y1, x0:x1]
+        np.copyto(target, region, where=OVERWRITES[target, region])
+    return page
+
+
+def new_page(width: int, height: int) -> np.ndarray:
+    """Make a (height, width) uint8 page array of palette indices, filled with the background."""
+    return np.full((height, width), BACKGROUND_INDEX, dtype=np.uint8)
+
+
+def to_image(page: np.ndarray, palette: list) -> Image.Image:
+    """Make a palette image of a page array, with the given palette (from make_palette)."""
+    image = Image.frombytes("P", page.shape[::-1], page.tobytes())
+    image.putpalette(palette)
+    return image
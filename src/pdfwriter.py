@@ -0,0 +1,220 @@
+"""
+The pdfwriter module contains PdfWriter, a minimal PDF writer that writes each page as soon as it is added.
+
+Pillow can only write a multi-page PDF when it is given all the pages at once (or by reparsing the whole file to
+append each page, which takes time quadratic in the number of pages). PdfWriter keeps only the byte offsets of
+the objects it has written, so pages can be generated, written and discarded one at a time.
+
+Besides pages that are a single image, PdfWriter can write images with soft masks (transparency) to be placed on
+any number of pages, and pages with any content, which is what vectorpdf uses to write flashcards with each glyph
+embedded once.
+"""
+import io
+from pathlib import Path
+import zlib
+from PIL import Image
+
+# zlib compression level of palette images, unless compress_level is given (a little larger than Pillow's PNG default
+# of 6, but more than twice as fast)
+INDEXED_COMPRESS_LEVEL = 3
+
+
+class PdfWriter:
+    """
+    Write a PDF file page by page.
+
+    Use it as a context manager (or call close() when done), so that the page tree, cross-reference table and
+    trailer are written at the end:
+
+        with PdfWriter("out.pdf") as writer:
+            for image in images:
+                writer.add_image_page(image, dpi=300)
+    """
+    def __init__(self, file) -> None:
+        """
+        :param file: Filename of the output file, or a binary file object to write to.
+        """
+        if isinstance(file, (str, Path)):
+            self._file = open(file, "wb")
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        self._position = 0
+        # byte offset of each object, by object number (object 0 is the head of the free list)
+        self._offsets = [0]
+        # byte offset of the stream of each object that has one, by object number
+        self.stream_offsets = dict()
+        self._page_numbers = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        # the page tree and catalog are written last, but other objects refer to them, so they are numbered first
+        self._pages_number = self.reserve()
+        self._catalog_number = self.reserve()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._position += len(data)
+
+    def reserve(self) -> int:
+        """Reserve an object number, for an object to be written later with write_object()."""
+        self._offsets.append(None)
+        return len(self._offsets) - 1
+
+    def write_object(self, number: int, dictionary: str, stream: bytes = None) -> int:
+        """
+        Write an indirect object.
+
+        :param number: The object number, from reserve() (or None to reserve a new one).
+        :param dictionary: The object itself, in PDF syntax (a dictionary, if there is a stream). The stream's
+            /Length entry is added automatically.
+        :param stream: The contents of the object's stream, if it has one.
+        :return: The object number.
+        """
+        if number is None:
+            number = self.reserve()
+        self._offsets[number] = self._position
+        if stream is not None:
+            dictionary = dictionary[:dictionary.rindex(">>")] + f" /Length {len(stream)} >>"
+        self._write(f"{number} 0 obj\n{dictionary}\n".encode("latin-1"))
+        if stream is not None:
+            self._write(b"stream\n")
+            self.stream_offsets[number] = self._position
+            self._write(stream + b"\nendstream\n")
+        self._write(b"endobj\n")
+        return number
+
+    def write_image(self, image: Image.Image, **options) -> int:
+        """
+        Write an image XObject, encoded as Pillow would encode it in a PDF (JPEG for RGB and grayscale images, and
+        losslessly with an indexed color space for palette images).
+
+        :param image: The image.
+        :param options: Options for Pillow's JPEG encoder (such as quality), or compress_level (0 to 9) for palette
+            images.
+        :return: The object number of the image XObject.
+        """
+        if image.mode == "P":
+            data = zlib.compress(image.tobytes(), options.get("compress_level", INDEXED_COMPRESS_LEVEL))
+            return self.write_indexed(data, image.width, image.height, image.getpalette())
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        data = io.BytesIO()
+        image.save(data, "JPEG", **options)
+        return self.write_jpeg(data.getvalue(), image.width, image.height, image.mode)
+
+    def write_jpeg(self, data: bytes, width: int, height: int, mode: str = "RGB") -> int:
+        """
+        Write an image XObject from an image that is already encoded as a JPEG (such as one copied from another PDF).
+
+        :param data: The JPEG file's bytes.
+        :param width: The width of the image in pixels.
+        :param height: The height of the image in pixels.
+        :param mode: "RGB" or "L" (grayscale).
+        :return: The object number of the image XObject.
+        """
+        color_space = "/DeviceRGB" if mode == "RGB" else "/DeviceGray"
+        return self.write_object(None, f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                                       f"/ColorSpace {color_space} /BitsPerComponent 8 /Filter /DCTDecode >>", data)
+
+    def write_indexed(self, data: bytes, width: int, height: int, palette: list) -> int:
+        """
+        Write an image XObject of palette indices, one byte per pixel, compressed with Flate.
+
+        :param data: The zlib-compressed indices of the pixels, row by row.
+        :param width: The width of the image in pixels.
+        :param height: The height of the image in pixels.
+        :param palette: List of the red, green and blue of each color (as from Image.getpalette), at most 256 colors.
+        :return: The object number of the image XObject.
+        """
+        lookup = bytes(palette).hex()
+        return self.write_object(None, f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                                       f"/ColorSpace [/Indexed /DeviceRGB {len(palette) // 3 - 1} <{lookup}>] "
+                                       f"/BitsPerComponent 8 /Filter /FlateDecode >>", data)
+
+    def write_masked_image(self, image: Image.Image, mask: Image.Image) -> int:
+        """
+        Write an image XObject with a soft mask, both compressed losslessly (with Flate).
+
+        :param image: The image (converted to RGB if needed).
+        :param mask: A grayscale image of the same size, giving the opacity of each pixel (255 means opaque).
+        :return: The object number of the image XObject.
+        """
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if mask.mode != "L":
+            mask = mask.convert("L")
+        size = f"/Width {image.width} /Height {image.height} /BitsPerComponent 8 /Filter /FlateDecode"
+        mask_number = self.write_object(None, f"<< /Type /XObject /Subtype /Image {size} /ColorSpace /DeviceGray >>",
+                                        zlib.compress(mask.tobytes()))
+        return self.write_object(None, f"<< /Type /XObject /Subtype /Image {size} /ColorSpace /DeviceRGB "
+                                       f"/SMask {mask_number} 0 R >>", zlib.compress(image.tobytes()))
+
+    def add_page(self, width: float, height: float, content: bytes, resources: str, compress: bool = False) -> int:
+        """
+        Add a page.
+
+        :param width: Page width, in points.
+        :param height: Page height, in points.
+        :param content: The page's content stream.
+        :param resources: The page's resource dictionary, in PDF syntax.
+        :param compress: Should the content stream be compressed (with Flate)?
+        :return: The object number of the page.
+        """
+        if compress:
+            content_number = self.write_object(None, "<< /Filter /FlateDecode >>", zlib.compress(content))
+        else:
+            content_number = self.write_object(None, "<< >>", content)
+        page_number = self.write_object(None, f"<< /Type /Page /Parent {self._pages_number} 0 R "
+                                              f"/MediaBox [0 0 {width:.4f} {height:.4f}] "
+                                              f"/Resources {resources} /Contents {content_number} 0 R >>")
+        self._page_numbers.append(page_number)
+        return page_number
+
+    def add_image_page(self, image: Image.Image, dpi=300, **options) -> int:
+        """
+        Add a page consisting of a single image, sized according to dpi.
+
+        :param image: The image.
+        :param dpi: Dots per inch of the image on the page.
+        :param options: Options for Pillow's JPEG encoder (such as quality).
+        :return: The object number of the page.
+        """
+        return self.add_xobject_page(self.write_image(image, **options), image.width, image.height, dpi)
+
+    def add_xobject_page(self, image_number: int, pixel_width: int, pixel_height: int, dpi=300) -> int:
+        """
+        Add a page consisting of a single image XObject that has already been written, sized according to dpi.
+
+        :param image_number: The object number of the image XObject.
+        :param pixel_width: The width of the image in pixels.
+        :param pixel_height: The height of the image in pixels.
+        :param dpi: Dots per inch of the image on the page.
+        :return: The object number of the page.
+        """
+        width, height = pixel_width * 72 / dpi, pixel_height * 72 / dpi
+        content = f"q {width:.4f} 0 0 {height:.4f} 0 0 cm /image Do Q".encode("latin-1")
+        return self.add_page(width, height, content, f"<< /XObject << /image {image_number} 0 R >> >>")
+
+    def close(self) -> None:
+        """Write the page tree, catalog, cross-reference table and trailer, and close the file if it was opened."""
+        if self._file is None:
+            return
+        kids = " ".join(f"{number} 0 R" for number in self._page_numbers)
+        self.write_object(self._pages_number, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_numbers)} >>")
+        self.write_object(self._catalog_number, f"<< /Type /Catalog /Pages {self._pages_number} 0 R >>")
+
+        xref_position = self._position
+        lines = [f"xref\n0 {len(self._offsets)}\n", "0000000000 65535 f \n"]
+        lines += [f"{offset:010d} 00000 n \n" for offset in self._offsets[1:]]
+        lines.append(f"trailer\n<< /Size {len(self._offsets)} /Root {self._catalog_number} 0 R >>\n"
+                     f"startxref\n{xref_position}\n%%EOF\n")
+        self._write("".join(lines).encode("latin-1"))
+        if self._owns_file:
+            self._file.close()
+        self._file = None
@@ -0,0 +1,257 @@
+"""
+The planner module works out where the strings of a flashcard deck go on its pages.
+
+A deck can be laid out in three ways:
+
+grid: n_rows by n_columns cards per page (or n_rows lines per page), as make_flashcards has always done.
+auto: the densest grid in which every string fits on its card, chosen from the measured extents of all the strings.
+packed: rows of cards of different widths, each one as wide as its string plus padding, so that short strings share
+    a row and a deck with a few long strings doesn't need large cards for all of them (so it has fewer pages).
+
+The strings are measured in one pass over the whole deck, from the QuadFont's metrics tables. The positions on one
+page of a grid depend only on the page size, the margins and the grid, so they are computed once (see page_grid) and
+reused by every deck laid out on the same grid; laying out a deck then only takes assigning its strings to pages.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+import math
+
+from . import drawing, instrument
+from .quadfont import QuadFont, current_quadfont
+
+# ways of laying out the strings of a deck on its pages
+LAYOUTS = ("grid", "auto", "packed")
+
+
+@dataclass
+class Layout:
+    """
+    Where the strings of a deck go on its pages.
+
+    positions: list of (page number, x, y) tuples, one per string, in the order of the strings (as given by
+        drawing.compute_layout).
+    n_pages: the number of pages.
+    n_rows, n_columns: the number of rows and columns of cards per page of a grid (n_columns is 0 when there are
+        n_rows lines per page, and both are 0 for a packed layout).
+    h_centered: whether the strings are horizontally centered at their positions.
+    page_lines: for a packed layout, a list with one list per page of the ((x0, y0), (x1, y1)) line segments that
+        separate its cards; None for a grid, whose lines are drawn by main.draw_boundaries.
+    """
+    positions: list
+    n_pages: int
+    n_rows: int
+    n_columns: int
+    h_centered: bool
+    page_lines: list = None
+
+
+def check_layout(layout: str, padding: int) -> None:
+    """Raise a ValueError if layout is not one of LAYOUTS or padding is not a nonnegative integer."""
+    if layout not in LAYOUTS:
+        raise ValueError("Layout must be one of " + ", ".join(LAYOUTS) + ".")
+    if type(padding) != int or padding < 0:
+        raise ValueError("Padding must be a nonnegative integer.")
+
+
+def check_page(n_rows: int, n_columns: int, width: int, height: int) -> None:
+    """Raise a ValueError if the grid or page size arguments of make_flashcards are not valid."""
+    if type(n_rows) != int or type(n_columns) != int:
+        raise ValueError("Number of rows and columns must be nonnegative integers.")
+    if n_rows < 0 or n_columns < 0:
+        raise ValueError("Number of rows and columns must be nonnegative integers.")
+    if type(width) != int or type(height) != int:
+        raise ValueError("Width and height must be positive integers.")
+    if width <= 0 or height <= 0:
+        raise ValueError("Width and height must be positive integers.")
+
+
+@lru_cache(maxsize=256)
+def page_grid(width: int, height: int, margins: tuple, n_rows: int, n_columns: int, h_centered: bool) -> tuple:
+    """
+    Compute the positions of the strings on one page of a grid, as drawing.compute_layout does.
+
+    The result is cached, so decks laid out on the same page size, margins and grid share it.
+    :param width: Page width in pixels.
+    :param height: Page height in pixels.
+    :param margins: Tuple of four ints giving the left, top, right, bottom margins of the page, in pixels.
+    :param n_rows: Number of rows per page.
+    :param n_columns: Number of columns per page (0 for n_rows lines per page).
+    :param h_centered: Are the strings horizontally centered at their positions?
+    :return: Tuple of the (x, y) positions on the page, in order.
+    """
+    left_margin, top_margin, right_margin, bottom_margin = margins
+    positions = drawing.compute_layout(images=[(width, height)], top_margin=top_margin, left_margin=left_margin,
+                                       bottom_margin=bottom_margin, right_margin=right_margin,
+                                       n_rows=n_rows, n_columns=n_columns, h_centered=h_centered)
+    return tuple((x, y) for _, x, y in positions)
+
+
+def grid_layout(n_lines: int, n_rows: int, n_columns: int, width: int, height: int,
+                margins=(0, 0, 0, 0)) -> Layout:
+    """
+    Lay out strings on a grid, as described in make_flashcards (including its defaults for n_rows and n_columns).
+
+    :param n_lines: Number of strings to be laid out.
+    :return: The Layout. The other parameters are as for make_flashcards.
+    """
+    check_page(n_rows, n_columns, width, height)
+    if n_rows == 0:
+        # if no rows specified, use 1 row and 1 column
+        n_rows = 1
+        n_columns = 1
+    # with only n_rows specified, there are that many lines per page, which are not centered
+    h_centered = n_columns != 0
+    grid = page_grid(width, height, tuple(margins), n_rows, n_columns, h_centered)
+    n_pages = math.ceil(n_lines / len(grid))
+    positions = [(number, x, y) for number in range(n_pages) for x, y in grid]
+    del positions[n_lines:]
+    return Layout(positions=positions, n_pages=n_pages, n_rows=n_rows, n_columns=n_columns, h_centered=h_centered)
+
+
+def measure_extents(text_list: list, quadfont: QuadFont) -> (list, list, list):
+    """
+    Measure how far each string extends from the point it is drawn at by make_flashcards.
+
+    :param text_list: List of strings.
+    :param quadfont: The font and style they are drawn with.
+    :return: A tuple of three lists of ints: the widths of the strings, and how far they extend above and below
+        their positions (which are shifted down by half the x-height, as drawing.draw_text does).
+    """
+    widths, tops, bottoms = drawing.get_bboxes(text_list, as_arrays=True, quadfont=quadfont)
+    y_shift = quadfont.font_dict["x"].mask.size[1] // 2 if "x" in quadfont.font_dict.keys() else 0
+    return widths.tolist(), (-(tops + y_shift)).tolist(), (bottoms + y_shift).tolist()
+
+
+def densest_grid(text_list: list, width: int, height: int, margins=(0, 0, 0, 0), padding: int = 20,
+                 quadfont: QuadFont = None) -> (int, int):
+    """
+    Find the grid with the most cards per page on which every string fits on its card.
+
+    A card must be at least as wide as the widest string plus the padding, and at least as tall as the padding plus
+    twice the furthest any string extends above or below its position (since the strings are centered on the
+    cards). If even one card per page is too small, a grid of one card is returned.
+    :param text_list: List of strings to be laid out.
+    :param width: Page width in pixels.
+    :param height: Page height in pixels.
+    :param margins: Tuple of four ints giving the left, top, right, bottom margins of the page, in pixels.
+    :param padding: Minimum space between strings on neighboring cards, in pixels.
+    :param quadfont: The font and style the strings are drawn with (the global configuration if None).
+    :return: A tuple of the number of rows and the number of columns.
+    """
+    if not text_list:
+        return 1, 1
+    widths, ups, downs = measure_extents(text_list, quadfont or current_quadfont())
+    left_margin, top_margin, right_margin, bottom_margin = margins
+    card_width = max(widths) + padding
+    card_height = 2 * max(max(ups), max(downs), 0) + padding
+    n_columns = (width - left_margin - right_margin) // max(card_width, 1)
+    n_rows = (height - top_margin - bottom_margin) // max(card_height, 1)
+    return max(n_rows, 1), max(n_columns, 1)
+
+
+def _spread(sizes: list, total: int) -> list:
+    """Share out the space left over in total among the given sizes, as evenly as possible."""
+    extra = max(total - sum(sizes), 0)
+    return [size + extra * (i + 1) // len(sizes) - extra * i // len(sizes) for i, size in enumerate(sizes)]
+
+
+def packed_layout(text_list: list, width: int, height: int, margins=(0, 0, 0, 0), padding: int = 20,
+                  quadfont: QuadFont = None) -> Layout:
+    """
+    Lay out strings in rows of cards of different widths.
+
+    The strings are kept in order. Each row takes as many strings as fit across the page, each with the padding
+    around it, and is as tall as its tallest string plus the padding; each page takes as many rows as fit. The space
+    left over is then shared out among the cards of each row and the rows of each page, so that the cards fill the
+    page, and each string is centered on its card (with the strings in a row on the same baseline). A string that
+    is too wide for the page gets a row to itself.
+    :param text_list: List of strings to be laid out.
+    :param width: Page width in pixels.
+    :param height: Page height in pixels.
+    :param margins: Tuple of four ints giving the left, top, right, bottom margins of the page, in pixels.
+    :param padding: Minimum space between strings on neighboring cards, in pixels.
+    :param quadfont: The font and style the strings are drawn with (the global configuration if None).
+    :return: The Layout, with the lines between the cards of each page.
+    """
+    widths, ups, downs = measure_extents(text_list, quadfont or current_quadfont())
+    left_margin, top_margin, right_margin, bottom_margin = margins
+    text_width, text_height = width - left_margin - right_margin, height - top_margin - bottom_margin
+
+    # split the strings into rows of (start, end, height above the baseline, height below it)
+    rows = []
+    start, row_width, up, down = 0, 0, 0, 0
+    for i, string_width in enumerate(widths):
+        if i > start and row_width + string_width + padding > text_width:
+            rows.append((start, i, up, down))
+            start, row_width, up, down = i, 0, 0, 0
+        row_width += string_width + padding
+        up, down = max(up, ups[i]), max(down, downs[i])
+    if start < len(widths):
+        rows.append((start, len(widths), up, down))
+
+    # split the rows into pages
+    pages = []
+    page_height = 0
+    for row in rows:
+        row_height = row[2] + row[3] + padding
+        if not pages or page_height + row_height > text_height:
+            pages.append([])
+            page_height = 0
+        pages[-1].append(row)
+        page_height += row_height
+
+    positions = []
+    page_lines = []
+    for number, page_rows in enumerate(pages):
+        lines = []
+        row_top = top_margin
+        row_heights = _spread([up + down + padding for _, _, up, down in page_rows], text_height)
+        for k, ((start, end, up, down), row_height) in enumerate(zip(page_rows, row_heights)):
+            y = row_top + (row_height - up - down) // 2 + up
+            if k > 0:
+                lines.append(((0, row_top), (width, row_top)))
+            # the lines between cards run from the lines between rows, or from the edges of the page
+            line_top = 0 if k == 0 else row_top
+            line_bottom = height if k == len(page_rows) - 1 else row_top + row_height
+            card_left = left_margin
+            for j, card_width in enumerate(_spread([widths[i] + padding for i in range(start, end)], text_width)):
+                if j > 0:
+                    lines.append(((card_left, line_top), (card_left, line_bottom)))
+                positions.append((number, card_left + card_width // 2, y))
+                card_left += card_width
+            row_top += row_height
+        page_lines.append(lines)
+    return Layout(positions=positions, n_pages=len(pages), n_rows=0, n_columns=0, h_centered=True,
+                  page_lines=page_lines)
+
+
+@instrument.timed("plan_flashcards")
+def plan_flashcards(text_list: list, layout: str = "auto", n_rows: int = 0, n_columns: int = 0,
+                    width: int = 2550, height: int = 3450, margins=(0, 0, 0, 0), padding: int = 20,
+                    quadfont: QuadFont = None) -> Layout:
+    """
+    Work out where the strings of a deck of flashcards go on its pages.
+
+    This is what make_flashcards does with its layout argument, and can be used to see how many pages a deck would
+    take, or which grid would be chosen, without drawing it.
+    :param text_list: List of strings to be laid out.
+    :param layout: "grid" for the grid given by n_rows and n_columns (as described in make_flashcards), "auto" for
+        the densest grid that the strings fit on (see densest_grid), or "packed" for rows of cards of different
+        widths (see packed_layout).
+    :param n_rows: Number of rows per page of a grid layout.
+    :param n_columns: Number of columns per page of a grid layout.
+    :param width: Page width in pixels.
+    :param height: Page height in pixels.
+    :param margins: Tuple of four ints giving the left, top, right, bottom margins of the page, in pixels.
+    :param padding: Minimum space between strings on neighboring cards, in pixels, for the "auto" and "packed"
+        layouts.
+    :param quadfont: The font and style the strings are drawn with (the global configuration if None).
+    :return: The Layout.
+    """
+    check_layout(layout, padding)
+    check_page(n_rows, n_columns, width, height)
+    if layout == "auto":
+        n_rows, n_columns = densest_grid(text_list, width, height, margins, padding, quadfont)
+    elif layout == "packed":
+        return packed_layout(text_list, width, height, margins, padding, quadfont)
+    return grid_layout(len(text_list), n_rows, n_columns, width, height, margins)
@@ -0,0 +1,306 @@
+"""
+The quadfont module contains QuadFont, an immutable font and style that can be passed to the drawing functions.
+
+The settings functions (set_font, set_colors and set_parameters) change the global configuration in the config
+module, which every drawing function uses by default. A QuadFont holds the same things (the font dictionary, the
+font, the colors and the parameters) in one object that never changes, so different fonts and palettes can be used
+at the same time, for example by different threads, without replacing the global configuration or making font
+dictionaries again. QuadFonts are compared and hashed by their font and settings, so they can be used as keys of
+caches; two QuadFonts made from the same font file contents, size, colors and parameters are equal (a font file that
+is changed in place makes a QuadFont that isn't equal to those made before, so cached strips of the old letters
+aren't reused).
+
+The global configuration is read and replaced under a lock, so a thread that draws while another one calls the
+settings functions gets either the old QuadFont or the new one, never a mixture of the two.
+
+make_quadfont makes a QuadFont from a font file, the with_colors and with_parameters methods make modified copies
+(redoing as little work as possible, as the settings functions do), and current_quadfont returns the QuadFont of the
+global configuration.
+
+A QuadFont also serves its letters at other sizes (for screen thumbnails, web images and print pages from the same
+font), without replacing the global configuration: at_size and scaled return the QuadFont at another size in pixels,
+drawing a FreeType font again at that size, or resizing the letters of a font dictionary that wasn't made from a font
+(such as the package's default font, which was drawn at config.default_font_size pixels). The last few sizes asked
+for are kept with the QuadFont, so switching between sizes only makes each one once.
+"""
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+import threading
+from PIL import ImageFont
+
+from . import config, fontcache
+from .fontmetrics import FontMetrics
+from .font_dict import build_font_dict, changed_coloring
+from .wordcache import word_cache
+
+# number of other sizes of its letters that each QuadFont keeps (see QuadFont.at_size)
+MAX_SIZES = 8
+
+
+class FontNotSetError(Exception):
+    """
+    Error for handling when config.font has not been set.
+    """
+    pass
+
+
+@dataclass(frozen=True, eq=False)
+class QuadFont:
+    """
+    An immutable font and style for drawing colored letters.
+
+    font_dict: the font dictionary (characters to ColoredChars), which must not be modified.
+    glyphs: the uncolored Glyphs that font_dict was made from (possibly empty), used to make modified copies.
+    font: the ImageFont.FreeTypeFont that font_dict was made from (None for the package's default font).
+    pixel_size: the size in pixels of the letters of font_dict when font is None (None means
+        config.default_font_size).
+    ul_color, ur_color, ll_color, lr_color, non_color: the colors of the letters.
+    substitute_a, to_color, characters: the parameters (see settings.set_parameters).
+    glyph_arrays (not a field): the (quadrants, mask) arrays of the letters that the compositing module has drawn,
+        by letter, which it fills in as it goes.
+    glyph_indices (not a field): the arrays of palette indices of the letters that the palette module has drawn,
+        by letter, which it fills in as it goes.
+    sizes (not a field): the QuadFonts of the other sizes made by at_size, by size in pixels, least recently used
+        first.
+
+    The attributes have the same names as the variables in the config module, so a QuadFont can be used wherever
+    the config module is passed as a configuration (for example, to fontcache.cache_key).
+    """
+    font_dict: Mapping
+    glyphs: dict = field(default_factory=dict)
+    font: ImageFont.FreeTypeFont = None
+    pixel_size: int = None
+    ul_color: tuple = (255, 0, 0)
+    ur_color: tuple = (0, 0, 255)
+    ll_color: tuple = (128, 0, 128)
+    lr_color: tuple = (130, 130, 131)
+    non_color: tuple = (0, 0, 0)
+    substitute_a: chr = ""
+    to_color: chr = "[a-z]"
+    characters: str = config.characters
+
+    def __post_init__(self) -> None:
+        # colors given as lists (as from JSON) are stored as tuples, so that the QuadFont is hashable
+        for name in ("ul_color", "ur_color", "ll_color", "lr_color", "non_color"):
+            if isinstance(getattr(self, name), list):
+                object.__setattr__(self, name, tuple(getattr(self, name)))
+        object.__setattr__(self, "_key", (self.font_key(), self.ul_color, self.ur_color, self.ll_color,
+                                          self.lr_color, self.non_color, self.substitute_a, self.to_color,
+                                          self.characters))
+        object.__setattr__(self, "_hash", hash(self._key))
+        object.__setattr__(self, "glyph_arrays", dict())
+        object.__setattr__(self, "glyph_indices", dict())
+        object.__setattr__(self, "sizes", OrderedDict())
+        object.__setattr__(self, "_sizes_lock", threading.Lock())
+
+    def font_key(self) -> tuple:
+        """
+        Return a tuple identifying the font: the hash of the contents of its file (see fontcache.font_file_hash), its
+        size and index, or the object itself if it has no file that can be read.
+        """
+        if self.font is None:
+            # the package's default font (or another font dictionary that wasn't made from a font), which is
+            # identified by its font dictionary
+            return "font_dict", id(self.font_dict)
+        try:
+            file_hash = fontcache.font_file_hash(self.font)
+        except OSError:
+            file_hash = ""
+        if not file_hash:
+            return "font", id(self.font)
+        return file_hash, self.font.size, self.font.index, self.font.layout_engine
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, QuadFont):
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __getstate__(self) -> dict:
+        # font dictionaries loaded lazily can't be pickled, but their contents can; the caches are left behind
+        state = {name: getattr(self, name) for name in self.__dataclass_fields__}
+        state["font_dict"] = {char: self.font_dict[char] for char in self.font_dict}
+        state["glyphs"] = dict()
+        return state
+
+    @property
+    def size(self) -> int:
+        """The size of the letters in pixels (the size of the font, or pixel_size if there is no font)."""
+        if self.font is not None:
+            return self.font.size
+        return self.pixel_size or config.default_font_size
+
+    def at_size(self, size: int):
+        """
+        Get this QuadFont with its letters at another size in pixels.
+
+        A FreeType font is drawn again at the new size (or its font dictionary is loaded from the on-disk cache), and
+        the letters of a font dictionary that wasn't made from a font are resized (see ColoredChar.resized), which
+        looks best when they are made smaller. The colors and parameters are the same. The last MAX_SIZES sizes are
+        kept, so each one is only made once while it is being used.
+        :param size: Size of the letters in pixels.
+        :return: The QuadFont at that size (this one, if it is the same size).
+        """
+        if type(size) != int or size <= 0:
+            raise ValueError("Size must be a positive integer.")
+        if size == self.size:
+            return self
+        with self._sizes_lock:
+            quadfont = self.sizes.get(size)
+            if quadfont is not None:
+                self.sizes.move_to_end(size)
+                return quadfont
+        if self.font is not None:
+            style = replace(self, font_dict=dict(), glyphs=dict(), font=self.font.font_variant(size=size))
+            font_dict, glyphs = build_font_dict(style, dict(), dict())
+            quadfont = replace(style, font_dict=font_dict, glyphs=glyphs)
+        else:
+            scale = size / self.size
+            font_dict = {char: self.font_dict[char].resized(scale) for char in self.font_dict.keys()}
+            quadfont = replace(self, font_dict=font_dict, glyphs=dict(), pixel_size=size)
+        with self._sizes_lock:
+            self.sizes[size] = quadfont
+            while len(self.sizes) > MAX_SIZES:
+                self.sizes.popitem(last=False)
+        return quadfont
+
+    def scaled(self, scale: float):
+        """
+        Get this QuadFont with its letters scaled by the given factor, rounded to the nearest size in pixels.
+
+        :param scale: The factor to scale the letters by (1 for this QuadFont).
+        :return: The QuadFont at the scaled size (see at_size).
+        """
+        if not isinstance(scale, (int, float)) or scale <= 0:
+            raise ValueError("Scale must be a positive number.")
+        if scale == 1:
+            return self
+        return self.at_size(max(round(self.size * scale), 1))
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        self.__post_init__()
+
+    @cached_property
+    def metrics(self) -> FontMetrics:
+        """The FontMetrics of the font dictionary, used to measure text (computed when first needed)."""
+        return FontMetrics(self.font_dict)
+
+    def with_colors(self, ul=None, ur=None, ll=None, lr=None, non=None):
+        """
+        Make a copy of this QuadFont with one or more of its colors changed, as settings.set_colors does.
+
+        The characters aren't drawn again, only recolored. All colors are given as RGB triples of ints.
+        :param ul: Color to apply to the upper left quadrant of letters.
+        :param ur: Color to apply to the upper right quadrant of letters.
+        :param ll: Color to apply to the lower left quadrant of letters.
+        :param lr: Color to apply to the lower right quadrant of letters.
+        :param non: Color of letters that are not to be colored.
+        :return: The new QuadFont.
+        """
+        if self.font is None:
+            raise FontNotSetError("The default font cannot be modified. To make changes, first make a QuadFont "
+                                  "with make_quadfont.")
+        colors = dict(ul_color=ul, ur_color=ur, ll_color=ll, lr_color=lr, non_color=non)
+        style = replace(self, font_dict=dict(), glyphs=dict(),
+                        **{name: color for name, color in colors.items() if color is not None})
+        font_dict, glyphs = build_font_dict(style, self.font_dict, self.glyphs)
+        return replace(style, font_dict=font_dict, glyphs=glyphs)
+
+    def with_parameters(self, a_height: str = None, characters_to_color: str = None, font_characters: str = None):
+        """
+        Make a copy of this QuadFont with one or more of its parameters changed, as settings.set_parameters does.
+
+        Only the characters that are affected by the changes are drawn again or recolored.
+        :param a_height: The character whose height is to be used to truncate a "d" to make it a rounded "a".
+        :param characters_to_color: A regular expression that determines which characters should be colored.
+        :param font_characters: A string containing all the characters that are to be included in the font
+            dictionary.
+        :return: The new QuadFont.
+        """
+        if self.font is None:
+            raise FontNotSetError("The default font cannot be modified. To make changes, first make a QuadFont "
+                                  "with make_quadfont.")
+        parameters = dict(substitute_a=a_height, to_color=characters_to_color, characters=font_characters)
+        style = replace(self, font_dict=dict(), glyphs=dict(),
+                        **{name: value for name, value in parameters.items() if value is not None})
+        rasterize = "a" if style.substitute_a != self.substitute_a else ""
+        recolor = changed_coloring(self.to_color, style)
+        font_dict, glyphs = build_font_dict(style, self.font_dict, self.glyphs, rasterize=rasterize,
+                                            recolor=recolor)
+        return replace(style, font_dict=font_dict, glyphs=glyphs)
+
+
+def make_quadfont(filename: str, size: int, ul=(255, 0, 0), ur=(0, 0, 255), ll=(128, 0, 128),
+                  lr=(130, 130, 131), non=(0, 0, 0), a_height: str = "", characters_to_color: str = "[a-z]",
+                  font_characters: str = config.characters) -> QuadFont:
+    """
+    Make a QuadFont from a font file, without changing the global configuration.
+
+    The font is loaded with ImageFont.truetype(), as in settings.set_font, and its font dictionary is made (or
+    loaded from the on-disk cache) right away. The other arguments are as for set_colors and set_parameters.
+    :param filename: Font filename.
+    :param size: Font size in pixels.
+    :return: The QuadFont.
+    """
+    style = QuadFont(font_dict=dict(), font=ImageFont.truetype(filename, size), ul_color=ul, ur_color=ur,
+                     ll_color=ll, lr_color=lr, non_color=non, substitute_a=a_height, to_color=characters_to_color,
+                     characters=font_characters)
+    font_dict, glyphs = build_font_dict(style, dict(), dict())
+    return replace(style, font_dict=font_dict, glyphs=glyphs)
+
+
+# config.font_dict when current_quadfont was last called, along with its QuadFont
+_current: tuple = (None, None)
+# held while the global configuration is being read into a QuadFont or replaced
+_lock = threading.RLock()
+
+
+def current_quadfont() -> QuadFont:
+    """
+    Get the QuadFont of the global configuration (the font and settings in the config module).
+
+    This is what the drawing functions use when they aren't given a QuadFont. Every change made by the settings
+    functions replaces config.font_dict, so a new QuadFont is only made after such a change.
+    :return: The QuadFont.
+    """
+    global _current
+    font_dict, quadfont = _current
+    if font_dict is config.font_dict:
+        return quadfont
+    with _lock:
+        font_dict, quadfont = _current
+        if font_dict is not config.font_dict:
+            quadfont = QuadFont(font_dict=config.font_dict, glyphs=config.glyphs, font=config.font,
+                                pixel_size=config.pixel_size, ul_color=config.ul_color, ur_color=config.ur_color,
+                                ll_color=config.ll_color, lr_color=config.lr_color, non_color=config.non_color,
+                                substitute_a=config.substitute_a, to_color=config.to_color,
+                                characters=config.characters)
+            _current = (quadfont.font_dict, quadfont)
+        return quadfont
+
+
+def use_quadfont(quadfont: QuadFont) -> None:
+    """
+    Make a QuadFont the global configuration, so that the drawing functions use it by default.
+
+    The strings drawn with the previous global configuration are dropped from the word cache (see the wordcache
+    module), since they hold on to its font dictionary.
+    :param quadfont: The QuadFont.
+    :return: None.
+    """
+    global _current
+    with _lock:
+        previous = current_quadfont()
+        for name in quadfont.__dataclass_fields__:
+            setattr(config, name, getattr(quadfont, name))
+        _current = (quadfont.font_dict, quadfont)
+    if previous != quadfont:
+        word_cache.discard(previous)
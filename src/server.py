@@ -0,0 +1,273 @@
+"""
+The server module is a long-running render service, run with python -m quadcolor serve.
+
+It keeps the font dictionaries it has made in memory, so a request only pays for drawing and encoding its images.
+Requests are made over HTTP/1.1 (with keep-alive), on a TCP port or a Unix socket:
+
+    POST /render: the body is a JSON job, with the same fields as in a batch manifest (see the batch module),
+        except that instead of output there is format ("png", the default, "jpeg", "pdf" or "tiff") and, for png
+        and jpeg, page (the index of the image to return, 0 by default). The response is the encoded images.
+    GET /health: a JSON object with counts of requests served, rejected and in progress.
+
+Rendering is done in a pool of worker processes (or threads, which share one copy of the font dictionaries, as in
+render_many), so the event loop only parses requests and writes responses. At most max_queue requests are accepted
+at a time (being rendered, or waiting for a worker); beyond that, requests are answered at once with 503 and a
+Retry-After header, so that a client under load backs off instead of waiting in an ever longer queue.
+
+This is meant for local use, behind a front end: font filenames in requests are opened on the server.
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import itertools
+import json
+import os
+
+from . import batch, config, output
+from .batch import ManifestError
+from .drawing import OutOfFontError
+from .lazyfontdict import LazyFontDict
+
+# the content type of each format (the images are encoded as save_images would, see output.encode_image)
+FORMATS = {"png": "image/png", "jpeg": "image/jpeg", "pdf": "application/pdf", "tiff": "image/tiff"}
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def render(job: dict, image_format: str = "png", page: int = 0, dpi: int = 300) -> bytes:
+    """
+    Draw the images of a job and encode them.
+
+    :param job: A job dict, from batch.normalize_job.
+    :param image_format: "png" or "jpeg" to encode one image, or "pdf" or "tiff" to encode all of them.
+    :param page: Index of the image to encode, for png and jpeg.
+    :param dpi: Dots per inch in the encoded file.
+    :return: The encoded file, as bytes.
+    """
+    images = batch.make_images(job)
+    if image_format in ("pdf", "tiff"):
+        return output.encode_pages(images, image_format, dpi=dpi)
+    # only the pages up to the requested one are drawn
+    image = next(itertools.islice(images, page, None), None)
+    if image is None:
+        raise ManifestError(f"The request has no page {page}.")
+    return output.encode_image(image, image_format, dpi=dpi)
+
+
+def _warm_up_font_dict() -> None:
+    # a font dictionary made by set_font (rather than loaded lazily) already has all its images
+    if isinstance(config.font_dict, LazyFontDict):
+        config.font_dict.warm_up()
+
+
+def _init_worker() -> None:
+    batch.remember_default_config()
+    _warm_up_font_dict()
+
+
+def parse_request(body: bytes) -> (dict, str, int, int):
+    """
+    Decode the body of a render request.
+
+    :param body: The JSON body.
+    :return: The job (from batch.normalize_job), format, page and dpi.
+    """
+    try:
+        request = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as error:
+        raise ManifestError(f"The request is not valid JSON: {error}") from None
+    if not isinstance(request, dict):
+        raise ManifestError("The request is not an object.")
+    if "output" in request:
+        raise ManifestError("The request has an output field, but the server only returns images.")
+    image_format = request.pop("format", "png")
+    page = request.pop("page", 0)
+    dpi = request.pop("dpi", 300)
+    if image_format not in FORMATS:
+        raise ManifestError("The format must be one of " + ", ".join(FORMATS) + ".")
+    if type(page) != int or page < 0 or type(dpi) != int or dpi <= 0:
+        raise ManifestError("The page must be a nonnegative integer, and dpi a positive integer.")
+    request.pop("single_file", None)
+    return batch.normalize_job(request, name="The request", output_required=False), image_format, page, dpi
+
+
+class RenderServer:
+    """
+    The render service: an HTTP/1.1 connection handler for asyncio.start_server (or start_unix_server).
+    """
+    def __init__(self, workers: int = None, executor: str = "process", max_queue: int = None,
+                 max_body: int = 1 << 20) -> None:
+        """
+        :param workers: Number of worker processes or threads (None means one per CPU).
+        :param executor: "process" for a pool of worker processes, or "thread" for a pool of threads.
+        :param max_queue: Maximum number of requests being rendered or waiting to be (None means 4 per worker).
+        :param max_body: Maximum size of a request body, in bytes.
+        """
+        if executor not in ("process", "thread"):
+            raise ValueError("Executor must be process or thread.")
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.max_queue = max_queue or 4 * self.workers
+        self.max_body = max_body
+        self.pool = None
+        self.in_progress = 0
+        self.served = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def start_pool(self) -> None:
+        """Start the pool of workers, each with the font configurations made so far."""
+        batch.remember_default_config()
+        _warm_up_font_dict()
+        if self.executor == "process":
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    async def warm_up(self) -> None:
+        """Start every worker, so that the first requests don't wait for them."""
+        loop = asyncio.get_running_loop()
+        job = batch.normalize_job(dict(text=["a"], kind="graphics"), output_required=False)
+        await asyncio.gather(*[loop.run_in_executor(self.pool, render, job)
+                               for _ in range(self.workers)])
+
+    def stats(self) -> dict:
+        """Return counts of the requests served, rejected (with 503), failed and in progress."""
+        return dict(served=self.served, rejected=self.rejected, failed=self.failed, in_progress=self.in_progress,
+                    max_queue=self.max_queue, workers=self.workers, executor=self.executor)
+
+    async def respond(self, method: str, path: str, body: bytes) -> (int, str, bytes, dict):
+        """
+        Handle one request.
+
+        :return: The status code, content type, body and extra headers of the response.
+        """
+        if path == "/health":
+            return 200, "application/json", json.dumps(self.stats()).encode(), dict()
+        if path != "/render":
+            return 404, "text/plain", b"Not found\n", dict()
+        if method != "POST":
+            return 405, "text/plain", b"Use POST\n", {"Allow": "POST"}
+        if self.in_progress >= self.max_queue:
+            self.rejected += 1
+            return 503, "text/plain", b"Too many requests in progress\n", {"Retry-After": "1"}
+
+        self.in_progress += 1
+        try:
+            job, image_format, page, dpi = parse_request(body)
+            data = await asyncio.get_running_loop().run_in_executor(self.pool, render, job, image_format, page, dpi)
+        except (ManifestError, OutOfFontError, ValueError, TypeError, OSError) as error:
+            self.failed += 1
+            return 400, "text/plain", f"{type(error).__name__}: {error}\n".encode(), dict()
+        except Exception as error:
+            self.failed += 1
+            return 500, "text/plain", f"{type(error).__name__}: {error}\n".encode(), dict()
+        finally:
+            self.in_progress -= 1
+        self.served += 1
+        return 200, FORMATS[image_format], data, dict()
+
+    async def __call__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the requests on one connection, until the client closes it (or asks to)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.write_response(writer, 400, "text/plain", b"Bad request line\n", dict(), False)
+                    break
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > self.max_body:
+                    await self.write_response(writer, 413, "text/plain", b"Body too large\n", dict(), False)
+                    break
+                body = await reader.readexactly(length)
+                status, content_type, data, extra_headers = await self.respond(method, path.split("?")[0], body)
+                await self.write_response(writer, status, content_type, data, extra_headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def write_response(writer: asyncio.StreamWriter, status: int, content_type: str, data: bytes,
+                             extra_headers: dict, keep_alive: bool) -> None:
+        headers = {"Content-Type": content_type, "Content-Length": str(len(data)),
+                   "Connection": "keep-alive" if keep_alive else "close", **extra_headers}
+        head = f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + data)
+        await writer.drain()
+
+
+async def serve(server: RenderServer, host: str = "127.0.0.1", port: int = 8765, unix_path: str = None) -> None:
+    """
+    Run a RenderServer until cancelled.
+
+    :param server: The RenderServer.
+    :param host: Host to listen on (ignored if unix_path is given).
+    :param port: TCP port to listen on (ignored if unix_path is given).
+    :param unix_path: Path of a Unix socket to listen on instead of a TCP port.
+    :return: None.
+    """
+    server.start_pool()
+    try:
+        await server.warm_up()
+        if unix_path:
+            listener = await asyncio.start_unix_server(server, path=unix_path)
+        else:
+            listener = await asyncio.start_server(server, host=host, port=port)
+        addresses = ", ".join(str(socket.getsockname()) for socket in listener.sockets)
+        print(f"quadcolor render server listening on {addresses} with {server.workers} {server.executor} workers",
+              flush=True)
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.pool.shutdown(cancel_futures=True)
+
+
+def main(argv: list = None) -> None:
+    """Command line entry point (python -m quadcolor serve)."""
+    parser = argparse.ArgumentParser(prog="python -m quadcolor serve",
+                                     description="Run a quadcolor render server (see the server module).")
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on (default: 8765)")
+    parser.add_argument("--unix", help="listen on this Unix socket instead of a TCP port")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of workers (default: one per CPU)")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process",
+                        help="render in worker processes (the default) or threads")
+    parser.add_argument("--max-queue", type=int, default=None,
+                        help="requests accepted at once before answering 503 (default: 4 per worker)")
+    parser.add_argument("--preload", help="JSON lines file of font configurations (objects with font, font_size, "
+                                          "colors and parameters, as in a job) to make before starting")
+    args = parser.parse_args(argv)
+
+    if args.preload:
+        # made here, before the worker processes are forked, so that they all start with them
+        batch.remember_default_config()
+        with open(args.preload, encoding="utf-8") as file:
+            for number, line in enumerate(file, start=1):
+                if line.strip():
+                    job = batch.normalize_job(dict(json.loads(line), text=[]), os.path.dirname(args.preload),
+                                              f"Line {number}", output_required=False)
+                    batch.get_quadfont(job)
+    server = RenderServer(workers=args.workers, executor=args.executor, max_queue=args.max_queue)
+    try:
+        asyncio.run(serve(server, host=args.host, port=args.port, unix_path=args.unix))
+    except KeyboardInterrupt:
+        pass
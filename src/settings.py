@@ -1,7 +1,8 @@
-from PIL import ImageFont
+from pathlib import Path
 
-from . import config
-from .font_dict import make_font_dict
+from . import config, fontcache
+from .wordcache import word_cache
+from .quadfont import FontNotSetError, current_quadfont, make_quadfont, use_quadfont
 
 
 def set_font(filename: str, size: int) -> None:
@@ -15,14 +16,9 @@ def set_font(filename: str, size: int) -> None:
     :param size: Font size in pixels.
     :return: None.
     """
-    config.font = ImageFont.truetype(filename, size)
-    make_font_dict()
-
-class FontNotSetError(Exception):
-    """
-    Error for handling when config.font has not been set.
-    """
-    pass
+    use_quadfont(make_quadfont(filename, size, ul=config.ul_color, ur=config.ur_color, ll=config.ll_color,
+                               lr=config.lr_color, non=config.non_color, a_height=config.substitute_a,
+                               characters_to_color=config.to_color, font_characters=config.characters))
 
 
 def set_colors(ul=None, ur=None, ll=None, lr=None, non=None) -> None:
@@ -39,17 +35,8 @@ def set_colors(ul=None, ur=None, ll=None, lr=None, non=None) -> None:
     """
     if config.font is None:
         raise FontNotSetError("The default font cannot be modified. To make changes, first set the font with set_font.")
-    if ul is not None:
-        config.ul_color = ul
-    if ur is not None:
-        config.ur_color = ur
-    if ll is not None:
-        config.ll_color = ll
-    if lr is not None:
-        config.lr_color = lr
-    if non is not None:
-        config.non_color = non
-    make_font_dict()
+    # the characters don't need to be drawn again, only recolored
+    use_quadfont(current_quadfont().with_colors(ul=ul, ur=ur, ll=ll, lr=lr, non=non))
 
 
 def set_parameters(a_height: str = None, characters_to_color: str = None, font_characters: str = None) -> None:
@@ -77,10 +64,81 @@ def set_parameters(a_height: str = None, characters_to_color: str = None, font_c
     """
     if config.font is None:
         raise FontNotSetError("The default font cannot be modified. To make changes, first set the font with set_font.")
-    if a_height is not None:
-        config.substitute_a = a_height
-    if characters_to_color is not None:
-        config.to_color = characters_to_color
-    if font_characters is not None:
-        config.characters = font_characters
-    make_font_dict()
+    # only the characters that are affected by the changes are drawn again or recolored
+    use_quadfont(current_quadfont().with_parameters(a_height=a_height, characters_to_color=characters_to_color,
+                                                    font_characters=font_characters))
+
+
+def set_cache(enabled: bool = None, directory=None, max_bytes: int = None) -> None:
+    """
+    Configure the on-disk cache of font dictionaries made by set_font, set_colors and set_parameters.
+
+    When the cache is enabled, a font dictionary made from a font file, size, colors and parameters that were used
+    before (even by another process) is loaded from the cache instead of being made again. The cache is disabled
+    when the package is loaded, unless the QUADCOLOR_CACHE_DIR environment variable is set to its directory (by
+    default, it is kept in $XDG_CACHE_HOME/quadcolor or ~/.cache/quadcolor). Only the settings that are specified
+    will be modified; all others will remain unchanged.
+    :param enabled: Should the cache be used?
+    :param directory: Directory in which to keep the cache.
+    :param max_bytes: Maximum total size of the cache, in bytes. The least recently used entries are deleted
+        when it is exceeded.
+    :return: None.
+    """
+    if enabled is not None:
+        config.cache_enabled = enabled
+    if directory is not None:
+        config.cache_dir = Path(directory)
+    if max_bytes is not None:
+        config.cache_max_bytes = max_bytes
+        if config.cache_enabled:
+            fontcache.evict()
+
+
+def set_build_workers(workers: int = None, executor: str = None) -> None:
+    """
+    Set how many workers draw the characters when set_font, set_colors or set_parameters makes the font dictionary.
+
+    Drawing the characters in parallel helps with large character sets and large font sizes. The font
+    dictionary that is made is the same either way. Only the settings that are specified will be modified.
+    :param workers: Number of workers (0 or 1 means to draw the characters one at a time, which is the default).
+    :param executor: "process" to use a pool of worker processes, or "thread" to use a pool of threads.
+    :return: None.
+    """
+    if workers is not None:
+        if type(workers) != int or workers < 0:
+            raise ValueError("Number of workers must be a nonnegative integer.")
+        config.build_workers = workers
+    if executor is not None:
+        if executor not in ("process", "thread"):
+            raise ValueError('Executor must be "process" or "thread".')
+        config.build_executor = executor
+
+
+def set_word_cache(enabled: bool = None, max_bytes: int = None) -> None:
+    """
+    Configure the in-memory cache of rendered strings of letters used when drawing text.
+
+    When the cache is enabled, the colored letters of each string that is drawn are composited into a strip that
+    is kept for the next time the same string is drawn with the same font dictionary. Only the settings that are
+    specified will be modified. The hits, misses and size of the cache are given by word_cache_stats().
+    :param enabled: Should the cache be used?
+    :param max_bytes: Maximum total size of the cache, in bytes. The least recently used strips are dropped
+        when it is exceeded.
+    :return: None.
+    """
+    if enabled is not None:
+        config.word_cache_enabled = enabled
+        if not enabled:
+            word_cache.clear()
+    if max_bytes is not None:
+        word_cache.resize(max_bytes)
+
+
+def word_cache_stats() -> dict:
+    """
+    Get statistics of the in-memory cache of rendered strings of letters.
+
+    :return: A dictionary with the numbers of hits, misses and evictions, the number of entries, and the current
+        and maximum sizes of the cache in bytes.
+    """
+    return word_cache.stats()
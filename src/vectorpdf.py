@@ -0,0 +1,138 @@
+"""
+The vectorpdf module writes flashcards straight to a PDF file, without drawing the pages as images.
+
+Saving the pages of make_flashcards as a PDF embeds a full-page bitmap for every page, so the file size and the time
+taken grow with the area of the pages, even though most of a page is background. Here, each distinct glyph (its
+colored quadrants, with its mask as a soft mask) is embedded once, cropped to the pixels it covers, and every
+occurrence of it is drawn by reference to that image. The background is a filled rectangle and the lines between
+flashcards are vector strokes, so the file size and the time taken grow with the number of distinct glyphs and the
+number of letters placed, not with the page area.
+
+The positions are the same as those of make_flashcards (from planner.plan_flashcards), in pixels of a page of the
+given width and height, which is scaled to dpi on the PDF page, so a PDF viewer shows the same thing as the pages of
+make_flashcards saved at that dpi.
+"""
+from pathlib import Path
+from PIL import ImageColor
+
+from . import instrument
+from .drawing import get_colored_chars
+from .planner import plan_flashcards
+from .pdfwriter import PdfWriter
+from .quadfont import QuadFont, current_quadfont
+
+
+def _pdf_color(color) -> str:
+    """Convert an RGB triple of ints (or a color name) to the three numbers of a PDF color."""
+    if isinstance(color, str):
+        color = ImageColor.getrgb(color)
+    return " ".join(f"{component / 255:.4f}" for component in color[:3])
+
+
+def _pdf_lines(lines: list, color) -> str:
+    """
+    Draw one pixel wide lines as ImageDraw draws them: along the centers of the pixels, including both ends.
+
+    :param lines: List of ((x0, y0), (x1, y1)) line segments, horizontal or vertical, in pixel coordinates.
+    :param color: The color of the lines.
+    :return: The PDF content that strokes the lines.
+    """
+    strokes = [f"{_pdf_color(color)} RG 1 w"]
+    for (x0, y0), (x1, y1) in lines:
+        if y0 == y1:
+            strokes.append(f"{x0} {y0 + 0.5} m {x1 + 1} {y1 + 0.5} l S")
+        else:
+            strokes.append(f"{x0 + 0.5} {y0} m {x1 + 0.5} {y1 + 1} l S")
+    return "\n".join(strokes) + "\n"
+
+
+@instrument.timed("save_flashcards_pdf")
+def save_flashcards_pdf(text_list: list, output_file,
+                        n_rows: int = 0, n_columns: int = 0,
+                        width: int = 2550, height: int = 3450,
+                        margins=(0, 0, 0, 0), bg_color=(255, 255, 255),
+                        boundary_color=(180, 180, 180), x_offset=0, y_offset=0, dpi=300,
+                        quadfont: QuadFont = None, layout: str = "grid", padding: int = 20) -> Path:
+    """
+    Write the same flashcards as make_flashcards to a PDF file, with each glyph embedded once and placed by reference.
+
+    The layout arguments are as for make_flashcards. Each page is written as soon as it is laid out, so only the
+    object numbers of the glyphs used so far are kept in memory.
+    :param text_list: List of strings to make colored text images of.
+    :param output_file: Filename of the PDF file, or a binary file object to write it to.
+    :param n_rows: Number of rows per page of flashcards.
+    :param n_columns: Number of columns per page of flashcards.
+    :param width: Page width in pixels.
+    :param height: Page height in pixels.
+    :param margins: Tuple of four ints giving the left, top, right, bottom margins around text, in pixels.
+    :param bg_color: Tuple of three ints giving the RGB background color (each int between 0 and 255).
+    :param boundary_color: Tuple of three ints giving the RGB color of the lines between flashcards.
+    :param x_offset: Amount by which to shift the text of every flashcard horizontally (positive means to the right).
+    :param y_offset: Amount by which to shift the text of every flashcard vertically (positive means downward).
+    :param dpi: Dots per inch: the page is width * 72 / dpi points wide, and similarly for its height.
+    :param quadfont: The font and style to draw with (the global configuration if None).
+    :param layout: "grid", "auto" or "packed" (see make_flashcards).
+    :param padding: Minimum space between strings on neighboring cards, in pixels, for the "auto" and "packed"
+        layouts.
+    :return: The output file.
+    """
+    if quadfont is None:
+        quadfont = current_quadfont()
+    plan = plan_flashcards(text_list, layout=layout, n_rows=n_rows, n_columns=n_columns, width=width, height=height,
+                           margins=margins, padding=padding, quadfont=quadfont)
+    y_shift = 0
+    if "x" in quadfont.font_dict.keys():
+        # to vertically center, offset by half the x-height, as drawing.draw_text does
+        y_shift = quadfont.font_dict["x"].mask.size[1] // 2
+
+    scale = 72 / dpi
+    # the name, object number and bounding box within its images of each glyph embedded so far (None for blank
+    # glyphs, such as spaces), by character
+    glyphs = dict()
+    # the beginning of every page: pixel coordinates with y increasing downwards, and the background
+    page_start = (f"{scale:.6f} 0 0 {-scale:.6f} 0 {height * scale:.4f} cm\n"
+                  f"{_pdf_color(bg_color)} rg 0 0 {width} {height} re f\n")
+    # the end of every page of a grid: the lines between flashcards, over the letters as in main.draw_boundaries
+    # (one pixel wide, as ImageDraw draws them, along the centers of the pixels)
+    n_rows, n_columns = plan.n_rows, plan.n_columns
+    lines = [((0, i * height // n_rows), (width, i * height // n_rows)) for i in range(1, n_rows)]
+    lines += [((j * width // n_columns, 0), (j * width // n_columns, height)) for j in range(1, n_columns)]
+    page_end = _pdf_lines(lines, boundary_color)
+
+    with PdfWriter(output_file) as writer:
+        page_number = None
+        content, used = [], dict()
+
+        def finish_page() -> None:
+            resources = " ".join(f"/{name} {number} 0 R" for name, number in used.items())
+            end = page_end if plan.page_lines is None else _pdf_lines(plan.page_lines[page_number], boundary_color)
+            page_content = (page_start + "".join(content) + end).encode("latin-1")
+            writer.add_page(width * scale, height * scale, page_content, f"<< /XObject << {resources} >> >>",
+                            compress=True)
+            instrument.count("pages_allocated")
+
+        for text, (number, x_pos, y_pos) in zip(text_list, plan.positions):
+            if number != page_number:
+                if page_number is not None:
+                    finish_page()
+                page_number, content, used = number, [], dict()
+            colored_chars = get_colored_chars(text, quadfont)
+            text_width = sum(colored_char.width for colored_char in colored_chars)
+            x = (x_pos - (text_width // 2) if plan.h_centered else int(x_pos)) + x_offset
+            for char, colored_char in zip(text, colored_chars):
+                if char not in glyphs:
+                    bbox = colored_char.mask.getbbox()
+                    glyphs[char] = None if bbox is None else (
+                        f"G{len(glyphs)}", writer.write_masked_image(colored_char.quadrants.crop(bbox),
+                                                                     colored_char.mask.crop(bbox)), bbox)
+                if glyphs[char] is not None:
+                    name, glyph_number, (left, top, right, bottom) = glyphs[char]
+                    used[name] = glyph_number
+                    y = y_pos + colored_char.top_coord + y_shift + y_offset + top
+                    content.append(f"q {right - left} 0 0 {top - bottom} {x + left} {y + bottom - top} cm "
+                                   f"/{name} Do Q\n")
+                    instrument.count("glyphs_pasted")
+                x += colored_char.width
+        if page_number is not None:
+            finish_page()
+    return output_file
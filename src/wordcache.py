@@ -0,0 +1,124 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+from PIL import Image
+
+
+# pasting one more image costs about as much time as blending this many more pixels (measured with Pillow 12)
+PIXELS_PER_PASTE = 750
+
+
+@dataclass
+class WordStrip:
+    """
+    A string of colored letters, ready to be drawn by drawing.draw_text.
+
+    colored_chars: the ColoredChar of each letter.
+    image: an RGBA image of the letters, side by side: the RGB bands are the quadrants images of the letters, and
+        the alpha band is their masks (so the image is its own mask when it is pasted). This is None when pasting
+        the letters one at a time is faster, which happens when the letters are large and of very different
+        heights, so that the strip would contain a lot of empty space.
+    width: the width of the strip (the sum of the widths of the letters).
+    top_coord: the top coordinate of the strip, relative to the baseline of the letters.
+    """
+    colored_chars: list
+    image: Image.Image
+    width: int
+    top_coord: int
+
+    @property
+    def n_bytes(self) -> int:
+        """Approximate memory used by the image."""
+        if self.image is None:
+            return 64 * (len(self.colored_chars) + 1)
+        width, height = self.image.size
+        return 4 * width * height
+
+
+class WordCache:
+    """
+    A least recently used cache of WordStrips, keyed by their text and QuadFont.
+
+    Since QuadFonts are compared by their font and settings, strips drawn with several fonts or palettes can be
+    kept at once, and a font that is made again with the same settings finds its strips still there. Its total
+    size is kept under max_bytes, and its hits, misses and evictions are counted (see stats()). The cache can be
+    used from several threads at once.
+
+    The strips made by different functions are kept separately, so the cache also holds the line arrays of the
+    compositing module (any object with an n_bytes attribute can be kept).
+    """
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._strips = OrderedDict()
+        self._n_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text: str, quadfont, make_strip) -> WordStrip:
+        """
+        Get the WordStrip of a text, making it with make_strip(text, quadfont) if it isn't in the cache.
+
+        :param text: The text of the strip.
+        :param quadfont: The QuadFont of the strip.
+        :param make_strip: A function that makes the WordStrip of a text with a QuadFont.
+        :return: The WordStrip.
+        """
+        key = (quadfont, text, make_strip)
+        with self._lock:
+            strip = self._strips.get(key)
+            if strip is not None:
+                self._strips.move_to_end(key)
+                self.hits += 1
+                return strip
+            self.misses += 1
+
+        strip = make_strip(text, quadfont)
+        n_bytes = strip.n_bytes
+        if n_bytes > self.max_bytes:
+            return strip
+
+        with self._lock:
+            if key not in self._strips:
+                self._strips[key] = strip
+                self._n_bytes += n_bytes
+                while self._n_bytes > self.max_bytes:
+                    _, evicted = self._strips.popitem(last=False)
+                    self._n_bytes -= evicted.n_bytes
+                    self.evictions += 1
+        return strip
+
+    def _clear(self) -> None:
+        self._strips.clear()
+        self._n_bytes = 0
+
+    def discard(self, quadfont) -> None:
+        """Drop the strips of one QuadFont from the cache."""
+        with self._lock:
+            for key in [key for key in self._strips if key[0] == quadfont]:
+                self._n_bytes -= self._strips.pop(key).n_bytes
+
+    def clear(self) -> None:
+        """Empty the cache (the counters are not reset)."""
+        with self._lock:
+            self._clear()
+
+    def resize(self, max_bytes: int) -> None:
+        """Change the maximum size of the cache, evicting strips if needed."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self._n_bytes > self.max_bytes:
+                _, evicted = self._strips.popitem(last=False)
+                self._n_bytes -= evicted.n_bytes
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """Return a dictionary of the cache's hits, misses, evictions, number of entries, size and maximum size."""
+        with self._lock:
+            return dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                        entries=len(self._strips), n_bytes=self._n_bytes, max_bytes=self.max_bytes)
+
+
+# the cache used by drawing.draw_text
+word_cache = WordCache(max_bytes=256 * 1024 * 1024)